@@ -0,0 +1,106 @@
+# Write and query speed of the delivery log with a long history.
+#
+#   python benchmarks/delivery_log.py --rows 100000 500000
+#
+# A fresh database is filled with schedule batches of --batch-size
+# messages, written in chunks of 100 outcomes as the outbox worker writes
+# them, with a share of temporary and permanent failures. Reported: appended
+# rows per second, the file size, and the time of each query the Delivery
+# Analytics tab and the deliveries command make (median of --repeat runs,
+# with the read cache bypassed).
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from interview.deliveries import SCHEDULE, DeliveryLog  # noqa: E402
+from interview.outbox import DEFERRED, FAILED, SENT, Delivery  # noqa: E402
+
+CHUNK = 100
+
+
+# Outcomes of one batch: every message sent, some after a temporary failure,
+# and a few failed for good
+def batch_outcomes(batch_id, size, first_id, queued_at, rng):
+    outcomes = []
+    for i in range(size):
+        recipient = f"candidate{i}@example.com"
+        logged_at = queued_at + rng.uniform(0.1, 5)
+        if rng.random() < 0.05:
+            outcomes.append(Delivery(batch_id, first_id + i, DEFERRED, 1, queued_at, logged_at,
+                                     [(recipient, DEFERRED, 451, "Mailbox busy")]))
+            logged_at += rng.uniform(30, 60)
+        if rng.random() < 0.01:
+            outcomes.append(Delivery(batch_id, first_id + i, FAILED, 2, queued_at, logged_at,
+                                     [(recipient, FAILED, 550, "No such user")]))
+        else:
+            outcomes.append(Delivery(batch_id, first_id + i, SENT, 2, queued_at, logged_at,
+                                     [(recipient, SENT, 250, None)]))
+    return outcomes
+
+
+def fill(log, rows, batch_size, rng):
+    batches = []
+    written = 0
+    start = time.perf_counter()
+    while written < rows:
+        batch_id = f"batch{len(batches)}"
+        group = f"Drive{len(batches) % 50}"
+        log.start_batch(batch_id, SCHEDULE, group, batch_size)
+        outcomes = batch_outcomes(batch_id, batch_size, written, time.time(), rng)
+        for i in range(0, len(outcomes), CHUNK):
+            log.append(outcomes[i:i + CHUNK])
+        written += len(outcomes)
+        batches.append((batch_id, group))
+    return batches, written, time.perf_counter() - start
+
+
+def median_time(read, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        read()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write and query speed of the delivery log")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 500000])
+    parser.add_argument("--batch-size", type=int, default=1000, help="messages per batch")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, "interview.db")
+            log = DeliveryLog(path)
+            batches, written, seconds = fill(log, rows, args.batch_size, random.Random(0))
+            batch_id, group = batches[len(batches) // 2]
+            # Every query reads the database, as after another process wrote to it
+            log._cached = lambda key, read: read()
+            queries = {
+                "totals": lambda: log.totals(),
+                "totals of a group": lambda: log.totals(group),
+                "page of batches": lambda: log.batches(limit=50),
+                "last page of batches": lambda: log.batches(limit=50, offset=max(0, len(batches) - 50)),
+                "latency percentiles": lambda: log.latency_percentiles(batch_id),
+                "errors of a batch": lambda: log.errors(batch_id),
+                "recipients reached in a group": lambda: log.reached(group),
+                "history of a recipient": lambda: log.history("candidate7@example.com"),
+            }
+            size = sum(os.path.getsize(os.path.join(workdir, name)) for name in os.listdir(workdir))
+            print(f"{written} rows in {len(batches)} batches: appended at {written / seconds:,.0f} rows/s, "
+                  f"{size / 2 ** 20:.0f} MB")
+            for name, read in queries.items():
+                print(f"  {name:<32}{median_time(read, args.repeat) * 1000:>9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# Compare the latency of a full app rerun with the per-tab fragment reruns
+# on a large synthetic candidate sheet.
+#
+#   python benchmarks/rerun_latency.py --rows 40000 --runs 5
+#
+# Every rerun is timed with Streamlit's AppTest once the sheets are loaded,
+# with each tab open in turn (only the open tab runs); time spent inside
+# each st.fragment function is recorded by wrapping st.fragment, which is
+# what a widget change inside that tab costs once the tabs are fragments.
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from benchmarks.startup import TABS  # noqa: E402
+from benchmarks.workbooks import write_candidates  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=40000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    fragment_times = defaultdict(list)
+    original_fragment = st.fragment
+
+    # Record the time spent in every fragment call
+    def timed_fragment(func=None, **kwargs):
+        if func is None:
+            return lambda f: timed_fragment(f, **kwargs)
+
+        def timed(*a, **kw):
+            start = time.perf_counter()
+            try:
+                return func(*a, **kw)
+            finally:
+                fragment_times[func.__name__].append(time.perf_counter() - start)
+
+        timed.__name__ = func.__name__
+        timed.__qualname__ = func.__qualname__
+        return original_fragment(timed, **kwargs)
+
+    st.fragment = timed_fragment
+
+    workdir = tempfile.mkdtemp()
+    try:
+        shutil.copy(os.path.join(REPO, "inter.py"), workdir)
+        shutil.copy(os.path.join(REPO, "panel.xlsx"), workdir)
+        shutil.copytree(os.path.join(REPO, "interview"), os.path.join(workdir, "interview"))
+        write_candidates(os.path.join(workdir, "candidates.xlsx"), args.rows)
+        os.chdir(workdir)
+        sys.path.insert(0, workdir)
+
+        # A group makes the candidate table render in the first tab
+        from interview.store import Store
+        Store("interview.db").create_group("Benchmark")
+
+        app = AppTest.from_file(os.path.join(workdir, "inter.py"), default_timeout=600)
+
+        # AppTest does not remember the open tab, so it is set for every run
+        def run(tab):
+            app.session_state["main_tab"] = tab
+            start = time.perf_counter()
+            app.run()
+            if app.exception:
+                raise SystemExit(app.exception[0].value)
+            return time.perf_counter() - start
+
+        # The sheets load in the background behind a placeholder; wait for
+        # them as often as the placeholder checks
+        run(TABS[0])
+        while any("Loading" in info.value for info in app.info):
+            time.sleep(0.5)
+            run(TABS[0])
+
+        print(f"{args.rows} candidates, median of {args.runs} runs")
+        print(f"  {'open tab':<24}{'full rerun':>12}{'tab fragment':>14}")
+        for tab in TABS:
+            run(tab)  # the first run of a tab imports what it needs
+            fragment_times.clear()
+            full = [run(tab) for _ in range(args.runs)]
+            # Tab bodies are the fragments named *_tab; only the open one ran
+            body = [seconds for name, times in fragment_times.items() if name.endswith("_tab") for seconds in times]
+            print(f"  {tab:<24}{statistics.median(full) * 1000:9.1f} ms{statistics.median(body) * 1000:11.1f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# Local stand-in for the SMTP server, so sending can be measured without
+# touching a real mailbox. Messages are counted and thrown away.
+#
+#   python benchmarks/smtp_sink.py --port 8025 --latency 0.05 --failure-rate 0.01 --auth user:secret
+#
+# latency is added to every DATA command, failure_rate is the share of
+# messages answered with a temporary 451 error and auth, when given, makes
+# the sink require AUTH PLAIN with that username and password.
+import argparse
+import base64
+import random
+import socketserver
+import threading
+import time
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def reply(self, *lines):
+        text = "".join(f"{line[:3]}{'-' if i < len(lines) - 1 else ' '}{line[4:]}\r\n"
+                       for i, line in enumerate(lines))
+        self.wfile.write(text.encode("ascii"))
+
+    def handle(self):
+        sink = self.server.sink
+        authenticated = sink.username is None
+        recipients = []
+        self.reply("220 benchmark sink ready")
+        for line in self.rfile:
+            command, _, argument = line.decode("utf-8", "replace").rstrip("\r\n").partition(" ")
+            command = command.upper()
+            if command == "EHLO":
+                features = ["250 sink", "250 8BITMIME", "250 SIZE 0"]
+                if sink.username is not None:
+                    features.append("250 AUTH PLAIN")
+                self.reply(*features)
+            elif command == "HELO":
+                self.reply("250 sink")
+            elif command == "AUTH":
+                authenticated = self.authenticate(argument)
+                self.reply("235 2.7.0 Authentication successful" if authenticated
+                           else "535 5.7.8 Authentication credentials invalid")
+            elif command == "MAIL":
+                if not authenticated:
+                    self.reply("530 5.7.0 Authentication required")
+                else:
+                    recipients = []
+                    self.reply("250 OK")
+            elif command == "RCPT":
+                recipients.append(argument)
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                size = self.read_data()
+                self.reply(sink.receive(len(recipients), size))
+                recipients = []
+            elif command == "RSET":
+                recipients = []
+                self.reply("250 OK")
+            elif command == "NOOP":
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+    def authenticate(self, argument):
+        mechanism, _, response = argument.partition(" ")
+        if mechanism.upper() != "PLAIN":
+            return False
+        if not response:
+            self.reply("334 ")
+            response = self.rfile.readline().decode("ascii", "replace").strip()
+        try:
+            _, username, password = base64.b64decode(response).decode("utf-8").split("\0")
+        except ValueError:
+            return False
+        sink = self.server.sink
+        return username == sink.username and password == sink.password
+
+    def read_data(self):
+        size = 0
+        for line in self.rfile:
+            if line in (b".\r\n", b".\n"):
+                break
+            size += len(line)
+        return size
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+# SMTP server on a background thread. port=0 picks a free port, which is
+# available as .port once started.
+class SMTPSink:
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, failure_rate=0.0,
+                 username=None, password=None, seed=None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.username = username
+        self.password = password
+        self.received = 0
+        self.rejected = 0
+        self.bytes = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    # Reply to a finished DATA command, counting the message
+    def receive(self, recipients, size):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            if self._random.random() < self.failure_rate:
+                self.rejected += 1
+                return "451 4.3.0 Simulated temporary failure"
+            self.received += 1
+            self.bytes += size
+        return "250 OK"
+
+    def start(self):
+        self._server = _Server((self.host, self.port), _Handler)
+        self._server.sink = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="smtp-sink", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local SMTP sink for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every message")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of messages rejected")
+    parser.add_argument("--auth", help="required credentials as user:password")
+    args = parser.parse_args()
+
+    username, password = args.auth.split(":", 1) if args.auth else (None, None)
+    sink = SMTPSink(args.host, args.port, args.latency, args.failure_rate, username, password).start()
+    print(f"SMTP sink listening on {sink.host}:{sink.port}; Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"received {sink.received}, rejected {sink.rejected}")
+    except KeyboardInterrupt:
+        sink.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# Cold start of the app: what inter.py imports before the page is shown,
+# and how long a fresh process takes to show the page and to have the data.
+#
+#   python benchmarks/startup.py --rows 1000 10000
+#   python benchmarks/startup.py --app /path/to/other/inter.py
+#
+# Reported:
+#   imports      python -X importtime breakdown of the modules imported at
+#                the top of the app (before the first paint), and the cost of
+#                the modules it imports later, once the shell is on screen
+#   shell        time the first script run of a fresh process takes to send
+#                the page shell (sidebar, title, tabs) to the browser, from
+#                the app's own app.shell span
+#   first run    the whole first script run, which ends with a placeholder
+#                while the sheets load in the background
+#   data ready   until a run renders the open tab with the sheets loaded
+#   tab switch   a run of each of the other tabs
+#
+# Each measurement runs in a new process, first without the columnar sheet
+# cache (cold) and then with it (warm), like the first start after a deploy
+# and a restart afterwards.
+import argparse
+import ast
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from benchmarks.workbooks import workbooks  # noqa: E402
+
+TABS = ["Candidate Groups", "Panel Management", "Schedule Interviews", "Send Custom Message", "Delivery Analytics"]
+
+
+# Modules imported by the statements at the top of a script, and by any
+# other import statement in it (module level or inside functions)
+def script_imports(path):
+    with open(path, "r") as file:
+        tree = ast.parse(file.read())
+    top = []
+    for node in tree.body:
+        if not isinstance(node, (ast.Import, ast.ImportFrom)):
+            break
+        top += [alias.name for alias in node.names] if isinstance(node, ast.Import) else [node.module]
+    later = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            later += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            later.append(node.module)
+    return top, [name for name in dict.fromkeys(later) if name not in top]
+
+
+# Cumulative import time in seconds of each module imported directly by the
+# code, from python -X importtime
+def import_times(modules):
+    code = "; ".join(f"import {module}" for module in modules)
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=REPO,
+                            capture_output=True, text=True, check=True).stderr
+    times = {}
+    for line in stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| (\S.*)$", line)
+        if match:
+            times[match.group(2)] = int(match.group(1)) / 1e6
+    total = sum(times.values())
+    return total, sorted(times.items(), key=lambda item: -item[1])
+
+
+# Extra time the later imports take once the top ones are loaded
+def deferred_import_time(top, later):
+    if not later:
+        return 0.0
+    code = (f"import time; {'; '.join(f'import {module}' for module in top)}; start = time.perf_counter(); "
+            f"{'; '.join(f'import {module}' for module in later)}; print(time.perf_counter() - start)")
+    return float(subprocess.run([sys.executable, "-c", code], cwd=REPO, capture_output=True, text=True,
+                                check=True).stdout.strip().splitlines()[-1])
+
+
+# One start of the app in this process; prints its timings as a JSON line
+def child(args):
+    from streamlit.testing.v1 import AppTest
+
+    from interview.metrics import metrics
+
+    os.chdir(args.workdir)
+    at = AppTest.from_file(args.app, default_timeout=600)
+    start = time.perf_counter()
+    at.run()
+    first_run = time.perf_counter() - start
+    shell = metrics.snapshot()["spans"].get("app.shell", {}).get("total")
+    while any("Loading" in info.value for info in at.info):
+        # As often as the placeholder fragment checks
+        time.sleep(0.5)
+        at.run()
+    data_ready = time.perf_counter() - start
+
+    tabs = {}
+    for tab in TABS[1:]:
+        at.session_state["main_tab"] = tab
+        tab_start = time.perf_counter()
+        at.run()
+        tabs[tab] = time.perf_counter() - tab_start
+    print(json.dumps({"shell": shell, "first_run": first_run, "data_ready": data_ready, "tabs": tabs,
+                      "exceptions": [str(e.value) for e in at.exception]}))
+
+
+def start_app(args, workdir):
+    command = [sys.executable, os.path.abspath(__file__), "--child", "--app", args.app, "--workdir", workdir]
+    env = dict(os.environ, PYTHONPATH=REPO)
+    output = subprocess.run(command, check=True, capture_output=True, text=True, env=env).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time and first paint of the app")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--app", default=os.path.join(REPO, "inter.py"))
+    parser.add_argument("--top", type=int, default=10, help="modules listed in the import breakdown")
+    parser.add_argument("--data", default=os.path.join(tempfile.gettempdir(), "interview-benchmark"),
+                        help="directory the generated workbooks are kept in")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.app = os.path.abspath(args.app)
+
+    if args.child:
+        child(args)
+        return
+
+    top, later = script_imports(args.app)
+    total, times = import_times(top)
+    print(f"Imports before first paint: {total:.3f} s")
+    for module, seconds in times[:args.top]:
+        print(f"  {seconds:8.3f}  {module}")
+    print(f"Imports after first paint: {deferred_import_time(top, later):.3f} s ({', '.join(later) or 'none'})")
+    print()
+
+    print(f"{'rows':>8}  {'cache':<6}{'shell':>8}{'first run':>11}{'data ready':>12}  tab switch (s)")
+    for rows in args.rows:
+        candidates, panel = workbooks(args.data, rows)
+        with tempfile.TemporaryDirectory() as workdir:
+            shutil.copy(candidates, workdir)
+            shutil.copy(panel, workdir)
+            # Sends fail straight away should anything try one
+            with open(os.path.join(workdir, "settings.json"), "w") as file:
+                json.dump({"gmail_email": "benchmark@example.com", "gmail_password": "benchmark",
+                           "smtp_server": "127.0.0.1", "smtp_port": 1}, file)
+            for cache in ("cold", "warm"):
+                result = start_app(args, workdir)
+                tabs = ", ".join(f"{tab} {seconds:.2f}" for tab, seconds in result["tabs"].items())
+                shell = f"{result['shell']:.2f}" if result["shell"] is not None else "-"
+                print(f"{rows:>8}  {cache:<6}{shell:>8}{result['first_run']:>11.2f}{result['data_ready']:>12.2f}  {tabs}")
+                for error in result["exceptions"]:
+                    print(f"  exception: {error}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+# Headless throughput of the send and schedule paths against the local SMTP
+# sink, on synthetic workbooks of each size.
+#
+#   python benchmarks/throughput.py --rows 1000 10000 100000 --latency 0.01 --failure-rate 0.01
+#
+# Scenarios, each run in a fresh process so peak RSS is its own:
+#   message   load the sheet, render a personalised message for every
+#             candidate and deliver them through the outbox, as the Send
+#             Custom Message tab does for "All Recipients"
+#   schedule  load both sheets, schedule every candidate across the panels
+#             (matched by skills) and deliver the candidate and panel
+#             notifications, as the Schedule Interviews tab does
+#
+# Reported per run: messages per second from start until every message had
+# its first attempt, p50/p99 of the SMTP transaction of each attempt, the
+# retries of temporarily rejected messages and their mean delay (--backoff
+# seconds at the first retry, as OutboxWorker's backoff), the time of each
+# phase and the peak RSS of the process. The "retry" phase is the time
+# from the first attempts until the outbox was drained.
+import argparse
+import itertools
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, time as day_time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from benchmarks.smtp_sink import SMTPSink  # noqa: E402
+from benchmarks.workbooks import workbooks  # noqa: E402
+
+SENDER = "benchmark@example.com"
+MESSAGE_BODY = "Dear [NAME],\n\nWe noted your skills in [SKILLS] and [EXPERIENCE] of experience.\n\nMeeting Link: [MEET_LINK]"
+MEET_LINK = "https://meet.google.com/benchmark"
+
+
+def percentile(values, share):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(share * len(values)))]
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# Pool whose raw sends record how long each SMTP transaction took
+def timed_pool(args, latencies):
+    from interview.mailer import SMTPPool
+
+    pool = SMTPPool(size=args.workers, host="127.0.0.1", port=args.port, username=args.user,
+                    password=args.password, starttls=False)
+    send_raw = pool.send_raw
+
+    def timed_send_raw(sender, recipients, payload):
+        start = time.perf_counter()
+        try:
+            return send_raw(sender, recipients, payload)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    pool.send_raw = timed_send_raw
+    return pool
+
+
+# Queue the messages and wait for the outbox worker to deliver all of them;
+# returns the final batch status. The delay of every retry is appended to
+# retry_delays.
+def deliver(args, workdir, messages, phases, latencies, retry_delays):
+    from interview.outbox import Outbox, OutboxWorker
+
+    outbox = Outbox(os.path.join(workdir, "interview.db"))
+    start = time.perf_counter()
+    queued = outbox.enqueue("benchmark", messages)
+    phases["render and queue"] = time.perf_counter() - start
+
+    worker = OutboxWorker(outbox, poll_interval=0.1, backoff=args.backoff)
+    retry_delay = worker.retry_delay
+
+    def recorded_retry_delay(attempts):
+        delay = retry_delay(attempts)
+        retry_delays.append(delay)
+        return delay
+
+    worker.retry_delay = recorded_retry_delay
+    start = time.perf_counter()
+    worker.start(timed_pool(args, latencies))
+    while len(latencies) - len(retry_delays) < queued and outbox.pending():
+        time.sleep(0.01)
+    phases["send"] = time.perf_counter() - start
+    start = time.perf_counter()
+    while outbox.pending():
+        time.sleep(0.01)
+    phases["retry"] = time.perf_counter() - start
+    return outbox.batch_status("benchmark")
+
+
+def run_message(args, candidates_path, panel_path, workdir, phases, latencies, retry_delays):
+    from interview.importer import read_sheet
+    from interview.templating import render_messages, rows_for_emails
+
+    start = time.perf_counter()
+    candidates = read_sheet(candidates_path)
+    phases["load"] = time.perf_counter() - start
+
+    rows = rows_for_emails(candidates, candidates["Email"].tolist())
+    messages = render_messages(SENDER, "Hello [NAME]", MESSAGE_BODY, rows,
+                               values={"MEET_LINK": MEET_LINK}, defaults={"NAME": "Candidate"})
+    return deliver(args, workdir, messages, phases, latencies, retry_delays)
+
+
+def run_schedule(args, candidates_path, panel_path, workdir, phases, latencies, retry_delays):
+    from interview.data import build_email_index
+    from interview.importer import read_sheet
+    from interview.scheduler import WorkingHours, schedule
+    from interview.skills import SkillIndex
+    from interview.workflow import (candidate_schedule_messages, panel_schedule_messages, schedule_body,
+                                    skill_based_panels)
+
+    start = time.perf_counter()
+    candidates = read_sheet(candidates_path)
+    panel_sheet = read_sheet(panel_path)
+    candidate_index = build_email_index(candidates)
+    panel_index = build_email_index(panel_sheet)
+    phases["load"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    panels = {}
+    for email, panel in zip(panel_sheet["Email"], panel_sheet["Panel"]):
+        panels.setdefault(panel, []).append(email)
+    emails = candidates["Email"].tolist()
+    allowed = skill_based_panels(candidates, SkillIndex(candidates["Skills"]), panel_index, panels, emails)
+    interview_date = date(2030, 1, 7)
+    hours = WorkingHours(interview_date, day_time(9, 0), day_time(17, 0), [(day_time(13, 0), day_time(14, 0))])
+    slots, _ = schedule(emails, list(panels), hours, 30, allowed_panels=allowed)
+    phases["schedule"] = time.perf_counter() - start
+
+    candidate_messages = candidate_schedule_messages(SENDER, candidates, slots, schedule_body(30), MEET_LINK)
+    panel_messages = panel_schedule_messages(SENDER, candidate_index, slots, panels, interview_date, MEET_LINK,
+                                             "benchmark")
+    return deliver(args, workdir, itertools.chain(candidate_messages, panel_messages), phases, latencies,
+                   retry_delays)
+
+
+SCENARIOS = {"message": run_message, "schedule": run_schedule}
+
+
+# One scenario in this process; prints its results as a JSON line
+def child(args):
+    candidates_path, panel_path = workbooks(args.data, args.child_rows)
+    phases = {}
+    latencies = []
+    retry_delays = []
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        status = SCENARIOS[args.child](args, candidates_path, panel_path, workdir, phases, latencies, retry_delays)
+        elapsed = time.perf_counter() - start - phases["retry"]
+    messages = sum(status.values())
+    print(json.dumps({
+        "scenario": args.child,
+        "rows": args.child_rows,
+        "messages": messages,
+        "sent": status["sent"],
+        "failed": status["failed"],
+        "per_second": messages / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "retries": len(retry_delays),
+        "retry_delay_s": sum(retry_delays) / len(retry_delays) if retry_delays else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "phases": phases,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send and schedule throughput against a local SMTP sink")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--workers", type=int, default=4, help="SMTP connections")
+    parser.add_argument("--latency", type=float, default=0.0, help="sink latency per message, seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of messages the sink rejects")
+    parser.add_argument("--backoff", type=float, default=0.05, help="delay before the first retry, seconds")
+    parser.add_argument("--user", default="benchmark")
+    parser.add_argument("--password", default="benchmark")
+    parser.add_argument("--data", default=os.path.join(tempfile.gettempdir(), "interview-benchmark"),
+                        help="directory the generated workbooks are kept in")
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--child", choices=list(SCENARIOS), help=argparse.SUPPRESS)
+    parser.add_argument("--child-rows", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    sink = SMTPSink(latency=args.latency, failure_rate=args.failure_rate,
+                    username=args.user, password=args.password, seed=0).start()
+    try:
+        print(f"{'scenario':<10}{'rows':>8}{'messages':>10}{'failed':>8}{'msg/s':>9}"
+              f"{'p50 ms':>9}{'p99 ms':>9}{'retries':>9}{'delay s':>9}{'RSS MB':>9}  phases (s)")
+        for rows in args.rows:
+            workbooks(args.data, rows)
+            for scenario in args.scenarios:
+                command = [sys.executable, os.path.abspath(__file__), "--child", scenario,
+                           "--child-rows", str(rows), "--port", str(sink.port), "--workers", str(args.workers),
+                           "--backoff", str(args.backoff), "--user", args.user, "--password", args.password,
+                           "--data", args.data]
+                output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                phases = ", ".join(f"{name} {seconds:.2f}" for name, seconds in result["phases"].items())
+                print(f"{scenario:<10}{rows:>8}{result['messages']:>10}{result['failed']:>8}"
+                      f"{result['per_second']:>9.0f}{result['p50_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+                      f"{result['retries']:>9}{result['retry_delay_s']:>9.2f}{result['peak_rss_mb']:>9.0f}  {phases}")
+    finally:
+        sink.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Synthetic candidates.xlsx and panel.xlsx in the columns of the real sheets
+# (plus the Skills, Experience and Expertise columns the app reads).
+#
+#   python benchmarks/workbooks.py --rows 1000 10000 100000 --out /tmp/workbooks
+#
+# Rows are written in openpyxl's streaming mode, so 100k-row sheets are
+# written without building them in memory.
+import argparse
+import os
+
+import openpyxl
+
+SKILLS = ["Python", "Java", "SQL", "Machine Learning", "React", "AWS", "Docker", "Excel"]
+CATEGORIES = ["GEN", "OBC", "SC", "ST", "EWS"]
+
+CANDIDATE_COLUMNS = ["Sl.No.", "Email", "Mobile Number", "Application No", "Name", "Category",
+                     "Obtained Marks", "Total Marks", "Exam Status", "Panel", "Skills", "Experience"]
+PANEL_COLUMNS = ["Sl.No.", "Name", "Mobile", "Email", "Panel", "Remark", "Expertise"]
+
+
+def _write(path, columns, rows):
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(columns)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+
+def write_candidates(path, rows):
+    _write(path, CANDIDATE_COLUMNS, (
+        [i + 1, f"candidate{i}@example.com", f"9{i:09d}", f"APP{i:07d}", f"Candidate {i}",
+         CATEGORIES[i % 5], 40 + i % 60, 100, "Qualified" if i % 3 else "Pending", None,
+         ", ".join(sorted({SKILLS[i % 8], SKILLS[(i * 7) % 8]})), f"{i % 15} years"]
+        for i in range(rows)))
+
+
+# Panel members, members_per_panel to a panel, each panel sharing an expertise
+def write_panel(path, rows, members_per_panel=3):
+    _write(path, PANEL_COLUMNS, (
+        [i + 1, f"Panelist {i}", f"8{i:09d}", f"panelist{i}@example.com",
+         f"Panel {i // members_per_panel + 1}", None,
+         ", ".join(SKILLS[(i // members_per_panel + k) % 8] for k in range(2))]
+        for i in range(rows)))
+
+
+# Write (or reuse) a candidates and panel workbook pair for a row count.
+# Returns (candidates path, panel path).
+def workbooks(directory, rows, panel_rows=30):
+    directory = os.path.join(directory, str(rows))
+    os.makedirs(directory, exist_ok=True)
+    candidates = os.path.join(directory, "candidates.xlsx")
+    panel = os.path.join(directory, "panel.xlsx")
+    if not os.path.exists(candidates):
+        write_candidates(candidates, rows)
+    if not os.path.exists(panel):
+        write_panel(panel, panel_rows)
+    return candidates, panel
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic workbooks")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--panel-rows", type=int, default=30)
+    parser.add_argument("--out", default="workbooks")
+    args = parser.parse_args()
+    for rows in args.rows:
+        for path in workbooks(args.out, rows, args.panel_rows):
+            print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,566 +1,1137 @@
-import streamlit as st
-import pandas as pd
-import json
-import smtplib
-from email.message import EmailMessage
-from datetime import datetime, timedelta
-import uuid
-#import pywhatkit as kit
-
-# Set page to wide mode
-st.set_page_config(layout="wide")
-
-# Load data
-candidates_df = pd.read_excel("candidates.xlsx")
-panels_df = pd.read_excel("panel.xlsx")
-
-# Initialize session state
-if 'groups' not in st.session_state:
-    st.session_state.groups = {}
-if 'panels' not in st.session_state:
-    st.session_state.panels = {}
-
-# Function to generate Google Meet link
-def generate_meet_link():
-    # Generate a unique meeting ID
-    meeting_id = str(uuid.uuid4())[:8]
-    return f"https://meet.google.com/{meeting_id}"
-
-# Configuration section
-st.sidebar.title("Configuration Settings")
-
-# Load settings from JSON file
-def load_settings():
-    try:
-        with open("settings.json", "r") as file:
-            return json.load(file)
-    except FileNotFoundError:
-        return {}
-
-# Save settings to JSON file
-def save_settings(settings):
-    with open("settings.json", "w") as file:
-        json.dump(settings, file)
-
-# Load stored settings
-settings = load_settings()
-
-# Gmail Configuration in an expander
-with st.sidebar.expander("📧 Gmail Configuration", expanded=False):
-    st.markdown("""
-    ### Gmail Setup Instructions
-    1. Enable 2-Step Verification in your Google Account
-    2. Generate an App Password for this application
-    3. Use the App Password below instead of your regular password
-    """)
-    gmail_email = st.text_input("Your Gmail Address", settings.get("gmail_email", ""))
-    gmail_password = st.text_input("Your Gmail App Password", settings.get("gmail_password", ""), type="password")
-    smtp_server = st.text_input("SMTP Server", settings.get("smtp_server", "smtp.gmail.com"))
-    smtp_port = st.number_input("SMTP Port", settings.get("smtp_port", 587))
-
-    # Save Configuration
-    if st.button("Save Gmail Settings"):
-        settings.update({
-            "gmail_email": gmail_email,
-            "gmail_password": gmail_password,
-            "smtp_server": smtp_server,
-            "smtp_port": smtp_port
-        })
-        save_settings(settings)
-        st.success("Gmail settings saved successfully!")
-
-# WhatsApp Configuration in an expander
-with st.sidebar.expander("📱 WhatsApp Configuration", expanded=False):
-    whatsapp_number = st.text_input("Your WhatsApp Number", settings.get("whatsapp_number", ""))
-    whatsapp_message = st.text_area("Default Message Template", settings.get("whatsapp_message", "Your interview details have been sent via email."))
-    
-    if st.button("Save WhatsApp Settings"):
-        settings.update({
-            "whatsapp_number": whatsapp_number,
-            "whatsapp_message": whatsapp_message
-        })
-        save_settings(settings)
-        st.success("WhatsApp settings saved successfully!")
-
-# Function to send email with enhanced formatting
-def send_email(to, subject, body, is_html=False):
-    if not gmail_email or not gmail_password:
-        return "Error: Please configure your Gmail settings in the sidebar first."
-
-    email = EmailMessage()
-    email["From"] = gmail_email
-    email["To"] = to
-    email["Subject"] = subject
-    
-    if is_html:
-        email.add_alternative(body, subtype='html')
-    else:
-        email.set_content(body)
-
-    try:
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            server.starttls()
-            server.login(gmail_email, gmail_password)
-            server.send_message(email)
-        return "Email sent successfully!"
-    except smtplib.SMTPAuthenticationError:
-        return """Gmail Authentication Error: Please follow these steps:
-        1. Enable 2-Step Verification in your Google Account
-        2. Generate an App Password:
-           - Go to Google Account Settings
-           - Security → App Passwords
-           - Select 'Mail' and 'Other'
-           - Copy the generated 16-character password
-        3. Use this App Password in the sidebar settings
-        
-        For detailed instructions, visit: https://support.google.com/accounts/answer/185833"""
-    except Exception as e:
-        return f"Error sending email: {str(e)}"
-
-# Function to send WhatsApp message
-def send_whatsapp(phone, message):
-    try:
-        kit.sendwhatmsg_instantly(phone, message)
-        return "WhatsApp message sent successfully!"
-    except Exception as e:
-        return f"Error sending WhatsApp message: {e}"
-
-# Streamlit Main UI
-st.title("Interview Management System")
-
-# Tabs for different functionalities
-tab1, tab2, tab3, tab4 = st.tabs(["Candidate Groups", "Panel Management", "Schedule Interviews", "Send Custom Message"])
-
-# Candidate Groups Tab
-with tab1:
-    st.header("Candidate Groups Management")
-    
-    # Create new group
-    col1, col2 = st.columns([2, 1])
-    with col1:
-        new_group_name = st.text_input("Enter New Group Name")
-    with col2:
-        if st.button("Create Group"):
-            if new_group_name:
-                if new_group_name not in st.session_state.groups:
-                    st.session_state.groups[new_group_name] = []
-                    st.success(f"Group '{new_group_name}' created successfully!")
-            else:
-                st.error("Please enter a group name")
-
-    # Select group to manage
-    if st.session_state.groups:
-        selected_group = st.selectbox("Select Group to Manage", list(st.session_state.groups.keys()))
-        
-        # Enhanced candidate selection
-        st.subheader("Add Candidates to Group")
-        
-        # Initialize selection state if not exists
-        if 'candidate_selection' not in st.session_state:
-            st.session_state.candidate_selection = pd.DataFrame(candidates_df)
-            st.session_state.candidate_selection['Selected'] = False
-        
-        # Selection options in columns
-        col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
-        with col1:
-            range_input = st.text_input("Enter range (e.g., 1-5) or specific numbers (e.g., 1,3,5)")
-        with col2:
-            if st.button("Select Range"):
-                if range_input:
-                    try:
-                        if '-' in range_input:
-                            start, end = map(int, range_input.split('-'))
-                            indices = range(start-1, end)
-                        else:
-                            indices = [int(i)-1 for i in range_input.split(',')]
-                        st.session_state.candidate_selection.loc[indices, 'Selected'] = True
-                    except:
-                        st.error("Invalid range format")
-        with col3:
-            if st.button("Select All"):
-                st.session_state.candidate_selection['Selected'] = True
-        with col4:
-            if st.button("Clear Selection"):
-                st.session_state.candidate_selection['Selected'] = False
-        
-        # Display candidate table with individual checkboxes
-        st.dataframe(
-            st.session_state.candidate_selection,
-            column_config={
-                "Selected": st.column_config.CheckboxColumn(
-                    "Select",
-                    help="Select candidate",
-                    default=False
-                ),
-                "Name": st.column_config.TextColumn("Name"),
-                "Email": st.column_config.TextColumn("Email"),
-                "Skills": st.column_config.TextColumn("Skills"),
-                "Experience": st.column_config.TextColumn("Experience")
-            },
-            hide_index=True
-        )
-        
-        # Add selected candidates to group
-        if st.button("Add Selected to Group"):
-            selected_candidates = candidates_df[st.session_state.candidate_selection['Selected']]['Email'].tolist()
-            if selected_candidates:
-                # Remove duplicates by converting to set
-                current_group = set(st.session_state.groups[selected_group])
-                current_group.update(selected_candidates)
-                st.session_state.groups[selected_group] = list(current_group)
-                st.success(f"Added {len(selected_candidates)} candidates to group!")
-                # Clear selection after adding
-                st.session_state.candidate_selection['Selected'] = False
-            else:
-                st.warning("No candidates selected")
-        
-        # Display group members
-        if st.session_state.groups[selected_group]:
-            st.subheader("Current Group Members")
-            group_members = candidates_df[candidates_df['Email'].isin(st.session_state.groups[selected_group])]
-            
-            # Display group members with remove option
-            st.dataframe(group_members)
-            
-            # Option to remove members
-            members_to_remove = st.multiselect(
-                "Select members to remove from group",
-                group_members['Email'].tolist()
-            )
-            if st.button("Remove Selected Members"):
-                if members_to_remove:
-                    st.session_state.groups[selected_group] = [
-                        member for member in st.session_state.groups[selected_group] 
-                        if member not in members_to_remove
-                    ]
-                    st.success(f"Removed {len(members_to_remove)} members from the group")
-                    st.rerun()
-
-# Panel Management Tab
-with tab2:
-    st.header("Panel Management")
-    
-    # Display available panel members
-    st.subheader("Available Panel Members")
-    st.dataframe(panels_df)
-    
-    # Create interview panel
-    st.subheader("Create Interview Panel")
-    selected_panel_members = st.multiselect(
-        "Select Panel Members",
-        panels_df['Email'].tolist()
-    )
-    
-    panel_name = st.text_input("Enter Panel Name")
-    if st.button("Create Panel") and panel_name and selected_panel_members:
-        st.session_state.panels[panel_name] = selected_panel_members
-        st.success(f"Panel '{panel_name}' created with {len(selected_panel_members)} members!")
-    
-    # Display existing panels
-    if st.session_state.panels:
-        st.subheader("Existing Panels")
-        for panel, members in st.session_state.panels.items():
-            with st.expander(f"Panel: {panel}"):
-                st.write("Members:", ", ".join(members))
-
-# Schedule Interviews Tab
-with tab3:
-    st.header("Schedule Interviews")
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        # Select group
-        interview_group = st.selectbox("Select Candidate Group", 
-            list(st.session_state.groups.keys()) if st.session_state.groups else ["No groups created"])
-        
-        # Select panel
-        interview_panel = st.selectbox("Select Interview Panel", 
-            list(st.session_state.panels.keys()) if st.session_state.panels else ["No panels created"])
-    
-    with col2:
-        # Schedule details
-        interview_date = st.date_input("Select Interview Date")
-        start_time = st.time_input("Select Start Time")
-        duration = st.number_input("Interview Duration (minutes)", min_value=15, value=30)
-    
-    # Google Meet Link
-    col1, col2 = st.columns(2)
-    with col1:
-        meet_link = st.text_input(
-            "Meeting Link (Optional)",
-            placeholder="Enter your meeting link (Google Meet, Zoom, etc.)",
-            help="Enter any meeting link (Google Meet, Zoom, etc.)"
-        )
-    # Message input moved outside the column as per instructions
-    message = st.text_area(
-        "Message (Optional)",
-        placeholder="Enter your message here",
-        height=200,
-        help="Enter any custom message for the interview. This box is large for longer messages."
-    )
-    if st.button("Schedule Interviews"):
-        if interview_group in st.session_state.groups and interview_panel in st.session_state.panels:
-            candidates = st.session_state.groups[interview_group]
-            panel_members = st.session_state.panels[interview_panel]
-            current_time = datetime.combine(interview_date, start_time)
-            
-            # Prepare panel member email
-            panel_email_html = f"""
-            <html>
-            <body>
-            <h2>Interview Schedule - {interview_date.strftime('%B %d, %Y')}</h2>
-            <p>Respecet Sir/Madam, <br> You have been assigned to conduct interviews for the following candidates:</p>
-            <table border="1" style="border-collapse: collapse; width: 100%;">
-                <tr style="background-color: #f2f2f2;">
-                    <th style="padding: 8px;">Time</th>
-                    <th style="padding: 8px;">Candidate</th>
-                    <th style="padding: 8px;">Details</th>
-                </tr>
-            """
-            
-            # Send emails to candidates
-            for candidate in candidates:
-                candidate_details = candidates_df[candidates_df['Email'] == candidate].iloc[0]
-                
-                # Prepare candidate email
-                subject = "Interview Schedule Notification"
-                body = f"""
-                Dear {candidate_details.get('Name', 'Candidate')},
-                
-                Your interview has been scheduled for {current_time.strftime('%Y-%m-%d %H:%M')}.
-                Duration: {duration} minutes
-                Panel: {interview_panel}
-                
-                Meeting Link: {meet_link}
-                
-                """
-                if message:
-                    body += f"{message}\n\n"
-                body += """Please be prepared and join on time.
-                
-                Best regards,
-                Interview Team
-                """
-                
-                # Add to panel email
-                panel_email_html += f"""
-                <tr>
-                    <td style="padding: 8px;">{current_time.strftime('%H:%M')}</td>
-                    <td style="padding: 8px;">{candidate_details.get('Name', candidate)}</td>
-                    <td style="padding: 8px;">{candidate_details.get('Experience', '')} - {candidate_details.get('Skills', '')}</td>
-                </tr>
-                """
-                
-                # Send email to candidate
-                result = send_email(candidate, subject, body)
-                st.write(f"Notification to {candidate}: {result}")
-                
-                # Update time for next candidate
-                current_time += timedelta(minutes=duration)
-            
-            # Complete and send panel email
-            panel_email_html += """
-            </table>
-            <p>Meeting Link: {meet_link}</p>
-            <p>Please be prepared for the interviews.</p>
-            </body>
-            </html>
-            """
-            
-            # Send email to panel members
-            for panel_member in panel_members:
-                panel_result = send_email(
-                    panel_member,
-                    f"Interview Schedule - {interview_date.strftime('%B %d, %Y')}",
-                    panel_email_html,
-                    is_html=True
-                )
-                st.write(f"Notification to panel member {panel_member}: {panel_result}")
-            
-            st.success("All interviews scheduled and notifications sent!")
-        else:
-            st.error("Please create both groups and panels before scheduling interviews.")
-
-# Custom Message Tab
-with tab4:
-    st.header("Send Custom Message")
-    
-    # Use columns for recipient type and sending mode selection
-    col1, col2 = st.columns(2)
-    with col1:
-        recipient_type = st.radio("Select Recipient Type", ["Candidate", "Panel Member"])
-    with col2:
-        sending_mode = st.radio("Select Sending Mode", ["Single Recipient", "Multiple Recipients", "All Recipients"])
-    
-    recipients = []
-    if recipient_type == "Candidate":
-        if sending_mode == "Single Recipient":
-            # Single candidate selection
-            selected_candidate = st.selectbox(
-                "Select Candidate",
-                candidates_df['Email'].tolist(),
-                format_func=lambda x: f"{candidates_df[candidates_df['Email'] == x]['Name'].iloc[0] if len(candidates_df[candidates_df['Email'] == x]) > 0 and pd.notna(candidates_df[candidates_df['Email'] == x]['Name'].iloc[0]) else 'Unknown'} ({x})"
-            )
-            if selected_candidate:
-                recipients = [selected_candidate]
-                candidate_details = candidates_df[candidates_df['Email'] == selected_candidate].iloc[0]
-                with st.expander("View Candidate Details"):
-                    st.write(f"Name: {candidate_details.get('Name', 'N/A')}")
-                    st.write(f"Email: {candidate_details.get('Email', 'N/A')}")
-                    st.write(f"Skills: {candidate_details.get('Skills', 'N/A')}")
-                    st.write(f"Experience: {candidate_details.get('Experience', 'N/A')}")
-        
-        elif sending_mode == "Multiple Recipients":
-            # Multiple candidates selection
-            selected_candidates = st.multiselect(
-                "Select Candidates",
-                candidates_df['Email'].tolist(),
-                format_func=lambda x: f"{candidates_df[candidates_df['Email'] == x]['Name'].iloc[0] if len(candidates_df[candidates_df['Email'] == x]) > 0 and pd.notna(candidates_df[candidates_df['Email'] == x]['Name'].iloc[0]) else 'Unknown'} ({x})"
-            )
-            recipients = selected_candidates
-            if selected_candidates:
-                with st.expander("View Selected Candidates Details"):
-                    for candidate in selected_candidates:
-                        candidate_details = candidates_df[candidates_df['Email'] == candidate].iloc[0]
-                        st.write("---")
-                        st.write(f"Name: {candidate_details.get('Name', 'N/A')}")
-                        st.write(f"Email: {candidate_details.get('Email', 'N/A')}")
-                        st.write(f"Skills: {candidate_details.get('Skills', 'N/A')}")
-                        st.write(f"Experience: {candidate_details.get('Experience', 'N/A')}")
-        
-        else:  # All Recipients
-            recipients = candidates_df['Email'].tolist()
-            with st.expander(f"View All Candidates ({len(recipients)})"):
-                st.dataframe(candidates_df)
-    
-    else:  # Panel Member
-        if sending_mode == "Single Recipient":
-            # Single panel member selection
-            selected_panel_member = st.selectbox(
-                "Select Panel Member",
-                panels_df['Email'].tolist(),
-                format_func=lambda x: f"{panels_df[panels_df['Email'] == x]['Name'].iloc[0] if len(panels_df[panels_df['Email'] == x]) > 0 and pd.notna(panels_df[panels_df['Email'] == x]['Name'].iloc[0]) else 'Unknown'} ({x})"
-            )
-            if selected_panel_member:
-                recipients = [selected_panel_member]
-                panel_details = panels_df[panels_df['Email'] == selected_panel_member].iloc[0]
-                with st.expander("View Panel Member Details"):
-                    st.write(f"Name: {panel_details.get('Name', 'N/A')}")
-                    st.write(f"Email: {panel_details.get('Email', 'N/A')}")
-                    st.write(f"Expertise: {panel_details.get('Expertise', 'N/A')}")
-        
-        elif sending_mode == "Multiple Recipients":
-            # Multiple panel members selection
-            selected_panel_members = st.multiselect(
-                "Select Panel Members",
-                panels_df['Email'].tolist(),
-                format_func=lambda x: f"{panels_df[panels_df['Email'] == x]['Name'].iloc[0] if len(panels_df[panels_df['Email'] == x]) > 0 and pd.notna(panels_df[panels_df['Email'] == x]['Name'].iloc[0]) else 'Unknown'} ({x})"
-            )
-            recipients = selected_panel_members
-            if selected_panel_members:
-                with st.expander("View Selected Panel Members Details"):
-                    for member in selected_panel_members:
-                        panel_details = panels_df[panels_df['Email'] == member].iloc[0]
-                        st.write("---")
-                        st.write(f"Name: {panel_details.get('Name', 'N/A')}")
-                        st.write(f"Email: {panel_details.get('Email', 'N/A')}")
-                        st.write(f"Expertise: {panel_details.get('Expertise', 'N/A')}")
-        
-        else:  # All Recipients
-            recipients = panels_df['Email'].tolist()
-            with st.expander(f"View All Panel Members ({len(recipients)})"):
-                st.dataframe(panels_df)
-
-    # Show number of selected recipients
-    if recipients:
-        st.info(f"Selected Recipients: {len(recipients)}")
-
-    # Message composition
-    st.subheader("Compose Message")
-    message_subject = st.text_input("Subject")
-    
-    # Add personalized greeting option for candidates
-    if recipient_type == "Candidate":
-        use_personalized_greeting = st.checkbox("Use personalized greeting (Dear [Name])", value=True)
-    else:
-        use_personalized_greeting = False
-    
-    message_body = st.text_area("Message Body", height=200, 
-                               placeholder="Enter your message here. Use [NAME] as a placeholder for the recipient's name if you want personalized greetings.")
-    
-    # Add meeting link option
-    include_meeting_link = st.checkbox("Include Meeting Link")
-    if include_meeting_link:
-        meeting_link = st.text_input("Meeting Link")
-        if meeting_link:
-            message_body = f"{message_body}\n\nMeeting Link: {meeting_link}"
-    
-    # Send button with progress tracking
-    if st.button("Send Message"):
-        if not message_subject or not message_body:
-            st.error("Please enter both subject and message body")
-        elif not recipients:
-            st.error("Please select at least one recipient")
-        else:
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
-            successful_sends = 0
-            failed_sends = 0
-            
-            for idx, recipient in enumerate(recipients):
-                status_text.text(f"Sending email to {recipient}...")
-                
-                # Personalize message for each recipient
-                personalized_body = message_body
-                
-                if recipient_type == "Candidate" and use_personalized_greeting:
-                    # Get candidate details
-                    candidate_details = candidates_df[candidates_df['Email'] == recipient]
-                    if len(candidate_details) > 0:
-                        candidate_name = candidate_details.iloc[0].get('Name', 'Candidate')
-                        if pd.notna(candidate_name):
-                            # Replace [NAME] placeholder with actual name
-                            personalized_body = message_body.replace('[NAME]', str(candidate_name))
-                            # If no [NAME] placeholder found, add "Dear [Name]" at the beginning
-                            if '[NAME]' not in message_body:
-                                personalized_body = f"Dear {candidate_name},\n\n{message_body}"
-                
-                elif recipient_type == "Panel Member" and use_personalized_greeting:
-                    # Get panel member details
-                    panel_details = panels_df[panels_df['Email'] == recipient]
-                    if len(panel_details) > 0:
-                        panel_name = panel_details.iloc[0].get('Name', 'Panel Member')
-                        if pd.notna(panel_name):
-                            # Replace [NAME] placeholder with actual name
-                            personalized_body = message_body.replace('[NAME]', str(panel_name))
-                            # If no [NAME] placeholder found, add "Dear [Name]" at the beginning
-                            if '[NAME]' not in message_body:
-                                personalized_body = f"Dear {panel_name},\n\n{message_body}"
-                
-                result = send_email(recipient, message_subject, personalized_body)
-                
-                if result == "Email sent successfully!":
-                    successful_sends += 1
-                else:
-                    failed_sends += 1
-                    st.error(f"Failed to send to {recipient}: {result}")
-                
-                # Update progress
-                progress = (idx + 1) / len(recipients)
-                progress_bar.progress(progress)
-            
-            # Final status
-            if failed_sends == 0:
-                st.success(f"Successfully sent messages to all {len(recipients)} recipients!")
-            else:
-                st.warning(f"Sent messages to {successful_sends} recipients. Failed to send to {failed_sends} recipients.")
-            
-            status_text.text("Completed sending messages.")
-
-# Show warning if Gmail not configured
-if not gmail_email or not gmail_password:
-    st.sidebar.warning("⚠️ Please configure your Gmail settings to enable email notifications")
-
+import streamlit as st
+import json
+from datetime import datetime, time, timedelta
+from time import perf_counter
+import uuid
+import hashlib
+import itertools
+from interview.bookings import Bookings
+from interview.data import file_signature
+from interview.metrics import metrics, span, timed
+from interview.scheduler import WEEKDAYS, WORKDAYS, WorkingHours, schedule
+from interview.store import Store
+# pandas, the sheet loader, the message builders and the outbox (which
+# pulls in smtplib and email) are imported once the page shell is on screen
+# (see below), as importing them takes longer than everything above together
+#import pywhatkit as kit
+
+# SQLite database holding groups, panels, the outbox and the delivery log
+DB_PATH = "interview.db"
+
+rerun_started = perf_counter()
+
+# Set page to wide mode
+st.set_page_config(layout="wide")
+
+# One live view of each workbook, shared by every session and rerun. When
+# the file changes the next rerun picks up a new version, re-indexing only
+# the rows that were added or changed.
+@st.cache_resource
+def get_live_sheet(path, skill_column=None):
+    from interview.refresh import LiveSheet
+
+    return LiveSheet(path, skill_column)
+
+# Latest version of a workbook. The first load after start-up runs in the
+# background so the page is shown meanwhile; None is returned until it is done.
+def load_sheet_version(path, skill_column=None):
+    live = get_live_sheet(path, skill_column)
+    if live.current is None:
+        live.refresh_in_background()
+        return None
+    if live.changed():
+        with st.spinner("Loading data..."):
+            return live.refresh()
+    return live.current
+
+# Placeholder shown until both workbooks are loaded, rerunning the app as
+# soon as they are
+@st.fragment(run_every=0.5)
+def wait_for_sheets():
+    sheets = [get_live_sheet("candidates.xlsx", "Skills"), get_live_sheet("panel.xlsx", None)]
+    errors = [sheet.error for sheet in sheets if sheet.error is not None]
+    if errors:
+        st.error(f"Could not load data: {errors[0]}")
+    elif all(sheet.current is not None for sheet in sheets):
+        st.rerun()
+    else:
+        st.info("Loading candidate and panel data...")
+
+# Name shown for an email in the recipient selectors
+def display_name(index, email):
+    name = index.get(email, {}).get('Name')
+    return f"{name if pd.notna(name) else 'Unknown'} ({email})"
+
+# Groups and panels are stored on disk and shared by all sessions
+@st.cache_resource
+def get_store():
+    return Store(DB_PATH)
+
+store = get_store()
+
+# Function to generate Google Meet link
+def generate_meet_link():
+    # Generate a unique meeting ID
+    meeting_id = str(uuid.uuid4())[:8]
+    return f"https://meet.google.com/{meeting_id}"
+
+# Configuration section
+st.sidebar.title("Configuration Settings")
+
+# Parsed settings file, re-read only when the file changes
+@st.cache_data(max_entries=4)
+def load_cached_settings(signature):
+    with open("settings.json", "r") as file:
+        return json.load(file)
+
+# Load settings from JSON file
+def load_settings():
+    try:
+        return load_cached_settings(file_signature("settings.json"))
+    except FileNotFoundError:
+        return {}
+
+# Save settings to JSON file
+def save_settings(settings):
+    with open("settings.json", "w") as file:
+        json.dump(settings, file)
+
+# Load stored settings
+settings = load_settings()
+
+# Gmail Configuration in an expander
+with st.sidebar.expander("📧 Gmail Configuration", expanded=False):
+    st.markdown("""
+    ### Gmail Setup Instructions
+    1. Enable 2-Step Verification in your Google Account
+    2. Generate an App Password for this application
+    3. Use the App Password below instead of your regular password
+    """)
+    gmail_email = st.text_input("Your Gmail Address", settings.get("gmail_email", ""))
+    gmail_password = st.text_input("Your Gmail App Password", settings.get("gmail_password", ""), type="password")
+    smtp_server = st.text_input("SMTP Server", settings.get("smtp_server", "smtp.gmail.com"))
+    smtp_port = st.number_input("SMTP Port", settings.get("smtp_port", 587))
+    smtp_workers = st.number_input("Parallel Connections", min_value=1, max_value=20,
+                                   value=settings.get("smtp_workers", 4))
+    rate_per_minute = st.number_input("Max Emails per Minute (0 = unlimited)", min_value=0,
+                                      value=settings.get("rate_per_minute", 60))
+    rate_per_day = st.number_input("Max Emails per Day (0 = unlimited)", min_value=0,
+                                   value=settings.get("rate_per_day", 2000),
+                                   help="Gmail allows about 500 per day for personal accounts and 2000 for Workspace accounts")
+
+    # Save Configuration
+    if st.button("Save Gmail Settings"):
+        settings.update({
+            "gmail_email": gmail_email,
+            "gmail_password": gmail_password,
+            "smtp_server": smtp_server,
+            "smtp_port": smtp_port,
+            "smtp_workers": smtp_workers,
+            "rate_per_minute": rate_per_minute,
+            "rate_per_day": rate_per_day
+        })
+        save_settings(settings)
+        st.success("Gmail settings saved successfully!")
+
+# WhatsApp Configuration in an expander
+with st.sidebar.expander("📱 WhatsApp Configuration", expanded=False):
+    whatsapp_number = st.text_input("Your WhatsApp Number", settings.get("whatsapp_number", ""))
+    whatsapp_message = st.text_area("Default Message Template", settings.get("whatsapp_message", "Your interview details have been sent via email."))
+    
+    if st.button("Save WhatsApp Settings"):
+        settings.update({
+            "whatsapp_number": whatsapp_number,
+            "whatsapp_message": whatsapp_message
+        })
+        save_settings(settings)
+        st.success("WhatsApp settings saved successfully!")
+
+# Function to send WhatsApp message
+def send_whatsapp(phone, message):
+    try:
+        kit.sendwhatmsg_instantly(phone, message)
+        return "WhatsApp message sent successfully!"
+    except Exception as e:
+        return f"Error sending WhatsApp message: {e}"
+
+# Streamlit Main UI
+st.title("Interview Management System")
+
+# Tabs for different functionalities
+# Only the open tab is built; switching tabs reruns the app, and each tab
+# rebuilds its widgets with the values kept for them (see kept). Each tab
+# body is a fragment, so a widget change inside a tab reruns only that tab.
+# Changes other tabs depend on (new groups or panels) rerun the whole app
+# through rerun_app.
+tab1, tab2, tab3, tab4, tab5 = st.tabs(["Candidate Groups", "Panel Management", "Schedule Interviews",
+                                        "Send Custom Message", "Delivery Analytics"],
+                                       key="main_tab", on_change="rerun")
+# Time for the page shell to reach the browser, which Streamlit sends as
+# the script runs
+metrics.record("app.shell", perf_counter() - rerun_started)
+
+# Sending needs smtplib and email, so it is set up after the shell
+from interview.deliveries import MESSAGE, SCHEDULE, DeliveryLog
+from interview.mailer import RateLimiter, SMTPPool
+from interview.outbox import FAILED, QUEUED, SENDING, SENT, Outbox, OutboxWorker
+
+# Shared SMTP connection pool, kept authenticated across sends and sessions.
+# A pool pushed out of the cache (e.g. by changed settings) logs out.
+@st.cache_resource(max_entries=4, on_release=lambda pool: pool.close())
+def get_smtp_pool(server, port, username, password, size=1):
+    return SMTPPool(size=size, host=server, port=int(port), username=username, password=password)
+
+# One rate limiter per account, shared by every session sending from it.
+# It starts from the sends logged over the last day, so restarting the app
+# does not hand out a fresh daily quota; the quotas are set on each run.
+@st.cache_resource(max_entries=4)
+def get_rate_limiter(username):
+    return RateLimiter([], sent=get_delivery_log().attempt_times(datetime.now().timestamp() - 86400))
+
+# Turn a send exception into a message for the user
+def describe_send_error(error):
+    import smtplib
+
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return """Gmail Authentication Error: Please follow these steps:
+        1. Enable 2-Step Verification in your Google Account
+        2. Generate an App Password:
+           - Go to Google Account Settings
+           - Security → App Passwords
+           - Select 'Mail' and 'Other'
+           - Copy the generated 16-character password
+        3. Use this App Password in the sidebar settings
+        
+        For detailed instructions, visit: https://support.google.com/accounts/answer/185833"""
+    return f"Error sending email: {str(error)}"
+
+# Panel member bookings shared by all sessions, so no member is booked into
+# two interviews at once across schedules
+@st.cache_resource
+def get_bookings():
+    return Bookings(DB_PATH)
+
+# On-disk outbox shared by all sessions, drained by one background worker
+@st.cache_resource
+def get_outbox():
+    return Outbox(DB_PATH)
+
+# History of every send attempt, written by the outbox worker
+@st.cache_resource
+def get_delivery_log():
+    return DeliveryLog(DB_PATH)
+
+@st.cache_resource
+def get_outbox_worker():
+    return OutboxWorker(get_outbox(), describe_error=describe_send_error, log=get_delivery_log())
+
+def start_outbox_worker():
+    if gmail_email and gmail_password:
+        pool = get_smtp_pool(smtp_server, smtp_port, gmail_email, gmail_password, smtp_workers)
+        limiter = get_rate_limiter(gmail_email)
+        limiter.set_limits([(rate_per_minute, 60), (rate_per_day, 86400)])
+        get_outbox_worker().start(pool, limiter)
+
+# Batch a form submission (the tuple of its inputs) is queued under. The
+# same submission again, e.g. a second click or one that cut the first run
+# short, gets the same batch, so its messages are not queued twice; while
+# that batch is still being sent it is refused. Once it has been sent, the
+# same submission starts a new batch, e.g. to send a reminder again.
+# Returns None, with a warning, when the submission is refused.
+def submission_batch(batch_key, submission):
+    fingerprint = hashlib.sha256(repr(submission).encode("utf-8")).hexdigest()
+    previous = st.session_state.get(f"{batch_key}_submission")
+    if previous is not None and previous["fingerprint"] == fingerprint:
+        if not previous["queued"]:
+            return previous["batch_id"]
+        counts = get_outbox().batch_status(previous["batch_id"])
+        if counts[QUEUED] + counts[SENDING]:
+            st.warning("This was already submitted and is still being sent; its progress is shown below.")
+            return None
+    batch_id = uuid.uuid4().hex
+    st.session_state[f"{batch_key}_submission"] = {"fingerprint": fingerprint, "batch_id": batch_id, "queued": False}
+    return batch_id
+
+# Queue messages for background delivery and remember the batch under batch_key.
+# kind (SCHEDULE or MESSAGE) and the candidate group, if any, are recorded
+# with the batch in the delivery log.
+# Returns the number of newly queued messages, or None if Gmail is not configured.
+def queue_emails(batch_key, messages, count=None, batch_id=None, kind=MESSAGE, group=None):
+    if not gmail_email or not gmail_password:
+        st.error("Error: Please configure your Gmail settings in the sidebar first.")
+        return None
+    batch_id = batch_id or uuid.uuid4().hex
+    st.session_state[batch_key] = batch_id
+    queued = get_outbox().enqueue(batch_id, messages)
+    if queued:
+        get_delivery_log().start_batch(batch_id, kind, group, queued)
+    submission = st.session_state.get(f"{batch_key}_submission")
+    if submission is not None and submission["batch_id"] == batch_id:
+        submission["queued"] = True
+    start_outbox_worker()
+    count = len(messages) if count is None else count
+    if queued < count:
+        st.info(f"Skipped {count - queued} duplicate messages.")
+    return queued
+
+# Live progress of the last queued batch, refreshed without rerunning the page
+@st.fragment(run_every=2)
+def show_batch_status(batch_key):
+    batch_id = st.session_state.get(batch_key)
+    if not batch_id:
+        return
+    outbox = get_outbox()
+    counts = outbox.batch_status(batch_id)
+    total = sum(counts.values())
+    if not total:
+        return
+    waiting = counts[QUEUED] + counts[SENDING]
+    st.progress((total - waiting) / total)
+    if waiting:
+        retrying = outbox.batch_retrying(batch_id)
+        retry_note = f" ({retrying} to be retried after a temporary error)" if retrying else ""
+        st.text(f"Sent {counts[SENT]} of {total} emails, {waiting} waiting{retry_note}...")
+    elif counts[FAILED] == 0:
+        st.success(f"Successfully sent messages to all {total} recipients!")
+    else:
+        st.warning(f"Sent messages to {counts[SENT]} recipients. Failed to send to {counts[FAILED]} recipients.")
+    for recipients, error in outbox.batch_failures(batch_id):
+        st.error(f"Failed to send to {recipients}: {error}")
+    if counts[FAILED] and st.button("Retry failed", key=f"{batch_key}_retry"):
+        outbox.retry_failed(batch_id)
+        start_outbox_worker()
+
+# Resume delivery of anything left in the outbox by an earlier run
+if get_outbox().pending():
+    start_outbox_worker()
+
+
+# Cached frames and indexes are shared between sessions, so treat them as read-only
+candidate_sheet = load_sheet_version("candidates.xlsx", "Skills")
+panel_sheet = load_sheet_version("panel.xlsx")
+if candidate_sheet is None or panel_sheet is None:
+    wait_for_sheets()
+    st.stop()
+candidates_df, candidate_index = candidate_sheet.df, candidate_sheet.index
+panels_df, panel_index = panel_sheet.df, panel_sheet.index
+
+# Loading the sheets imported pandas already
+import pandas as pd
+from interview.grid import page_bounds
+
+# Tell the user about rows of a workbook the import left out, and list them.
+# Rows with an invalid or repeated email are likely mistakes and warned
+# about; rows with an empty email cell (e.g. blank rows) are only noted.
+def show_import_report(name, df):
+    report = df.attrs.get("import_report", {})
+    missing = report.get("missing_emails", 0)
+    invalid = report.get("invalid_emails", 0) - missing
+    duplicate = report.get("duplicate_emails", 0)
+    dropped = report.get("dropped", [])
+    if invalid or duplicate:
+        st.warning(f"{invalid + duplicate + missing} rows of {name} were left out: {invalid} with an invalid "
+                   f"email, {duplicate} repeating an email already in the sheet and {missing} without an email.")
+    elif missing:
+        st.caption(f"{missing} rows of {name} without an email were left out.")
+    else:
+        return
+    with st.expander(f"Rows left out of {name}"):
+        st.dataframe(pd.DataFrame(dropped, columns=["Row", "Email", "Reason"]), hide_index=True)
+        if len(dropped) < invalid + duplicate + missing:
+            st.caption(f"Showing the first {len(dropped)}.")
+
+show_import_report("candidates.xlsx", candidates_df)
+show_import_report("panel.xlsx", panels_df)
+
+# Rerun the whole app, showing a success message in the calling tab afterwards
+def rerun_app(tab, message):
+    st.session_state[f"{tab}_message"] = message
+    st.rerun()
+
+# Show the message left by rerun_app for a tab
+def show_tab_message(tab):
+    message = st.session_state.pop(f"{tab}_message", None)
+    if message:
+        st.success(message)
+
+# Only the open tab's widgets are built, and Streamlit forgets the state of
+# widgets it did not build. Tab widgets therefore keep their last value in
+# the session and are built with it, so a tab shows what was entered when
+# it is opened again. They need a key, which keeps the widget the same
+# while the value passed to it changes.
+def kept(key, default):
+    return st.session_state.setdefault("kept_widgets", {}).get(key, default)
+
+def keep(key, value):
+    st.session_state.setdefault("kept_widgets", {})[key] = value
+    return value
+
+# Index of the kept choice among the options of a selectbox or radio
+def kept_index(key, options, default=0):
+    choice = kept(key, None)
+    return options.index(choice) if choice in options else default
+
+# Kept choices of a multiselect that are still among its options
+def kept_choices(key, options, default=()):
+    available = set(options)
+    return [choice for choice in kept(key, default) if choice in available]
+
+# Rows per page offered for tables; only the visible page is sent to the browser
+PAGE_SIZES = [25, 50, 100, 250]
+
+# Show one page of a frame with a page selector
+def show_paged_frame(df, key, page_size=PAGE_SIZES[1]):
+    start, stop, pages = page_bounds(len(df), 1, page_size)
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=f"{key}_page_{pages}")
+    start, stop, pages = page_bounds(len(df), page, page_size)
+    with span("ui.dataframe"):
+        st.dataframe(df.iloc[start:stop], hide_index=True)
+    if pages > 1:
+        st.caption(f"Rows {start + 1}-{stop} of {len(df)}")
+
+# Start a fresh candidate table so its checkboxes show the selection after
+# it was changed in bulk
+def reset_candidate_editor():
+    st.session_state.candidate_editor_version = st.session_state.get('candidate_editor_version', 0) + 1
+
+# Bring this session up to date with the latest candidate sheet. A session
+# only keeps a cursor (the version it saw and its selection bitmap); moving
+# it carries the selection over by email and tells what changed meanwhile.
+def sync_candidate_sheet(version):
+    cursor = st.session_state.get('candidate_cursor')
+    if cursor is None:
+        cursor = st.session_state.candidate_cursor = get_live_sheet("candidates.xlsx", "Skills").cursor()
+    if cursor.number == version.number:
+        return cursor
+    first_visit = cursor.number is None
+    diff = cursor.move(version)
+    if not first_visit:
+        reset_candidate_editor()
+        if diff is None or diff.added or diff.changed or diff.removed:
+            st.session_state.candidate_sheet_changes = diff
+    return cursor
+
+# Summary of the last change to the candidate sheet, until dismissed
+def show_candidate_sheet_changes():
+    if 'candidate_sheet_changes' not in st.session_state:
+        return
+    diff = st.session_state.candidate_sheet_changes
+    with st.sidebar.expander("🔄 candidates.xlsx was updated", expanded=True):
+        if diff is None:
+            st.write("The sheet was reloaded.")
+        else:
+            st.write(f"{len(diff.added)} added, {len(diff.changed)} changed, {len(diff.removed)} removed.")
+            for label, emails in (("Added", diff.added), ("Changed", diff.changed), ("Removed", diff.removed)):
+                if emails:
+                    more = f" and {len(emails) - 20} more" if len(emails) > 20 else ""
+                    st.caption(f"{label}: {', '.join(emails[:20])}{more}")
+        if st.button("Dismiss", key="dismiss_sheet_changes"):
+            del st.session_state.candidate_sheet_changes
+            st.rerun()
+
+# Rerun when either workbook changes on disk, so open sessions pick up
+# edits without a manual reload
+@st.fragment(run_every=10)
+def watch_sheets():
+    if get_live_sheet("candidates.xlsx", "Skills").changed() or get_live_sheet("panel.xlsx", None).changed():
+        st.rerun()
+
+candidate_cursor = sync_candidate_sheet(candidate_sheet)
+show_candidate_sheet_changes()
+watch_sheets()
+
+# Candidate Groups Tab
+@st.fragment
+@timed("tab.candidate_groups")
+def candidate_groups_tab():
+    st.header("Candidate Groups Management")
+    show_tab_message("groups")
+    
+    # Create new group
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        new_group_name = keep("groups_new_name", st.text_input(
+            "Enter New Group Name", kept("groups_new_name", ""), key="groups_new_name"))
+    with col2:
+        if st.button("Create Group"):
+            if new_group_name:
+                if store.create_group(new_group_name):
+                    rerun_app("groups", f"Group '{new_group_name}' created successfully!")
+            else:
+                st.error("Please enter a group name")
+
+    # Select group to manage
+    group_names = store.group_names()
+    if group_names:
+        selected_group = keep("groups_selected", st.selectbox(
+            "Select Group to Manage", group_names, kept_index("groups_selected", group_names),
+            key="groups_selected"))
+        
+        # Enhanced candidate selection
+        st.subheader("Add Candidates to Group")
+        
+        # Selection is a bitmap of candidate row positions, kept on the
+        # session's cursor so it follows the sheet when it changes
+        selection = candidate_cursor.selection
+        
+        # Selection options in columns
+        col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+        with col1:
+            range_input = keep("groups_range", st.text_input(
+                "Enter range (e.g., 1-5) or specific numbers (e.g., 1,3,5)", kept("groups_range", ""),
+                key="groups_range"))
+        with col2:
+            if st.button("Select Range"):
+                if range_input:
+                    try:
+                        if '-' in range_input:
+                            start, end = map(int, range_input.split('-'))
+                            indices = range(start-1, end)
+                        else:
+                            indices = [int(i)-1 for i in range_input.split(',')]
+                        selection.add(list(indices))
+                        reset_candidate_editor()
+                    except:
+                        st.error("Invalid range format")
+        with col3:
+            if st.button("Select All"):
+                selection.select_all()
+                reset_candidate_editor()
+        with col4:
+            if st.button("Clear Selection"):
+                selection.clear()
+                reset_candidate_editor()
+        
+        # Filter candidates by name, skills and experience; filtering runs on
+        # the server against the cached index
+        grid = candidate_sheet.grid
+        col1, col2, col3 = st.columns([2, 2, 1])
+        with col1:
+            name_query = keep("groups_name_query", st.text_input(
+                "Filter by name", kept("groups_name_query", ""), key="groups_name_query"))
+        with col2:
+            skills_query = keep("groups_skills_query", st.text_input(
+                "Filter by skills (e.g., Python, SQL)", kept("groups_skills_query", ""), key="groups_skills_query"))
+        with col3:
+            match_all_skills = keep("groups_all_skills", st.checkbox(
+                "Require all skills", kept("groups_all_skills", False), key="groups_all_skills"))
+        years = None
+        years_range = grid.years_range()
+        if years_range and years_range[0] < years_range[1]:
+            # Kept years outside the range of a changed sheet start over
+            chosen_years = kept("groups_years", years_range)
+            if not years_range[0] <= chosen_years[0] <= chosen_years[1] <= years_range[1]:
+                chosen_years = years_range
+            chosen_years = keep("groups_years", st.slider(
+                "Years of experience", years_range[0], years_range[1], chosen_years, key="groups_years"))
+            if chosen_years != years_range:
+                years = chosen_years
+        rows = grid.filter(name_query, skills_query, match_all_skills, years)
+        
+        col1, col2, col3 = st.columns([1, 1, 2])
+        with col1:
+            page_size = keep("groups_page_size", st.selectbox(
+                "Rows per page", PAGE_SIZES, kept_index("groups_page_size", PAGE_SIZES, 1), key="groups_page_size"))
+        start, stop, pages = page_bounds(len(rows), 1, page_size)
+        with col2:
+            page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1,
+                                   key=f"candidate_page_{pages}")
+        with col3:
+            if st.button(f"Select Matching ({len(rows)})"):
+                selection.add(rows)
+                reset_candidate_editor()
+                st.success(f"Selected {len(rows)} matching candidates")
+        start, stop, pages = page_bounds(len(rows), page, page_size)
+        
+        # Display one page of candidates with individual checkboxes
+        page_rows = rows[start:stop]
+        page_df = candidates_df.iloc[page_rows].assign(Selected=selection.contains(page_rows))
+        editor_key = hash((st.session_state.get('candidate_editor_version', 0), name_query, skills_query,
+                           match_all_skills, years, page, page_size))
+        with span("ui.dataframe"):
+            edited = st.data_editor(
+                page_df,
+                key=f"candidate_editor_{editor_key}",
+                disabled=[column for column in page_df.columns if column != "Selected"],
+                column_config={
+                    "Selected": st.column_config.CheckboxColumn(
+                        "Select",
+                        help="Select candidate",
+                        default=False
+                    ),
+                    "Name": st.column_config.TextColumn("Name"),
+                    "Email": st.column_config.TextColumn("Email"),
+                    "Skills": st.column_config.TextColumn("Skills"),
+                    "Experience": st.column_config.TextColumn("Experience")
+                },
+                hide_index=True
+            )
+        checked = edited['Selected'].to_numpy(dtype=bool)
+        selection.add(page_rows[checked])
+        selection.discard(page_rows[~checked])
+        st.caption(f"{len(selection)} selected. Showing {start + 1 if len(rows) else 0}-{stop} "
+                   f"of {len(rows)} matching candidates.")
+        
+        # Add selected candidates to group
+        if st.button("Add Selected to Group"):
+            selected_candidates = candidates_df['Email'].iloc[selection.rows()].tolist()
+            if selected_candidates:
+                # Existing members are skipped by the store
+                store.add_group_members(selected_group, selected_candidates)
+                # Clear selection after adding
+                selection.clear()
+                reset_candidate_editor()
+                rerun_app("groups", f"Added {len(selected_candidates)} candidates to group!")
+            else:
+                st.warning("No candidates selected")
+        
+        # Display group members
+        current_members = store.group_members(selected_group)
+        if current_members:
+            st.subheader("Current Group Members")
+            group_members = candidates_df[candidates_df['Email'].isin(current_members)]
+            
+            # Display group members with remove option
+            show_paged_frame(group_members, "group_members")
+            
+            # Option to remove members
+            members_to_remove = st.multiselect(
+                "Select members to remove from group",
+                group_members['Email'].tolist()
+            )
+            if st.button("Remove Selected Members"):
+                if members_to_remove:
+                    store.remove_group_members(selected_group, members_to_remove)
+                    st.success(f"Removed {len(members_to_remove)} members from the group")
+                    st.rerun(scope="fragment")
+
+if tab1.open:
+    with tab1:
+        candidate_groups_tab()
+
+# Panel Management Tab
+@st.fragment
+@timed("tab.panel_management")
+def panel_management_tab():
+    st.header("Panel Management")
+    show_tab_message("panels")
+    
+    # Display available panel members
+    st.subheader("Available Panel Members")
+    show_paged_frame(panels_df, "available_panel_members")
+    
+    # Create interview panel
+    st.subheader("Create Interview Panel")
+    selected_panel_members = keep("panels_members", st.multiselect(
+        "Select Panel Members",
+        panel_sheet.emails(),
+        kept_choices("panels_members", panel_sheet.emails()),
+        key="panels_members"
+    ))
+    
+    panel_name = keep("panels_name", st.text_input("Enter Panel Name", kept("panels_name", ""), key="panels_name"))
+    if st.button("Create Panel") and panel_name and selected_panel_members:
+        store.save_panel(panel_name, selected_panel_members)
+        rerun_app("panels", f"Panel '{panel_name}' created with {len(selected_panel_members)} members!")
+    
+    # Display existing panels
+    existing_panels = store.panels()
+    if existing_panels:
+        st.subheader("Existing Panels")
+        for panel, members in existing_panels.items():
+            with st.expander(f"Panel: {panel}"):
+                st.write("Members:", ", ".join(members))
+
+if tab2.open:
+    with tab2:
+        panel_management_tab()
+
+# Schedule Interviews Tab
+@st.fragment
+@timed("tab.schedule_interviews")
+def schedule_interviews_tab():
+    from interview.workflow import (candidate_constraints, candidate_schedule_messages, panel_schedule_messages,
+                                    schedule_body, skill_based_panels, slot_time_format)
+
+    st.header("Schedule Interviews")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Select group
+        group_names = store.group_names()
+        group_options = group_names if group_names else ["No groups created"]
+        interview_group = keep("schedule_group", st.selectbox("Select Candidate Group", 
+            group_options, kept_index("schedule_group", group_options), key="schedule_group"))
+        
+        # Select panels; interviews run in parallel across them
+        panel_names = store.panel_names()
+        interview_panels = keep("schedule_panels", st.multiselect("Select Interview Panels", panel_names,
+            default=kept_choices("schedule_panels", panel_names, panel_names[:1]), key="schedule_panels",
+            help="Candidates are spread across the selected panels, which interview in parallel"))
+    
+    with col2:
+        # Schedule details
+        interview_date = keep("schedule_date", st.date_input(
+            "Select Interview Date", kept("schedule_date", "today"), key="schedule_date"))
+        start_time = keep("schedule_start", st.time_input(
+            "Select Start Time", value=kept("schedule_start", time(9, 0)), key="schedule_start"))
+        end_time = keep("schedule_end", st.time_input(
+            "Select End Time", value=kept("schedule_end", time(17, 0)), key="schedule_end",
+            help="Interviews that do not fit before this time continue on the next day"))
+        duration = keep("schedule_duration", st.number_input(
+            "Interview Duration (minutes)", min_value=15, value=kept("schedule_duration", 30),
+            key="schedule_duration"))
+        weekdays = keep("schedule_weekdays", st.multiselect(
+            "Interview Days", WEEKDAYS, kept_choices("schedule_weekdays", WEEKDAYS,
+                                                     [WEEKDAYS[day] for day in sorted(WORKDAYS)]),
+            key="schedule_weekdays", help="Interviews that do not fit on one day continue on the next of these days"))
+        include_break = keep("schedule_break", st.checkbox(
+            "Include a daily break", kept("schedule_break", False), key="schedule_break"))
+        breaks = []
+        if include_break:
+            break_col1, break_col2 = st.columns(2)
+            with break_col1:
+                break_start = keep("schedule_break_start", st.time_input(
+                    "Break Start", value=kept("schedule_break_start", time(13, 0)), key="schedule_break_start"))
+            with break_col2:
+                break_end = keep("schedule_break_end", st.time_input(
+                    "Break End", value=kept("schedule_break_end", time(14, 0)), key="schedule_break_end"))
+            breaks = [(break_start, break_end)]
+        match_by_skills = keep("schedule_by_skills", st.checkbox("Match candidates to panels by skills",
+            kept("schedule_by_skills", False), key="schedule_by_skills",
+            help="Send each candidate to the panels whose members' expertise best matches their skills"))
+    
+    # Free time of the selected panels on the chosen day, around the
+    # interviews their members are already booked for
+    hours = WorkingHours(interview_date, start_time, end_time, breaks, [WEEKDAYS.index(day) for day in weekdays])
+    if interview_panels and start_time < end_time:
+        with st.expander("Panel Availability"):
+            availability = get_bookings().index()
+            if not hours.works_on(interview_date):
+                st.write(f"No interviews take place on {interview_date:%A}s; they start on the next interview day.")
+            for panel in interview_panels if hours.works_on(interview_date) else ():
+                free = availability.free_slots(store.panel_members(panel), hours, interview_date,
+                                               timedelta(minutes=duration))
+                st.write(f"**{panel}**: " + (", ".join(f"{start:%H:%M}-{end:%H:%M}" for start, end in free)
+                                              or "fully booked"))
+    
+    # Google Meet Link
+    col1, col2 = st.columns(2)
+    with col1:
+        meet_link = keep("schedule_meet_link", st.text_input(
+            "Meeting Link (Optional)",
+            kept("schedule_meet_link", ""),
+            key="schedule_meet_link",
+            placeholder="Enter your meeting link (Google Meet, Zoom, etc.)",
+            help="Enter any meeting link (Google Meet, Zoom, etc.)"
+        ))
+    # Message input moved outside the column as per instructions
+    message = keep("schedule_message", st.text_area(
+        "Message (Optional)",
+        kept("schedule_message", ""),
+        key="schedule_message",
+        placeholder="Enter your message here",
+        height=200,
+        help="Enter any custom message for the interview. This box is large for longer messages."
+    ))
+    # Members of the group who already have interviews coming up are only
+    # scheduled again once confirmed
+    booked = []
+    if interview_group in group_names:
+        booked = get_bookings().booked_candidates(store.group_members(interview_group), datetime.now())
+    schedule_again = False
+    if booked:
+        st.warning(f"{len(booked)} members of {interview_group} already have interviews booked, "
+                   f"e.g. {', '.join(booked[:5])}.")
+        schedule_again = keep("schedule_again", st.checkbox(
+            "Schedule them again", kept("schedule_again", False), key="schedule_again"))
+    if st.button("Schedule Interviews"):
+        batch_id = None
+        if interview_group in group_names and interview_panels:
+            if booked and not schedule_again:
+                st.error("Confirm scheduling the members who already have interviews booked first.")
+            else:
+                batch_id = submission_batch("schedule_batch", (
+                    interview_group, tuple(interview_panels), interview_date, start_time, end_time, duration,
+                    tuple(breaks), tuple(weekdays), match_by_skills, meet_link, message))
+        else:
+            st.error("Please create both groups and panels before scheduling interviews.")
+        if batch_id is not None:
+            # A submission repeated after its run was cut short is booked anew
+            get_bookings().cancel(batch_id)
+            candidates = store.group_members(interview_group)
+            panels = {panel: store.panel_members(panel) for panel in interview_panels}
+            # Existing bookings of the panel members are kept free
+            busy = get_bookings().index().panel_busy(panels, datetime.combine(interview_date, start_time))
+            allowed_panels = None
+            if match_by_skills:
+                allowed_panels = skill_based_panels(candidates_df, candidate_sheet.skill_index,
+                                                    panel_index, panels, candidates)
+            try:
+                slots, unscheduled = schedule(candidates, interview_panels, hours, duration, busy=busy,
+                                              constraints=candidate_constraints(candidate_index, candidates),
+                                              allowed_panels=allowed_panels, members=panels)
+            except ValueError as e:
+                st.error(str(e))
+                slots, unscheduled = [], []
+            
+            time_format = slot_time_format(slots, interview_date)
+            
+            # Candidate emails are rendered lazily while they are queued;
+            # each panel gets one email with its whole schedule
+            candidate_emails = candidate_schedule_messages(gmail_email, candidates_df, slots,
+                                                           schedule_body(duration, message), meet_link)
+            panel_emails = panel_schedule_messages(gmail_email, candidate_index, slots, panels,
+                                                   interview_date, meet_link, batch_id)
+            
+            if slots:
+                st.subheader("Interview Schedule")
+                with span("ui.dataframe"):
+                    st.dataframe(
+                        pd.DataFrame({
+                            "Time": [slot.start.strftime(time_format) for slot in slots],
+                            "Panel": [slot.panel for slot in slots],
+                            "Candidate": [slot.candidate for slot in slots],
+                        }),
+                        hide_index=True
+                    )
+            if unscheduled:
+                st.warning(f"Could not fit {len(unscheduled)} candidates within their availability: {', '.join(unscheduled)}")
+            
+            # Book the panel members, then queue all notifications; they are
+            # delivered in the background
+            if slots:
+                conflicts = get_bookings().book(batch_id, slots, panels)
+                if conflicts:
+                    st.error(f"{len(conflicts)} slots were booked by another schedule meanwhile, "
+                             f"e.g. {conflicts[0][0]} at {conflicts[0][1].start:%Y-%m-%d %H:%M}. "
+                             "Please schedule again.")
+                elif queue_emails("schedule_batch", itertools.chain(candidate_emails, panel_emails),
+                                  len(slots) + len(panel_emails), batch_id,
+                                  kind=SCHEDULE, group=interview_group) is not None:
+                    st.success("All interviews scheduled and notifications queued!")
+                else:
+                    # Nothing will be sent, so release the panel members again
+                    get_bookings().cancel(batch_id)
+    
+    show_batch_status("schedule_batch")
+
+if tab3.open:
+    with tab3:
+        schedule_interviews_tab()
+
+# Custom Message Tab
+@st.fragment
+@timed("tab.custom_message")
+def custom_message_tab():
+    from interview.templating import render_messages, rows_for_emails
+
+    st.header("Send Custom Message")
+    
+    # Use columns for recipient type and sending mode selection
+    col1, col2 = st.columns(2)
+    with col1:
+        recipient_types = ["Candidate", "Panel Member"]
+        recipient_type = keep("message_recipient_type", st.radio(
+            "Select Recipient Type", recipient_types, kept_index("message_recipient_type", recipient_types),
+            key="message_recipient_type"))
+    with col2:
+        sending_modes = ["Single Recipient", "Multiple Recipients", "All Recipients"]
+        sending_mode = keep("message_sending_mode", st.radio(
+            "Select Sending Mode", sending_modes, kept_index("message_sending_mode", sending_modes),
+            key="message_sending_mode"))
+    
+    recipients = []
+    if recipient_type == "Candidate":
+        if sending_mode == "Single Recipient":
+            # Single candidate selection
+            selected_candidate = keep("message_candidate", st.selectbox(
+                "Select Candidate",
+                candidate_sheet.emails(),
+                kept_index("message_candidate", candidate_sheet.emails()),
+                key="message_candidate",
+                format_func=lambda x: display_name(candidate_index, x)
+            ))
+            if selected_candidate:
+                recipients = [selected_candidate]
+                candidate_details = candidate_index.get(selected_candidate, {})
+                with st.expander("View Candidate Details"):
+                    st.write(f"Name: {candidate_details.get('Name', 'N/A')}")
+                    st.write(f"Email: {candidate_details.get('Email', 'N/A')}")
+                    st.write(f"Skills: {candidate_details.get('Skills', 'N/A')}")
+                    st.write(f"Experience: {candidate_details.get('Experience', 'N/A')}")
+        
+        elif sending_mode == "Multiple Recipients":
+            # Multiple candidates selection
+            selected_candidates = keep("message_candidates", st.multiselect(
+                "Select Candidates",
+                candidate_sheet.emails(),
+                kept_choices("message_candidates", candidate_sheet.emails()),
+                key="message_candidates",
+                format_func=lambda x: display_name(candidate_index, x)
+            ))
+            recipients = selected_candidates
+            if selected_candidates:
+                with st.expander("View Selected Candidates Details"):
+                    for candidate in selected_candidates:
+                        candidate_details = candidate_index.get(candidate, {})
+                        st.write("---")
+                        st.write(f"Name: {candidate_details.get('Name', 'N/A')}")
+                        st.write(f"Email: {candidate_details.get('Email', 'N/A')}")
+                        st.write(f"Skills: {candidate_details.get('Skills', 'N/A')}")
+                        st.write(f"Experience: {candidate_details.get('Experience', 'N/A')}")
+        
+        else:  # All Recipients
+            recipients = candidate_sheet.emails()
+            with st.expander(f"View All Candidates ({len(recipients)})"):
+                show_paged_frame(candidates_df, "all_candidates")
+    
+    else:  # Panel Member
+        if sending_mode == "Single Recipient":
+            # Single panel member selection
+            selected_panel_member = keep("message_panel_member", st.selectbox(
+                "Select Panel Member",
+                panel_sheet.emails(),
+                kept_index("message_panel_member", panel_sheet.emails()),
+                key="message_panel_member",
+                format_func=lambda x: display_name(panel_index, x)
+            ))
+            if selected_panel_member:
+                recipients = [selected_panel_member]
+                panel_details = panel_index.get(selected_panel_member, {})
+                with st.expander("View Panel Member Details"):
+                    st.write(f"Name: {panel_details.get('Name', 'N/A')}")
+                    st.write(f"Email: {panel_details.get('Email', 'N/A')}")
+                    st.write(f"Expertise: {panel_details.get('Expertise', 'N/A')}")
+        
+        elif sending_mode == "Multiple Recipients":
+            # Multiple panel members selection
+            selected_panel_members = keep("message_panel_members", st.multiselect(
+                "Select Panel Members",
+                panel_sheet.emails(),
+                kept_choices("message_panel_members", panel_sheet.emails()),
+                key="message_panel_members",
+                format_func=lambda x: display_name(panel_index, x)
+            ))
+            recipients = selected_panel_members
+            if selected_panel_members:
+                with st.expander("View Selected Panel Members Details"):
+                    for member in selected_panel_members:
+                        panel_details = panel_index.get(member, {})
+                        st.write("---")
+                        st.write(f"Name: {panel_details.get('Name', 'N/A')}")
+                        st.write(f"Email: {panel_details.get('Email', 'N/A')}")
+                        st.write(f"Expertise: {panel_details.get('Expertise', 'N/A')}")
+        
+        else:  # All Recipients
+            recipients = panel_sheet.emails()
+            with st.expander(f"View All Panel Members ({len(recipients)})"):
+                show_paged_frame(panels_df, "all_panel_members")
+
+    # Show number of selected recipients
+    if recipients:
+        st.info(f"Selected Recipients: {len(recipients)}")
+
+    # Message composition
+    st.subheader("Compose Message")
+    message_subject = keep("message_subject", st.text_input(
+        "Subject", kept("message_subject", ""), key="message_subject"))
+    
+    # Add personalized greeting option for candidates
+    if recipient_type == "Candidate":
+        use_personalized_greeting = keep("message_greeting", st.checkbox(
+            "Use personalized greeting (Dear [Name])", value=kept("message_greeting", True), key="message_greeting"))
+    else:
+        use_personalized_greeting = False
+    
+    message_body = keep("message_body", st.text_area("Message Body", kept("message_body", ""), height=200,
+                               key="message_body",
+                               placeholder="Enter your message here. Use [NAME] as a placeholder for the recipient's name if you want personalized greetings. "
+                                           "[SKILLS], [MEET_LINK] or any other sheet column in brackets are filled in the same way."))
+    
+    # Add meeting link option
+    meeting_link = ""
+    include_meeting_link = keep("message_include_link", st.checkbox(
+        "Include Meeting Link", kept("message_include_link", False), key="message_include_link"))
+    if include_meeting_link:
+        meeting_link = keep("message_meeting_link", st.text_input(
+            "Meeting Link", kept("message_meeting_link", ""), key="message_meeting_link"))
+        if meeting_link:
+            message_body = f"{message_body}\n\nMeeting Link: {meeting_link}"
+    
+    # Send button; progress is tracked from the outbox
+    if st.button("Send Message"):
+        if not message_subject or not message_body:
+            st.error("Please enter both subject and message body")
+        elif not recipients:
+            st.error("Please select at least one recipient")
+        else:
+            # Personalize all messages in one pass over the sheet; messages
+            # are rendered lazily while they are written to the outbox
+            template = message_body
+            if use_personalized_greeting and '[NAME]' not in message_body:
+                template = f"Dear [NAME],\n\n{message_body}"
+            if recipient_type == "Candidate":
+                rows = rows_for_emails(candidates_df, recipients)
+                defaults = {"NAME": "Candidate"}
+            else:
+                rows = rows_for_emails(panels_df, recipients)
+                defaults = {"NAME": "Panel Member"}
+            batch_id = submission_batch("message_batch", (recipient_type, tuple(recipients), message_subject,
+                                                           template, meeting_link))
+            if batch_id is not None:
+                emails = render_messages(gmail_email, message_subject, template, rows,
+                                         values={"MEET_LINK": meeting_link}, defaults=defaults)
+                queue_emails("message_batch", emails, len(rows), batch_id)
+    
+    show_batch_status("message_batch")
+
+if tab4.open:
+    with tab4:
+        custom_message_tab()
+
+# Delivery Analytics Tab
+@st.fragment
+@timed("tab.delivery_analytics")
+def delivery_analytics_tab():
+    st.header("Delivery Analytics")
+    log = get_delivery_log()
+
+    # Rates and latencies come from totals the log keeps per batch, and only
+    # the page of batches on screen is read, however long the history
+    col1, col2 = st.columns(2)
+    with col1:
+        groups = ["All groups"] + log.groups()
+        group = keep("delivery_group", st.selectbox(
+            "Candidate Group", groups, kept_index("delivery_group", groups), key="delivery_group"))
+    with col2:
+        kinds = ["All", SCHEDULE, MESSAGE]
+        kind = keep("delivery_kind", st.selectbox(
+            "Batch Type", kinds, kept_index("delivery_kind", kinds), key="delivery_kind",
+            format_func=str.capitalize))
+    group = None if group == "All groups" else group
+    kind = None if kind == "All" else kind
+
+    batches, queued, sent, failed, deferred, latency_mean, latency_max = log.totals(group, kind)
+    if not batches:
+        st.info("No notifications have been sent yet.")
+        return
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Delivery Rate", f"{sent / queued:.1%}" if queued else "-")
+    col2.metric("Delivered", f"{sent} of {queued}")
+    col3.metric("Failed", failed, help=f"{deferred} attempts failed temporarily and were retried")
+    col4.metric("Mean Latency", f"{latency_mean:.1f} s" if latency_mean is not None else "-",
+                help="Time from queueing to delivery")
+
+    # One page of batches, newest first
+    start, stop, pages = page_bounds(batches, 1, PAGE_SIZES[1])
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1,
+                               key=f"delivery_page_{pages}")
+    start, stop, pages = page_bounds(batches, page, PAGE_SIZES[1])
+    summaries = log.batches(group, kind, stop - start, start)
+    with span("ui.dataframe"):
+        st.dataframe(
+            pd.DataFrame({
+                "Queued At": [datetime.fromtimestamp(batch.created_at) for batch in summaries],
+                "Type": [batch.kind for batch in summaries],
+                "Group": [batch.group for batch in summaries],
+                "Queued": [batch.queued for batch in summaries],
+                "Sent": [batch.sent for batch in summaries],
+                "Failed": [batch.failed for batch in summaries],
+                "Retried": [batch.deferred for batch in summaries],
+                "Delivery Rate": [100 * batch.sent / batch.queued if batch.queued else None for batch in summaries],
+                "Mean Latency": [batch.latency_mean for batch in summaries],
+                "Max Latency": [batch.latency_max if batch.sent else None for batch in summaries],
+            }),
+            column_config={
+                "Queued At": st.column_config.DatetimeColumn("Queued At", format="YYYY-MM-DD HH:mm"),
+                "Delivery Rate": st.column_config.NumberColumn("Delivery Rate", format="%.1f%%"),
+                "Mean Latency": st.column_config.NumberColumn("Mean Latency", format="%.1f s"),
+                "Max Latency": st.column_config.NumberColumn("Max Latency", format="%.1f s"),
+            },
+            hide_index=True
+        )
+    if pages > 1:
+        st.caption(f"Batches {start + 1}-{stop} of {batches}")
+
+    # Latency percentiles and errors of one batch
+    labels = {batch.batch_id: f"{datetime.fromtimestamp(batch.created_at):%Y-%m-%d %H:%M} "
+                              f"{batch.kind} {batch.group or ''}" for batch in summaries}
+    batch_ids = list(labels)
+    batch_id = keep("delivery_batch", st.selectbox(
+        "Batch Details", batch_ids, kept_index("delivery_batch", batch_ids), key="delivery_batch",
+        format_func=labels.get))
+    percentiles = log.latency_percentiles(batch_id)
+    if percentiles:
+        col1, col2, col3 = st.columns(3)
+        for column, (share, seconds) in zip((col1, col2, col3), percentiles.items()):
+            column.metric(f"p{int(share * 100)} Latency", f"{seconds:.1f} s")
+    errors = log.errors(batch_id)
+    if errors:
+        st.dataframe(pd.DataFrame(errors, columns=["Error", "SMTP Code", "Attempts", "Recipients"]), hide_index=True)
+
+    # Members of the group no schedule email was delivered to
+    if group is not None:
+        reached = log.reached(group)
+        missing = [email for email in store.group_members(group) if email not in reached]
+        if missing:
+            st.warning(f"{len(missing)} members of {group} have not received a schedule email.")
+            show_paged_frame(pd.DataFrame({
+                "Email": missing,
+                "Name": [candidate_index.get(email, {}).get("Name", "") for email in missing],
+            }), "not_reached")
+        elif store.group_members(group):
+            st.success(f"Every member of {group} has received a schedule email.")
+
+    # Every attempt to reach one recipient
+    recipient = keep("delivery_recipient", st.text_input(
+        "Look Up Recipient", kept("delivery_recipient", ""), key="delivery_recipient", placeholder="Email address"))
+    if recipient:
+        history = log.history(recipient.strip())
+        if history:
+            history = pd.DataFrame(history, columns=["Time", "Batch", "Type", "Group", "Status", "Attempt",
+                                                     "SMTP Code", "Error", "Latency"])
+            history["Time"] = history["Time"].map(datetime.fromtimestamp)
+            st.dataframe(history, hide_index=True)
+        else:
+            st.info(f"Nothing was sent to {recipient}.")
+
+if tab5.open:
+    with tab5:
+        delivery_analytics_tab()
+
+# Timings and counters of this server process, to find where a slow page
+# spends its time
+metrics.record("app.rerun", perf_counter() - rerun_started)
+with st.sidebar.expander("Performance", expanded=False):
+    snapshot = metrics.snapshot()
+    if snapshot["spans"]:
+        spans = pd.DataFrame.from_dict(snapshot["spans"], orient="index")
+        spans[["p50", "p95", "p99", "max"]] *= 1000
+        st.dataframe(spans[["count", "p50", "p95", "p99", "max", "total"]].rename(columns={
+            "p50": "p50 ms", "p95": "p95 ms", "p99": "p99 ms", "max": "max ms", "total": "total s"}).round(2))
+    if snapshot["counters"]:
+        st.dataframe(pd.Series(snapshot["counters"], name="value"))
+    # Sessions share one copy of the sheet; older versions are kept only as
+    # keys and row hashes while some session has not moved on from them
+    references = get_live_sheet("candidates.xlsx", "Skills").references()
+    st.caption(f"candidates.xlsx version {candidate_sheet.number}: {references.get(candidate_sheet.number, 0)} "
+               f"sessions, {len(references)} versions referenced")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("JSON lines", metrics.to_jsonl, "interview-metrics.jsonl", mime="application/jsonl")
+    with col2:
+        st.download_button("Prometheus", metrics.to_prometheus, "interview.prom", mime="text/plain")
+    if st.button("Reset metrics"):
+        metrics.reset()
+
+# Show warning if Gmail not configured
+if not gmail_email or not gmail_password:
+    st.sidebar.warning("⚠️ Please configure your Gmail settings to enable email notifications")
+
 st.write("Note: Make sure your Gmail settings are configured correctly in the sidebar.")
\ No newline at end of file
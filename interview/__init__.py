@@ -0,0 +1,3 @@
+# Core logic for the Interview Management System.
+# Modules in this package must not import Streamlit so they can be reused
+# outside the app.
@@ -0,0 +1,224 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+from interview.db import Database
+from interview.metrics import incr, span
+from interview.scheduler import Calendar
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bookings (
+    id INTEGER PRIMARY KEY,
+    batch_id TEXT NOT NULL,
+    member TEXT NOT NULL,
+    panel TEXT NOT NULL,
+    candidate TEXT NOT NULL,
+    start_at TEXT NOT NULL,
+    end_at TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bookings_member ON bookings (member, start_at);
+CREATE INDEX IF NOT EXISTS bookings_batch ON bookings (batch_id);
+CREATE INDEX IF NOT EXISTS bookings_end ON bookings (end_at);
+CREATE TABLE IF NOT EXISTS bookings_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO bookings_version (id, version) VALUES (1, 0);
+"""
+
+
+def _text(moment):
+    return moment.isoformat(sep=" ")
+
+
+# Booked intervals of every panel member, merged and sorted per member so
+# each query is a binary search into the members it asks about. Only
+# bookings ending after since are held (all of them when since is None):
+# the index answers questions about the time still to come.
+class AvailabilityIndex:
+    def __init__(self, bookings=(), since=None):
+        intervals = {}
+        for member, start, end in bookings:
+            intervals.setdefault(member, []).append((start, end))
+        self.calendars = {member: Calendar(member_intervals) for member, member_intervals in intervals.items()}
+        self.since = since
+
+    # Copy with the given members' bookings replaced by the given
+    # intervals, sharing the other members' calendars. An index is never
+    # modified once built, as readers may be using it.
+    def replaced(self, intervals):
+        index = AvailabilityIndex(since=self.since)
+        index.calendars = dict(self.calendars)
+        for member, member_intervals in intervals.items():
+            member_intervals = [(start, end) for start, end in member_intervals
+                                if self.since is None or end > self.since]
+            if member_intervals:
+                index.calendars[member] = Calendar(member_intervals)
+            else:
+                index.calendars.pop(member, None)
+        return index
+
+    # End of the member's booking overlapping [start, end), or None if free
+    def conflict(self, member, start, end):
+        calendar = self.calendars.get(member)
+        return calendar.conflict(start, end) if calendar is not None else None
+
+    # Intervals in which any of the members is booked, merged and sorted.
+    # Only bookings overlapping [start, end) are returned; end may be None.
+    def busy(self, members, start, end=None):
+        merged = Calendar()
+        for member in members:
+            calendar = self.calendars.get(member)
+            if calendar is None:
+                continue
+            i = bisect_right(calendar.ends, start)
+            j = len(calendar.starts) if end is None else bisect_left(calendar.starts, end)
+            for booked_start, booked_end in zip(calendar.starts[i:j], calendar.ends[i:j]):
+                merged.add(booked_start, booked_end)
+        return list(zip(merged.starts, merged.ends))
+
+    # Busy intervals of each panel from start on, in the form schedule()
+    # takes as busy. panels maps panel names to member emails.
+    def panel_busy(self, panels, start):
+        return {panel: self.busy(members, start) for panel, members in panels.items()}
+
+    # Free (start, end) intervals on a day during which all the members are
+    # free, within working hours and outside breaks, at least duration long.
+    # Nothing is free on days of the week without interviews.
+    def free_slots(self, members, hours, day, duration=None):
+        if not hours.works_on(day):
+            return []
+        day_start, day_end = hours.window(day)
+        blocked = Calendar(self.busy(members, day_start, day_end))
+        for break_start, break_end in hours.breaks:
+            blocked.add(datetime.combine(day, break_start), datetime.combine(day, break_end))
+        free = []
+        t = day_start
+        for blocked_start, blocked_end in zip(blocked.starts, blocked.ends):
+            if blocked_start > t:
+                free.append((t, min(blocked_start, day_end)))
+            t = max(t, blocked_end)
+        if t < day_end:
+            free.append((t, day_end))
+        return [(start, end) for start, end in free if duration is None or end - start >= duration]
+
+
+# Interview slots booked for panel members, one row per member and slot.
+# Kept in the same database as groups and panels so every session and the
+# command line see each other's bookings. The availability index, of the
+# bookings ending after it was first loaded, is shared by all readers. It
+# is patched for the members whose bookings this object changes, and only
+# rebuilt when another connection (e.g. the command line) changed them.
+class Bookings(Database):
+    schema = SCHEMA
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._index = None
+        self._index_version = None
+        self._index_lock = threading.Lock()
+
+    # Index over the bookings still to come, current as of the last change
+    def index(self):
+        with self._lock:
+            return self._load_index(self._conn)
+
+    def _load_index(self, conn):
+        version = conn.execute("SELECT version FROM bookings_version").fetchone()[0]
+        with self._index_lock:
+            if self._index_version != version:
+                with span("bookings.index"):
+                    since = datetime.now()
+                    rows = conn.execute("SELECT member, start_at, end_at FROM bookings WHERE end_at > ?",
+                                        (_text(since),)).fetchall()
+                    self._index = AvailabilityIndex(
+                        ((member, datetime.fromisoformat(start), datetime.fromisoformat(end))
+                         for member, start, end in rows), since)
+                    self._index_version = version
+            return self._index
+
+    # Bump the version inside a transaction that changed the bookings of
+    # the given members, and patch the index to match. No other writer can
+    # come in between, so the index stays as current as a rebuild.
+    def _changed(self, conn, index, members):
+        conn.execute("UPDATE bookings_version SET version = version + 1")
+        version = conn.execute("SELECT version FROM bookings_version").fetchone()[0]
+        intervals = {member: [] for member in members}
+        rows = conn.execute(
+            f"SELECT member, start_at, end_at FROM bookings WHERE member IN ({', '.join('?' * len(intervals))}) "
+            "AND end_at > ?", (*intervals, _text(index.since)))
+        for member, start, end in rows:
+            intervals[member].append((datetime.fromisoformat(start), datetime.fromisoformat(end)))
+        with self._index_lock:
+            self._index = index.replaced(intervals)
+            self._index_version = version
+
+    # End of the member's booking overlapping [start, end), or None if
+    # free. Times before the index starts are looked up in the table.
+    def _conflict(self, conn, index, member, start, end):
+        if end > index.since:
+            return index.conflict(member, start, end)
+        row = conn.execute("SELECT MAX(end_at) FROM bookings WHERE member = ? AND start_at < ? AND end_at > ?",
+                           (member, _text(end), _text(start))).fetchone()
+        return datetime.fromisoformat(row[0]) if row[0] is not None else None
+
+    # Book every member of each slot's panel for the slot. Nothing is
+    # booked when any of them is already booked at that time, or twice in
+    # the slots given; returns those (member, slot) pairs, empty on success.
+    # panels maps panel names to member emails.
+    def book(self, batch_id, slots, panels):
+        with self._transaction() as conn:
+            index = self._load_index(conn)
+            pending = {}
+            conflicts = []
+            rows = []
+            now = time.time()
+            for slot in slots:
+                for member in panels.get(slot.panel, ()):
+                    calendar = pending.setdefault(member, Calendar())
+                    if (self._conflict(conn, index, member, slot.start, slot.end) is not None
+                            or calendar.conflict(slot.start, slot.end) is not None):
+                        conflicts.append((member, slot))
+                        continue
+                    calendar.add(slot.start, slot.end)
+                    rows.append((batch_id, member, slot.panel, slot.candidate,
+                                 _text(slot.start), _text(slot.end), now))
+            if conflicts:
+                incr("bookings.conflicts", len(conflicts))
+                return conflicts
+            conn.executemany(
+                "INSERT INTO bookings (batch_id, member, panel, candidate, start_at, end_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            if rows:
+                self._changed(conn, index, {row[1] for row in rows})
+        incr("bookings.booked", len(rows))
+        return []
+
+    # Remove the bookings of a batch; returns how many were removed
+    def cancel(self, batch_id):
+        with self._transaction() as conn:
+            index = self._load_index(conn)
+            members = [member for member, in conn.execute(
+                "SELECT DISTINCT member FROM bookings WHERE batch_id = ?", (batch_id,))]
+            removed = conn.execute("DELETE FROM bookings WHERE batch_id = ?", (batch_id,)).rowcount
+            if removed:
+                self._changed(conn, index, members)
+            return removed
+
+    # The given candidates that have an interview booked ending after since,
+    # in the order given
+    def booked_candidates(self, candidates, since):
+        booked = {candidate for candidate, in self._execute(
+            "SELECT DISTINCT candidate FROM bookings WHERE end_at > ?", (_text(since),))}
+        return [candidate for candidate in candidates if candidate in booked]
+
+    # Bookings overlapping [start, end), as (batch, member, panel,
+    # candidate, start, end) rows in time order
+    def between(self, start, end):
+        return [(batch_id, member, panel, candidate, datetime.fromisoformat(start_at), datetime.fromisoformat(end_at))
+                for batch_id, member, panel, candidate, start_at, end_at in self._execute(
+                    "SELECT batch_id, member, panel, candidate, start_at, end_at FROM bookings "
+                    "WHERE start_at < ? AND end_at > ? ORDER BY start_at, panel, member",
+                    (_text(end), _text(start)))]
@@ -0,0 +1,512 @@
+# Command line for running a drive without the Streamlit app.
+#
+#   python -m interview groups create --name Drive1
+#   python -m interview groups add --name Drive1 --skills "python, sql"
+#   python -m interview panels create --name P1 --members a@example.com,b@example.com
+#   python -m interview schedule --group Drive1 --panels P1,P2 --date 2025-01-10 --match-skills
+#   python -m interview bookings free --date 2025-01-10 --panels P1,P2
+#   python -m interview send --to candidates --group Drive1 --subject "Hello [NAME]" --body-file body.txt
+#   python -m interview deliveries --group Drive1 --undelivered
+#   python -m interview run --job nightly.json
+#
+# Groups, panels, bookings, the outbox and the delivery log are the same SQLite database the app uses,
+# so work started here shows up in the app and the other way round. Heavy
+# modules are imported by the commands that need them, to keep start-up fast.
+import argparse
+import json
+import sys
+from datetime import date, datetime
+
+
+def _list(text):
+    return [item.strip() for item in text.split(",") if item.strip()] if text else []
+
+
+def _time(text):
+    return datetime.strptime(text, "%H:%M").time()
+
+
+def _break(text):
+    start, _, end = text.partition("-")
+    return _time(start), _time(end)
+
+
+def _weekdays(text):
+    from interview.scheduler import WEEKDAYS
+
+    names = [name.lower() for name in WEEKDAYS]
+    unknown = [day for day in _list(text) if day.lower() not in names]
+    if unknown:
+        raise SystemExit(f"Error: unknown day '{unknown[0]}', use {', '.join(names)}")
+    return {names.index(day.lower()) for day in _list(text)}
+
+
+def _sheet(path):
+    from interview.data import build_email_index, load_sheet
+
+    df = load_sheet(path)
+    return df, build_email_index(df)
+
+
+def _store(args):
+    from interview.store import Store
+
+    return Store(args.db)
+
+
+def _bookings(args):
+    from interview.bookings import Bookings
+
+    return Bookings(args.db)
+
+
+def _settings(args):
+    try:
+        with open(args.settings, "r") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def _smtp_settings(args):
+    settings = _settings(args)
+    if not settings.get("gmail_email") or not settings.get("gmail_password"):
+        raise SystemExit(f"Error: configure gmail_email and gmail_password in {args.settings} first")
+    return settings
+
+
+# Send everything queued in the outbox before returning
+def _drain(args, outbox):
+    from interview.deliveries import DeliveryLog
+    from interview.mailer import RateLimiter, SMTPPool
+    from interview.outbox import OutboxWorker
+
+    settings = _smtp_settings(args)
+    pool = SMTPPool(size=settings.get("smtp_workers", 4), host=settings.get("smtp_server", "smtp.gmail.com"),
+                    port=int(settings.get("smtp_port", 587)), username=settings["gmail_email"],
+                    password=settings["gmail_password"])
+    # Sends logged over the last day count against the daily quota
+    log = DeliveryLog(args.db)
+    limiter = RateLimiter([(settings.get("rate_per_minute", 60), 60), (settings.get("rate_per_day", 2000), 86400)],
+                          sent=log.attempt_times(datetime.now().timestamp() - 86400))
+    try:
+        OutboxWorker(outbox, log=log).drain(pool, limiter)
+    finally:
+        pool.close()
+
+
+# Queue messages under a new batch and send them. Messages an interrupted
+# run left queued are sent by drain, not by running the command again.
+# kind and group are recorded with the batch in the delivery log.
+def _deliver(args, batch_id, messages, kind, group=None):
+    from interview.deliveries import DeliveryLog
+    from interview.outbox import Outbox
+
+    _smtp_settings(args)
+    outbox = Outbox(args.db)
+    queued = outbox.enqueue(batch_id, messages)
+    if queued:
+        DeliveryLog(args.db).start_batch(batch_id, kind, group, queued)
+    print(f"Queued {queued} messages")
+    _drain(args, outbox)
+    _print_batch(outbox, batch_id)
+
+
+def _print_batch(outbox, batch_id):
+    from interview.outbox import FAILED, SENT
+
+    counts = outbox.batch_status(batch_id)
+    print(f"Sent {counts[SENT]}, failed {counts[FAILED]}")
+    for recipients, error in outbox.batch_failures(batch_id):
+        print(f"Failed to send to {recipients}: {error}", file=sys.stderr)
+
+
+def _batch_id(*parts):
+    return ":".join([*parts, datetime.now().strftime("%Y%m%dT%H%M%S")])
+
+
+def cmd_load(args):
+    for path in (args.candidates, args.panel):
+        df, _ = _sheet(path)
+        report = df.attrs.get("import_report", {})
+        print(f"{path}: {len(df)} rows ({report.get('invalid_emails', 0)} without a valid email, "
+              f"{report.get('duplicate_emails', 0)} duplicates skipped)")
+        for row, email, reason in report.get("dropped", []):
+            print(f"  row {row}: {reason}" + (f" ({email})" if email else ""), file=sys.stderr)
+
+
+def cmd_groups(args):
+    store = _store(args)
+    if args.action == "list":
+        for name in store.group_names():
+            print(f"{name}\t{store.group_size(name)}")
+        return
+    if not args.name:
+        raise SystemExit("Error: --name is required")
+    if args.action == "create":
+        print(f"Group '{args.name}' created" if store.create_group(args.name) else f"Group '{args.name}' exists")
+        return
+    if args.name not in store.group_names():
+        raise SystemExit(f"Error: group '{args.name}' does not exist")
+    if args.action == "show":
+        for email in store.group_members(args.name):
+            print(email)
+    elif args.action == "add":
+        df, _ = _sheet(args.candidates)
+        emails = _list(args.emails)
+        if args.all:
+            emails += df["Email"].tolist()
+        if args.skills:
+            from interview.skills import SkillIndex
+
+            matches = SkillIndex(df["Skills"] if "Skills" in df.columns else [None] * len(df)).search(
+                args.skills, args.match_all)
+            emails += df["Email"].iloc[matches].tolist()
+        print(f"Added {store.add_group_members(args.name, emails)} candidates to '{args.name}'")
+    elif args.action == "remove":
+        print(f"Removed {store.remove_group_members(args.name, _list(args.emails))} members from '{args.name}'")
+
+
+def cmd_panels(args):
+    store = _store(args)
+    if args.action == "list":
+        for name, members in store.panels().items():
+            print(f"{name}\t{', '.join(members)}")
+    elif args.action == "create":
+        members = _list(args.members)
+        if not args.name or not members:
+            raise SystemExit("Error: --name and --members are required")
+        store.save_panel(args.name, members)
+        print(f"Panel '{args.name}' created with {len(members)} members")
+
+
+def cmd_schedule(args):
+    import itertools
+
+    from interview.scheduler import WorkingHours, schedule
+    from interview.workflow import (candidate_constraints, candidate_schedule_messages, panel_schedule_messages,
+                                    schedule_body, skill_based_panels, slot_time_format)
+
+    store = _store(args)
+    candidates = store.group_members(args.group)
+    if not candidates:
+        raise SystemExit(f"Error: group '{args.group}' has no members")
+    panels = {panel: store.panel_members(panel) for panel in _list(args.panels)}
+    missing = [panel for panel, members in panels.items() if not members]
+    if not panels or missing:
+        raise SystemExit(f"Error: unknown or empty panels: {', '.join(missing) or args.panels}")
+
+    candidates_df, candidate_index = _sheet(args.candidates)
+    allowed_panels = None
+    if args.match_skills:
+        from interview.skills import SkillIndex
+
+        _, panel_index = _sheet(args.panel)
+        skills = candidates_df["Skills"] if "Skills" in candidates_df.columns else [None] * len(candidates_df)
+        allowed_panels = skill_based_panels(candidates_df, SkillIndex(skills), panel_index, panels, candidates)
+
+    interview_date = date.fromisoformat(args.date)
+    hours = WorkingHours(interview_date, _time(args.start), _time(args.end), [_break(b) for b in args.breaks],
+                         _weekdays(args.weekdays))
+    bookings = _bookings(args)
+    busy = bookings.index().panel_busy(panels, datetime.combine(interview_date, hours.start))
+    try:
+        slots, unscheduled = schedule(candidates, list(panels), hours, args.duration, busy=busy,
+                                      constraints=candidate_constraints(candidate_index, candidates),
+                                      allowed_panels=allowed_panels, members=panels)
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+
+    time_format = slot_time_format(slots, interview_date)
+    for slot in slots:
+        print(f"{slot.start.strftime(time_format)}\t{slot.panel}\t{slot.candidate}")
+    if unscheduled:
+        print(f"Could not fit {len(unscheduled)} candidates within their availability: {', '.join(unscheduled)}",
+              file=sys.stderr)
+    if args.dry_run or not slots:
+        return
+
+    sender = _settings(args).get("gmail_email", "")
+    candidate_emails = candidate_schedule_messages(sender, candidates_df, slots,
+                                                   schedule_body(args.duration, args.message), args.meet_link)
+    batch_id = _batch_id("schedule", args.group)
+    panel_emails = panel_schedule_messages(sender, candidate_index, slots, panels, interview_date, args.meet_link,
+                                           batch_id)
+    _smtp_settings(args)
+    conflicts = bookings.book(batch_id, slots, panels)
+    if conflicts:
+        member, slot = conflicts[0]
+        raise SystemExit(f"Error: {len(conflicts)} slots were booked meanwhile, e.g. {member} at "
+                         f"{slot.start:%Y-%m-%d %H:%M}; schedule again")
+    print(f"Booked panel members under batch {batch_id}")
+    _deliver(args, batch_id, itertools.chain(candidate_emails, panel_emails), "schedule", args.group)
+
+
+# Bookings made by schedule: list a day's bookings, show the free time of
+# panels on a day, or cancel the bookings of a batch
+def cmd_bookings(args):
+    from datetime import timedelta
+
+    from interview.scheduler import WorkingHours
+
+    bookings = _bookings(args)
+    if args.action == "cancel":
+        if not args.batch:
+            raise SystemExit("Error: --batch is required")
+        print(f"Cancelled {bookings.cancel(args.batch)} bookings")
+        return
+    if not args.date:
+        raise SystemExit("Error: --date is required")
+    day = date.fromisoformat(args.date)
+    if args.action == "list":
+        start = datetime.combine(day, datetime.min.time())
+        for batch_id, member, panel, candidate, start_at, end_at in bookings.between(start, start + timedelta(days=1)):
+            print(f"{start_at:%H:%M}-{end_at:%H:%M}\t{panel}\t{member}\t{candidate}\t{batch_id}")
+    elif args.action == "free":
+        store = _store(args)
+        hours = WorkingHours(day, _time(args.start), _time(args.end), [_break(b) for b in args.breaks],
+                             _weekdays(args.weekdays))
+        if not hours.works_on(day):
+            raise SystemExit(f"Error: no interviews take place on {day:%A}s (see --weekdays)")
+        index = bookings.index()
+        for panel in _list(args.panels) or store.panel_names():
+            free = index.free_slots(store.panel_members(panel), hours, day, timedelta(minutes=args.duration))
+            print(f"{panel}\t" + (", ".join(f"{start:%H:%M}-{end:%H:%M}" for start, end in free) or "fully booked"))
+
+
+def cmd_send(args):
+    from interview.templating import render_messages, rows_for_emails
+
+    if args.body_file:
+        with open(args.body_file, "r") as file:
+            body = file.read()
+    else:
+        body = args.body
+    if not args.subject or not body:
+        raise SystemExit("Error: --subject and --body or --body-file are required")
+
+    path = args.candidates if args.to == "candidates" else args.panel
+    df, _ = _sheet(path)
+    recipients = _list(args.emails)
+    if args.group:
+        recipients += _store(args).group_members(args.group)
+    if args.all:
+        recipients += df["Email"].tolist()
+    recipients = list(dict.fromkeys(recipients))
+    if not recipients:
+        raise SystemExit("Error: choose recipients with --emails, --group or --all")
+
+    if args.greeting and "[NAME]" not in body:
+        body = f"Dear [NAME],\n\n{body}"
+    if args.meet_link:
+        body = f"{body}\n\nMeeting Link: {args.meet_link}"
+    rows = rows_for_emails(df, recipients)
+    defaults = {"NAME": "Candidate" if args.to == "candidates" else "Panel Member"}
+    print(f"{len(rows)} recipients")
+    if args.dry_run:
+        return
+    messages = render_messages(_settings(args).get("gmail_email", ""), args.subject, body, rows,
+                               values={"MEET_LINK": args.meet_link}, defaults=defaults, is_html=args.html)
+    _deliver(args, _batch_id("send", args.to), messages, "message", args.group)
+
+
+# Send whatever is left in the outbox, e.g. after an interrupted run.
+# Temporary failures are retried with backoff before this returns.
+# Messages an interrupted run was sending are taken over once its claim on
+# them expires, or straight away with --recover.
+def cmd_drain(args):
+    from interview.outbox import LEASE, Outbox
+
+    outbox = Outbox(args.db)
+    if args.recover:
+        print(f"Took over {outbox.recover(0)} messages left being sent")
+    if args.retry_failed:
+        print(f"Queued {outbox.retry_failed()} failed messages again")
+    print(f"{outbox.pending()} messages waiting")
+    _drain(args, outbox)
+    print(f"{outbox.pending()} messages left")
+    claimed = outbox.claimed()
+    if claimed:
+        print(f"{claimed} messages are claimed by another sender, or by one that stopped less than "
+              f"{LEASE // 60} minutes ago; run drain again with --recover if none is running", file=sys.stderr)
+
+
+# Delivery history: per-batch rates and latencies, newest first, the
+# members of a group a schedule email never reached, or every attempt to
+# reach one recipient
+def cmd_deliveries(args):
+    from interview.deliveries import DeliveryLog
+
+    log = DeliveryLog(args.db)
+    if args.recipient:
+        for logged_at, batch_id, kind, group, status, attempt, code, error, latency in log.history(
+                args.recipient, args.limit):
+            print(f"{datetime.fromtimestamp(logged_at):%Y-%m-%d %H:%M:%S}\t{status}\tattempt {attempt}\t"
+                  f"{latency:.1f}s\t{kind}\t{group or ''}\t{batch_id}\t{error or ''}")
+    elif args.undelivered:
+        if not args.group:
+            raise SystemExit("Error: --group is required")
+        reached = log.reached(args.group)
+        for email in _store(args).group_members(args.group):
+            if email not in reached:
+                print(email)
+    else:
+        for batch in log.batches(args.group, args.kind, args.limit):
+            rate = f"{batch.sent / batch.queued:.1%}" if batch.queued else "-"
+            latency = (f"{batch.latency_mean:.1f}s mean, {batch.latency_max:.1f}s max"
+                       if batch.latency_mean is not None else "-")
+            print(f"{datetime.fromtimestamp(batch.created_at):%Y-%m-%d %H:%M}\t{batch.kind}\t{batch.group or ''}\t"
+                  f"sent {batch.sent}/{batch.queued} ({rate})\tfailed {batch.failed}\tretried {batch.deferred}\t"
+                  f"{latency}\t{batch.batch_id}")
+
+
+# A job file lists steps, each a command with its options, e.g.
+#   {"candidates": "candidates.xlsx",
+#    "steps": [{"groups add": {"name": "Drive1", "skills": "python"}},
+#              {"schedule": {"group": "Drive1", "panels": ["P1", "P2"], "date": "2025-01-10"}}]}
+# Top-level keys other than steps are global options. YAML files work too
+# when PyYAML is installed.
+def cmd_run(args):
+    with open(args.job, "r") as file:
+        if args.job.endswith((".yml", ".yaml")):
+            try:
+                import yaml
+            except ImportError:
+                raise SystemExit("Error: YAML job files need PyYAML (pip install pyyaml)")
+            job = yaml.safe_load(file)
+        else:
+            job = json.load(file)
+
+    base = _options({key: value for key, value in job.items() if key != "steps"})
+    for step in job.get("steps", []):
+        for command, options in step.items():
+            argv = base + command.split() + _options(options or {})
+            print(f"> {' '.join(argv)}")
+            main(argv)
+
+
+# Turn a mapping of option names to values into command line arguments
+def _options(options):
+    argv = []
+    for key, value in options.items():
+        flag = f"--{key.replace('_', '-')}"
+        if value is True:
+            argv.append(flag)
+        elif value is False or value is None:
+            continue
+        elif isinstance(value, list) and key == "breaks":
+            for item in value:
+                argv += ["--break", str(item)]
+        elif isinstance(value, list):
+            argv += [flag, ",".join(str(item) for item in value)]
+        else:
+            argv += [flag, str(value)]
+    return argv
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m interview",
+                                     description="Schedule interviews and send notifications without the app")
+    parser.add_argument("--candidates", default="candidates.xlsx", help="candidate sheet")
+    parser.add_argument("--panel", default="panel.xlsx", help="panel member sheet")
+    parser.add_argument("--db", default="interview.db", help="groups, panels, outbox and delivery log database")
+    parser.add_argument("--settings", default="settings.json", help="SMTP settings saved by the app")
+    parser.add_argument("--metrics-jsonl", help="append timings and counters to this JSON lines file")
+    parser.add_argument("--metrics-prom", help="write timings and counters as a Prometheus text file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("load", help="load both sheets and report what was imported").set_defaults(func=cmd_load)
+
+    groups = commands.add_parser("groups", help="list, create and edit candidate groups")
+    groups.add_argument("action", choices=["list", "create", "show", "add", "remove"])
+    groups.add_argument("--name")
+    groups.add_argument("--emails", help="comma-separated emails")
+    groups.add_argument("--skills", help="add candidates matching these skills")
+    groups.add_argument("--match-all", action="store_true", help="require every skill")
+    groups.add_argument("--all", action="store_true", help="add every candidate")
+    groups.set_defaults(func=cmd_groups)
+
+    panels = commands.add_parser("panels", help="list and create interview panels")
+    panels.add_argument("action", choices=["list", "create"])
+    panels.add_argument("--name")
+    panels.add_argument("--members", help="comma-separated emails")
+    panels.set_defaults(func=cmd_panels)
+
+    schedule = commands.add_parser("schedule", help="schedule a group across panels and notify everyone")
+    schedule.add_argument("--group", required=True)
+    schedule.add_argument("--panels", required=True, help="comma-separated panel names")
+    schedule.add_argument("--date", required=True, help="first interview day, YYYY-MM-DD")
+    schedule.add_argument("--start", default="09:00", help="daily start, HH:MM")
+    schedule.add_argument("--end", default="17:00", help="daily end, HH:MM")
+    schedule.add_argument("--duration", type=int, default=30, help="minutes per interview")
+    schedule.add_argument("--break", dest="breaks", action="append", default=[], help="daily break, HH:MM-HH:MM")
+    schedule.add_argument("--weekdays", default="mon,tue,wed,thu,fri", help="comma-separated days with interviews")
+    schedule.add_argument("--match-skills", action="store_true", help="match candidates to panels by skills")
+    schedule.add_argument("--meet-link", default="")
+    schedule.add_argument("--message", default="", help="extra text for the candidate emails")
+    schedule.add_argument("--dry-run", action="store_true", help="print the schedule without sending")
+    schedule.set_defaults(func=cmd_schedule)
+
+    bookings = commands.add_parser("bookings", help="list, check and cancel panel member bookings")
+    bookings.add_argument("action", choices=["list", "free", "cancel"])
+    bookings.add_argument("--date", help="day, YYYY-MM-DD")
+    bookings.add_argument("--panels", help="comma-separated panel names (default: all)")
+    bookings.add_argument("--start", default="09:00", help="daily start, HH:MM")
+    bookings.add_argument("--end", default="17:00", help="daily end, HH:MM")
+    bookings.add_argument("--duration", type=int, default=30, help="shortest free time to show, minutes")
+    bookings.add_argument("--break", dest="breaks", action="append", default=[], help="daily break, HH:MM-HH:MM")
+    bookings.add_argument("--weekdays", default="mon,tue,wed,thu,fri", help="comma-separated days with interviews")
+    bookings.add_argument("--batch", help="batch whose bookings to cancel")
+    bookings.set_defaults(func=cmd_bookings)
+
+    send = commands.add_parser("send", help="send a personalised message")
+    send.add_argument("--to", choices=["candidates", "panel"], default="candidates")
+    send.add_argument("--emails", help="comma-separated emails")
+    send.add_argument("--group", help="every member of a candidate group")
+    send.add_argument("--all", action="store_true", help="everyone in the sheet")
+    send.add_argument("--subject")
+    send.add_argument("--body")
+    send.add_argument("--body-file")
+    send.add_argument("--greeting", action="store_true", help="start with 'Dear [NAME],'")
+    send.add_argument("--meet-link", default="")
+    send.add_argument("--html", action="store_true", help="the body is HTML")
+    send.add_argument("--dry-run", action="store_true", help="count recipients without sending")
+    send.set_defaults(func=cmd_send)
+
+    drain = commands.add_parser("drain", help="send messages left in the outbox")
+    drain.add_argument("--retry-failed", action="store_true", help="queue failed messages again first")
+    drain.add_argument("--recover", action="store_true",
+                       help="take over messages an interrupted run was sending; only when no other sender runs")
+    drain.set_defaults(func=cmd_drain)
+
+    deliveries = commands.add_parser("deliveries", help="delivery rates and latency per batch, and who was missed")
+    deliveries.add_argument("--group", help="only batches sent to this candidate group")
+    deliveries.add_argument("--kind", choices=["schedule", "message", "other"], help="only batches of this kind")
+    deliveries.add_argument("--undelivered", action="store_true",
+                            help="list members of --group no schedule email was delivered to")
+    deliveries.add_argument("--recipient", help="every attempt to reach this email, newest first")
+    deliveries.add_argument("--limit", type=int, default=20, help="batches or attempts to list")
+    deliveries.set_defaults(func=cmd_deliveries)
+
+    run = commands.add_parser("run", help="run the steps of a JSON or YAML job file")
+    run.add_argument("--job", required=True)
+    run.set_defaults(func=cmd_run)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        args.func(args)
+    finally:
+        if args.metrics_jsonl or args.metrics_prom:
+            from interview.metrics import metrics
+
+            if args.metrics_jsonl:
+                metrics.write_jsonl(args.metrics_jsonl)
+            if args.metrics_prom:
+                metrics.write_prometheus(args.metrics_prom)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+
+from interview.metrics import incr, timed
+
+# pandas and the importer are imported by load_sheet, so the signature and
+# hashing helpers stay cheap to import (the app uses them before any sheet
+# is loaded)
+
+# Size of the blocks read when hashing a workbook
+HASH_BLOCK_SIZE = 1 << 20
+
+# Bumped whenever the importer changes what the cached frame looks like
+CACHE_VERSION = 3
+
+
+# Cheap signature used to detect file changes without reading the file
+def file_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+# Content hash of a file, used when the signature changed but the bytes may not have
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Paths of the columnar copy and its metadata, stored beside the workbook
+def cache_paths(path):
+    directory, name = os.path.split(os.path.abspath(path))
+    base = os.path.join(directory, f".{name}.cache")
+    return f"{base}.pkl", f"{base}.json"
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, "r") as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+# Write through a temporary file so a crash never leaves a half-written cache
+def _write_atomic(path, write):
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _write_meta(meta_path, signature, digest):
+    def write(tmp_path):
+        with open(tmp_path, "w") as file:
+            json.dump({"version": CACHE_VERSION, "signature": list(signature), "sha256": digest}, file)
+    _write_atomic(meta_path, write)
+
+
+# Load a workbook, reusing the columnar copy when the source has not changed
+@timed("data.load")
+def load_sheet(path):
+    import pandas as pd
+
+    from interview.importer import read_sheet
+
+    signature = file_signature(path)
+    cache_path, meta_path = cache_paths(path)
+    meta = _read_meta(meta_path)
+    digest = None
+
+    if meta and meta.get("version") == CACHE_VERSION and os.path.exists(cache_path):
+        if tuple(meta.get("signature", ())) == signature:
+            incr("data.cache_hits")
+            return pd.read_pickle(cache_path)
+        # The file was touched; only re-parse if its content really changed
+        digest = file_hash(path)
+        if meta.get("sha256") == digest:
+            _write_meta(meta_path, signature, digest)
+            incr("data.cache_hits")
+            return pd.read_pickle(cache_path)
+
+    df = read_sheet(path)
+    if digest is None:
+        digest = file_hash(path)
+    try:
+        _write_atomic(cache_path, df.to_pickle)
+        _write_meta(meta_path, signature, digest)
+    except OSError:
+        # A read-only checkout still works, just without the fast path
+        pass
+    return df
+
+
+# Map each email to its row (as a dict) so lookups don't scan the frame.
+# The first row wins when an email appears more than once.
+def build_email_index(df):
+    if "Email" not in df.columns:
+        return {}
+    rows = df[df["Email"].notna()].drop_duplicates("Email")
+    return dict(zip(rows["Email"], rows.to_dict("records")))
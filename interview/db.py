@@ -0,0 +1,73 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from interview.metrics import incr
+
+
+# SQLite connection shared between threads, with the schema applied on open.
+# Several processes (the app and batch jobs) may use the same file.
+class Database:
+    schema = ""
+    # Columns added to a table after it was first created, as
+    # (table, column, definition); older database files gain them on open
+    columns = ()
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(self.schema)
+        for table, column, definition in self.columns:
+            self._add_column(table, column, definition)
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._cache_version = None
+
+    def _add_column(self, table, column, definition):
+        existing = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+        if column in existing:
+            return
+        try:
+            self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        except sqlite3.OperationalError:
+            # Another process added it first
+            if column not in {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}:
+                raise
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # Result of a read, shared by every caller until the database changes.
+    # data_version moves when another connection (or process) commits and
+    # total_changes when this one does, so all sessions see one consistent
+    # view and repeat no query in between. Callers must not modify results.
+    def _cached(self, key, read):
+        with self._lock:
+            version = (self._conn.execute("PRAGMA data_version").fetchone()[0], self._conn.total_changes)
+            if version != self._cache_version:
+                self._cache = {}
+                self._cache_version = version
+            elif key in self._cache:
+                incr("db.cache_hits")
+                return self._cache[key]
+        value = read()
+        with self._lock:
+            if self._cache_version == version:
+                self._cache[key] = value
+        incr("db.cache_misses")
+        return value
+
+    # Write transaction that also excludes other processes using the file
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
@@ -0,0 +1,221 @@
+import time
+from collections import namedtuple
+
+from interview.db import Database
+from interview.metrics import incr, span
+from interview.outbox import DEFERRED, FAILED, SENT
+
+# Kinds of batch
+SCHEDULE = "schedule"
+MESSAGE = "message"
+OTHER = "other"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deliveries (
+    id INTEGER PRIMARY KEY,
+    batch_id TEXT NOT NULL,
+    message_id INTEGER NOT NULL,
+    recipient TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempt INTEGER NOT NULL,
+    smtp_code INTEGER,
+    error TEXT,
+    latency REAL NOT NULL,
+    logged_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS deliveries_recipient ON deliveries (recipient, logged_at);
+CREATE INDEX IF NOT EXISTS deliveries_batch ON deliveries (batch_id, status, latency);
+CREATE INDEX IF NOT EXISTS deliveries_status ON deliveries (status, logged_at);
+CREATE INDEX IF NOT EXISTS deliveries_message ON deliveries (message_id, status);
+CREATE INDEX IF NOT EXISTS deliveries_logged ON deliveries (logged_at);
+CREATE TABLE IF NOT EXISTS delivery_batches (
+    batch_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    group_name TEXT,
+    queued INTEGER NOT NULL DEFAULT 0,
+    sent INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    deferred INTEGER NOT NULL DEFAULT 0,
+    latency_total REAL NOT NULL DEFAULT 0,
+    latency_max REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS delivery_batches_group ON delivery_batches (group_name, created_at);
+CREATE INDEX IF NOT EXISTS delivery_batches_created ON delivery_batches (created_at);
+"""
+
+# Counters of a batch. sent and failed count messages by their last
+# outcome (a failed message sent by a retry counts as sent only), deferred
+# counts temporary failures; latency is the time from queueing to being
+# sent, in seconds.
+BatchSummary = namedtuple("BatchSummary", "batch_id kind group queued sent failed deferred "
+                                          "latency_mean latency_max created_at updated_at")
+
+_BATCH_COLUMNS = ("batch_id, kind, group_name, queued, sent, failed, deferred, "
+                  "CASE WHEN sent THEN latency_total / sent END, latency_max, created_at, updated_at")
+
+
+def _filters(group, kind):
+    clauses, params = [], []
+    if group is not None:
+        clauses.append("group_name = ?")
+        params.append(group)
+    if kind is not None:
+        clauses.append("kind = ?")
+        params.append(kind)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), tuple(params)
+
+
+# Messages among message_ids that failed for good in an earlier attempt
+def _failed_before(conn, message_ids):
+    failed = set()
+    for i in range(0, len(message_ids), 500):
+        chunk = message_ids[i:i + 500]
+        failed.update(row[0] for row in conn.execute(
+            f"SELECT DISTINCT message_id FROM deliveries WHERE status = ? AND message_id IN "
+            f"({', '.join('?' * len(chunk))})", (FAILED, *chunk)))
+    return failed
+
+
+# Append-only history of every send attempt, one row per recipient with
+# that recipient's own outcome (a server may refuse some recipients of a
+# message and accept the others), kept in the same database as the outbox.
+# Unlike the outbox, which only knows the last state of each message, it
+# records when each attempt ended and how it went. Each batch also keeps
+# running totals, updated with every append, so rates and latencies per
+# batch are read without scanning the history.
+class DeliveryLog(Database):
+    schema = SCHEMA
+
+    # Record a batch being queued: what it is for, the candidate group it
+    # went to if any, and how many messages were queued. Queuing more under
+    # the same batch adds to its count.
+    def start_batch(self, batch_id, kind, group=None, queued=0):
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO delivery_batches (batch_id, kind, group_name, queued, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (batch_id) DO UPDATE SET kind = excluded.kind, "
+                "group_name = excluded.group_name, queued = queued + excluded.queued, updated_at = excluded.updated_at",
+                (batch_id, kind, group, queued, now, now))
+
+    # Write the outcomes of many send attempts (outbox.Delivery tuples) in
+    # one transaction. Batches not started through start_batch (e.g. queued
+    # before the log existed) are logged as OTHER. A message that failed
+    # before and ends again (sent or failed, after a retry) is taken off
+    # the failed count first, so it is only counted by its last outcome.
+    def append(self, deliveries):
+        if not deliveries:
+            return
+        with span("deliveries.append"):
+            with self._transaction() as conn:
+                failed_before = _failed_before(conn, [delivery.message_id for delivery in deliveries
+                                                      if delivery.status in (SENT, FAILED)])
+                rows = []
+                totals = {}
+                for delivery in deliveries:
+                    latency = delivery.logged_at - delivery.queued_at
+                    rows += [(delivery.batch_id, delivery.message_id, recipient, status, delivery.attempt, code,
+                              error, latency, delivery.logged_at)
+                             for recipient, status, code, error in delivery.recipients]
+                    sent, failed, deferred, latency_total, latency_max, logged_at = totals.get(
+                        delivery.batch_id, (0, 0, 0, 0.0, 0.0, 0.0))
+                    if delivery.status == SENT:
+                        sent += 1
+                        latency_total += latency
+                        latency_max = max(latency_max, latency)
+                    elif delivery.status == FAILED:
+                        failed += 1
+                    else:
+                        deferred += 1
+                    if delivery.status in (SENT, FAILED) and delivery.message_id in failed_before:
+                        failed -= 1
+                    totals[delivery.batch_id] = (sent, failed, deferred, latency_total, latency_max,
+                                                 max(logged_at, delivery.logged_at))
+                conn.executemany(
+                    "INSERT INTO deliveries (batch_id, message_id, recipient, status, attempt, smtp_code, error, "
+                    "latency, logged_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                conn.executemany(
+                    "INSERT OR IGNORE INTO delivery_batches (batch_id, kind, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(batch_id, OTHER, logged_at, logged_at) for batch_id, (*_, logged_at) in totals.items()])
+                conn.executemany(
+                    "UPDATE delivery_batches SET sent = sent + ?, failed = failed + ?, deferred = deferred + ?, "
+                    "latency_total = latency_total + ?, latency_max = MAX(latency_max, ?), updated_at = ? "
+                    "WHERE batch_id = ?",
+                    [(*counts, batch_id) for batch_id, counts in totals.items()])
+        incr("deliveries.logged", len(rows))
+
+    # Summaries of the batches matching the filters, newest first
+    def batches(self, group=None, kind=None, limit=50, offset=0):
+        where, params = _filters(group, kind)
+        return self._cached(("batches", group, kind, limit, offset), lambda: [
+            BatchSummary(*row) for row in self._execute(
+                f"SELECT {_BATCH_COLUMNS} FROM delivery_batches{where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                params + (limit, offset))])
+
+    def batch(self, batch_id):
+        rows = self._cached(("batch", batch_id), lambda: self._execute(
+            f"SELECT {_BATCH_COLUMNS} FROM delivery_batches WHERE batch_id = ?", (batch_id,)))
+        return BatchSummary(*rows[0]) if rows else None
+
+    # Number of batches and their summed counters, as
+    # (batches, queued, sent, failed, deferred, mean latency, max latency)
+    def totals(self, group=None, kind=None):
+        where, params = _filters(group, kind)
+        return self._cached(("totals", group, kind), lambda: self._execute(
+            "SELECT COUNT(*), COALESCE(SUM(queued), 0), COALESCE(SUM(sent), 0), COALESCE(SUM(failed), 0), "
+            "COALESCE(SUM(deferred), 0), SUM(latency_total) / NULLIF(SUM(sent), 0), MAX(latency_max) "
+            f"FROM delivery_batches{where}", params)[0])
+
+    # Candidate groups batches went to
+    def groups(self):
+        return self._cached("groups", lambda: [row[0] for row in self._execute(
+            "SELECT DISTINCT group_name FROM delivery_batches WHERE group_name IS NOT NULL ORDER BY group_name")])
+
+    # Latency of the recipients a batch was sent to at each share (e.g.
+    # 0.95), read off the batch's part of the index one row per share
+    def latency_percentiles(self, batch_id, shares=(0.5, 0.95, 0.99)):
+        return self._cached(("percentiles", batch_id, shares), lambda: self._latency_percentiles(batch_id, shares))
+
+    def _latency_percentiles(self, batch_id, shares):
+        count = self._execute("SELECT COUNT(*) FROM deliveries WHERE batch_id = ? AND status = ?",
+                              (batch_id, SENT))[0][0]
+        if not count:
+            return {}
+        return {share: self._execute(
+            "SELECT latency FROM deliveries WHERE batch_id = ? AND status = ? ORDER BY latency LIMIT 1 OFFSET ?",
+            (batch_id, SENT, min(count - 1, int(share * count))))[0][0] for share in shares}
+
+    # Most frequent errors of a batch's failed and deferred attempts, as
+    # (error, SMTP code, attempts, recipients) rows
+    def errors(self, batch_id, limit=10):
+        return self._cached(("errors", batch_id, limit), lambda: self._execute(
+            "SELECT error, smtp_code, COUNT(*), COUNT(DISTINCT recipient) FROM deliveries "
+            "WHERE batch_id = ? AND status IN (?, ?) GROUP BY error, smtp_code ORDER BY COUNT(*) DESC LIMIT ?",
+            (batch_id, FAILED, DEFERRED, limit)))
+
+    # Times of the send attempts logged since the given time, oldest first,
+    # for a RateLimiter to count against its quotas. An attempt is one
+    # message, however many recipients it went to.
+    def attempt_times(self, since):
+        return [row[0] for row in self._execute(
+            "SELECT logged_at FROM deliveries WHERE logged_at >= ? GROUP BY message_id, logged_at "
+            "ORDER BY logged_at", (since,))]
+
+    # Recipients a message of the given kind sent to a group was delivered
+    # to. CROSS JOIN keeps SQLite going from the group's batches to their
+    # rows, instead of through every sent row in the log.
+    def reached(self, group, kind=SCHEDULE):
+        return self._cached(("reached", group, kind), lambda: {row[0] for row in self._execute(
+            "SELECT DISTINCT d.recipient FROM delivery_batches b CROSS JOIN deliveries d ON d.batch_id = b.batch_id "
+            "WHERE b.group_name = ? AND b.kind = ? AND d.status = ?", (group, kind, SENT))})
+
+    # Latest attempts to reach a recipient, newest first, as (time, batch,
+    # kind, group, status, attempt, SMTP code, error, latency) rows
+    def history(self, recipient, limit=50):
+        return self._cached(("history", recipient, limit), lambda: self._execute(
+            "SELECT d.logged_at, d.batch_id, b.kind, b.group_name, d.status, d.attempt, d.smtp_code, d.error, "
+            "d.latency FROM deliveries d LEFT JOIN delivery_batches b ON b.batch_id = d.batch_id "
+            "WHERE d.recipient = ? ORDER BY d.logged_at DESC LIMIT ?", (recipient, limit)))
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+# First number in an experience text: "3-5 years" -> 3, "5+ years" -> 5
+YEARS_PATTERN = r"(\d+(?:\.\d+)?)"
+
+
+# Selected rows of a sheet as a bitmap of row positions, one bit per row,
+# so a session's selection stays a few kilobytes however large the sheet is
+class Selection:
+    def __init__(self, size):
+        self.size = size
+        self.bits = np.zeros((size + 7) // 8, dtype=np.uint8)
+
+    def _positions(self, rows):
+        rows = np.asarray(rows, dtype=np.int64).ravel()
+        return rows[(rows >= 0) & (rows < self.size)]
+
+    def add(self, rows):
+        rows = self._positions(rows)
+        np.bitwise_or.at(self.bits, rows >> 3, (128 >> (rows & 7)).astype(np.uint8))
+
+    def discard(self, rows):
+        rows = self._positions(rows)
+        np.bitwise_and.at(self.bits, rows >> 3, ~(128 >> (rows & 7)).astype(np.uint8))
+
+    def clear(self):
+        self.bits[:] = 0
+
+    def select_all(self):
+        self.add(np.arange(self.size))
+
+    # Boolean array telling which of the given rows are selected
+    def contains(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        return ((self.bits[rows >> 3] >> (7 - (rows & 7))) & 1).astype(bool)
+
+    # Selected row positions in ascending order
+    def rows(self):
+        return np.flatnonzero(np.unpackbits(self.bits, count=self.size))
+
+    def __len__(self):
+        return int(np.unpackbits(self.bits, count=self.size).sum())
+
+
+# Years of experience parsed from free text, NaN where no number is given
+def experience_years(texts):
+    texts = pd.Series(texts, dtype=object)
+    return texts.where(texts.notna(), "").astype(str).str.extract(YEARS_PATTERN)[0].astype(float).to_numpy()
+
+
+# Row bounds of one page: (start, stop, page count). Pages count from 1 and
+# out-of-range page numbers are clamped.
+def page_bounds(total, page, page_size):
+    pages = max(1, -(-total // page_size))
+    page = min(max(page, 1), pages)
+    start = (page - 1) * page_size
+    return start, min(start + page_size, total), pages
+
+
+# Server-side filtering of the candidate sheet. Built once per sheet
+# version; each query returns row positions, so only the visible page of
+# the sheet ever has to be copied and sent to the browser.
+class CandidateGrid:
+    def __init__(self, df, skill_index):
+        self.size = len(df)
+        self.skill_index = skill_index
+        self.names = df["Name"].astype("string").str.lower() if "Name" in df.columns else None
+        self.years = experience_years(df["Experience"]) if "Experience" in df.columns else None
+
+    # (lowest, highest) years of experience in the sheet, or None
+    def years_range(self):
+        if self.years is None or np.isnan(self.years).all():
+            return None
+        return float(np.nanmin(self.years)), float(np.nanmax(self.years))
+
+    # Positions of rows matching every given filter. Name matches a
+    # case-insensitive substring, years is an inclusive (low, high) range.
+    # With a skills query rows come best match first, otherwise in sheet order.
+    def filter(self, name="", skills="", match_all=False, years=None):
+        mask = np.ones(self.size, dtype=bool)
+        if name and self.names is not None:
+            mask &= self.names.str.contains(name.lower(), regex=False).fillna(False).to_numpy(dtype=bool)
+        if years is not None and self.years is not None:
+            low, high = years
+            mask &= (self.years >= low) & (self.years <= high)
+        if skills:
+            matches = self.skill_index.search(skills, match_all)
+            return matches[mask[matches]]
+        return np.flatnonzero(mask)
@@ -0,0 +1,149 @@
+import itertools
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from interview.metrics import incr, timed
+
+# Rows read per chunk while streaming a sheet
+CHUNK_SIZE = 10000
+
+# Compact dtypes for the columns the app knows about
+TEXT_COLUMNS = ["Name", "Email"]
+CATEGORY_COLUMNS = ["Skills", "Experience", "Expertise"]
+
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+# Reasons a row is left out of a sheet, and how many such rows are listed
+MISSING_EMAIL = "no email"
+INVALID_EMAIL = "invalid email"
+DUPLICATE_EMAIL = "repeated email"
+DROPPED_LISTED = 1000
+
+try:
+    import pyarrow  # noqa: F401
+    STRING_DTYPE = "string[pyarrow]"
+except ImportError:
+    STRING_DTYPE = "string"
+
+
+def _xlsx_chunks(path, chunk_size):
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [name if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                return
+            yield pd.DataFrame.from_records(chunk, columns=columns)
+    finally:
+        workbook.close()
+
+
+def _parquet_chunks(path, chunk_size):
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield batch.to_pandas()
+
+
+# Raw chunks of an xlsx, csv or parquet file, never holding the whole file
+def iter_chunks(path, chunk_size=CHUNK_SIZE):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".xlsx", ".xlsm"):
+        return _xlsx_chunks(path, chunk_size)
+    if extension == ".csv":
+        return pd.read_csv(path, chunksize=chunk_size)
+    if extension == ".parquet":
+        return _parquet_chunks(path, chunk_size)
+    raise ValueError(f"Unsupported file type: {extension}")
+
+
+# Shrink one chunk: strings for the text columns, small integers where possible.
+# Category columns become categoricals once all chunks are combined.
+def _compact(chunk):
+    for column in chunk.columns:
+        if column in TEXT_COLUMNS or column in CATEGORY_COLUMNS:
+            chunk[column] = chunk[column].astype(STRING_DTYPE)
+        elif pd.api.types.is_integer_dtype(chunk[column]):
+            chunk[column] = pd.to_numeric(chunk[column], downcast="integer")
+    return chunk
+
+
+# Stream a sheet into a compact frame.
+# Rows without a valid email are dropped, as are repeated emails (compared
+# case-insensitively, first row wins). The counts are kept in
+# df.attrs["import_report"] (missing_emails counts the rows without a valid
+# email whose email cell is empty), with the first DROPPED_LISTED dropped
+# rows as (sheet row number, email, reason) under "dropped".
+@timed("data.parse")
+def read_sheet(path, chunk_size=CHUNK_SIZE):
+    seen = set()
+    frames = []
+    report = {"rows": 0, "invalid_emails": 0, "missing_emails": 0, "duplicate_emails": 0, "dropped": []}
+
+    for chunk in iter_chunks(path, chunk_size):
+        # Row 1 of the sheet is the header
+        first_row = report["rows"] + 2
+        report["rows"] += len(chunk)
+        if "Email" in chunk.columns:
+            emails = chunk["Email"].astype(object).where(chunk["Email"].notna(), "").astype(str).str.strip()
+            valid = emails.str.match(EMAIL_PATTERN)
+            keys = emails.str.lower()
+            duplicate = keys.duplicated() | keys.isin(seen)
+            report["invalid_emails"] += int((~valid).sum())
+            report["missing_emails"] += int((emails == "").sum())
+            report["duplicate_emails"] += int((valid & duplicate).sum())
+            keep = valid & ~duplicate
+            seen.update(keys[keep])
+            room = DROPPED_LISTED - len(report["dropped"])
+            if room > 0:
+                positions = np.flatnonzero(~keep.to_numpy())[:room]
+                report["dropped"] += [(first_row + int(position), emails.iat[position],
+                                       DUPLICATE_EMAIL if valid.iat[position]
+                                       else INVALID_EMAIL if emails.iat[position] else MISSING_EMAIL)
+                                      for position in positions]
+            chunk = chunk[keep].assign(Email=emails[keep])
+        frames.append(_compact(chunk))
+
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype("category")
+    df.attrs["import_report"] = report
+    incr("data.rows_parsed", report["rows"])
+    return df
+
+
+# Load time and peak Python memory of importing each file:
+#   python -m interview.importer candidates.xlsx panel.xlsx
+def main(paths):
+    for path in paths:
+        tracemalloc.start()
+        start = time.perf_counter()
+        df = read_sheet(path)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        report = df.attrs.get("import_report", {})
+        print(f"{path}: {len(df)} of {report.get('rows', 0)} rows kept "
+              f"({report.get('invalid_emails', 0)} without a valid email, "
+              f"{report.get('duplicate_emails', 0)} duplicates) in {elapsed:.3f} s, "
+              f"peak {peak / 1e6:.1f} MB, frame {df.memory_usage(deep=True).sum() / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
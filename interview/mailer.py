@@ -0,0 +1,298 @@
+import queue
+import smtplib
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from email.message import EmailMessage
+from enum import Enum
+
+from interview.metrics import incr, span
+
+
+class SendStatus(Enum):
+    SENT = "sent"
+    # The server or the connection failed in a way a later attempt may not
+    TEMPORARY_FAILURE = "temporary_failure"
+    PERMANENT_FAILURE = "permanent_failure"
+
+
+# Outcome of one send: status, the SMTP reply code if the server gave one,
+# whether trying again later may succeed, and the exception if any
+SendResult = namedtuple("SendResult", "status code retryable error")
+
+SENT_RESULT = SendResult(SendStatus.SENT, 250, False, None)
+
+
+def _failure(code, retryable, error):
+    status = SendStatus.TEMPORARY_FAILURE if retryable else SendStatus.PERMANENT_FAILURE
+    return SendResult(status, code, retryable, error)
+
+
+# Classify a send exception. 4xx replies (421 service unavailable, 450/451
+# mailbox busy or local error, 452 out of storage), dropped connections and
+# timeouts are temporary; 5xx replies, including failed logins, are not.
+def classify_error(error):
+    if error is None:
+        return SENT_RESULT
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in error.recipients.values()]
+        code = max(codes) if codes else None
+        return _failure(code, bool(codes) and all(400 <= c < 500 for c in codes), error)
+    if isinstance(error, smtplib.SMTPResponseException):
+        return _failure(error.smtp_code, 400 <= error.smtp_code < 500, error)
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return _failure(None, True, error)
+    # Other SMTP errors (e.g. a missing extension) are OSErrors too, but
+    # will not go away on their own
+    if isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException):
+        return _failure(None, True, error)
+    return _failure(None, False, error)
+
+
+# Build a plain-text or HTML email message
+def build_message(sender, to, subject, body, is_html=False):
+    email = EmailMessage()
+    email["From"] = sender
+    email["To"] = to
+    email["Subject"] = subject
+
+    if is_html:
+        email.add_alternative(body, subtype='html')
+    else:
+        email.set_content(body)
+    return email
+
+
+# One authenticated SMTP connection that is kept open across many sends.
+# The connection is opened lazily, checked with NOOP after being idle,
+# recycled after max_messages sends and re-opened if the server drops it.
+class SMTPSession:
+    def __init__(self, host, port, username=None, password=None, starttls=True,
+                 max_messages=100, keepalive_interval=30, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.max_messages = max_messages
+        self.keepalive_interval = keepalive_interval
+        self.timeout = timeout
+        self._server = None
+        self._sent = 0
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        with span("smtp.connect"):
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                with span("smtp.starttls"):
+                    server.starttls()
+            if self.username:
+                with span("smtp.login"):
+                    server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        self._server = server
+        self._sent = 0
+        self._last_used = time.monotonic()
+
+    def _close(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except (smtplib.SMTPException, OSError):
+            self._server.close()
+        self._server = None
+
+    # Send NOOP on an idle connection and drop it if the server stopped answering
+    def _check_alive(self):
+        if time.monotonic() - self._last_used < self.keepalive_interval:
+            return
+        try:
+            code, _ = self._server.noop()
+        except (smtplib.SMTPException, OSError):
+            code = None
+        if code == 250:
+            self._last_used = time.monotonic()
+        else:
+            self._close()
+
+    def _ensure_connection(self):
+        if self._server is not None and self._sent >= self.max_messages:
+            self._close()
+        if self._server is not None:
+            self._check_alive()
+        if self._server is None:
+            self._connect()
+        return self._server
+
+    # size is the message size in bytes, counted once the send succeeded.
+    # Returns what send returned.
+    def _deliver(self, send, size=0):
+        with self._lock:
+            try:
+                with span("smtp.send"):
+                    try:
+                        result = send(self._ensure_connection())
+                    except smtplib.SMTPServerDisconnected:
+                        # The server closed the connection under us; reconnect once
+                        incr("smtp.reconnects")
+                        self._close()
+                        result = send(self._ensure_connection())
+            except Exception:
+                incr("smtp.failures")
+                raise
+            self._sent += 1
+            self._last_used = time.monotonic()
+        incr("smtp.messages_sent")
+        incr("smtp.bytes", size)
+        return result
+
+    def send(self, message):
+        self._deliver(lambda server: server.send_message(message))
+
+    # Send an already serialised message, avoiding a second serialisation.
+    # Returns the recipients the server refused while accepting the others,
+    # as {recipient: (code, response)}; refusing all of them raises
+    # SMTPRecipientsRefused.
+    def send_raw(self, sender, recipients, payload):
+        return self._deliver(lambda server: server.sendmail(sender, recipients, payload), len(payload))
+
+    # Check an idle connection (see _check_alive), so a dead one is dropped
+    # before the next send rather than failing it
+    def keepalive(self):
+        with self._lock:
+            if self._server is not None:
+                self._check_alive()
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+# A fixed set of SMTP sessions shared by every caller.
+# Each caller checks out a session for the duration of a send or a batch.
+class SMTPPool:
+    def __init__(self, size=1, **session_options):
+        self.size = size
+        # LIFO so the most recently used, still-warm connection is reused first
+        self._idle = queue.LifoQueue()
+        self._sessions = [SMTPSession(**session_options) for _ in range(size)]
+        for session in self._sessions:
+            self._idle.put(session)
+
+    @contextmanager
+    def session(self):
+        session = self._idle.get()
+        try:
+            yield session
+        finally:
+            self._idle.put(session)
+
+    def send(self, message):
+        with self.session() as session:
+            session.send(message)
+
+    def send_raw(self, sender, recipients, payload):
+        with self.session() as session:
+            return session.send_raw(sender, recipients, payload)
+
+    # Keep the connections of the sessions nobody is using alive; sessions
+    # in use are skipped rather than waited for
+    def keepalive(self):
+        sessions = []
+        try:
+            while len(sessions) < self.size:
+                sessions.append(self._idle.get_nowait())
+        except queue.Empty:
+            pass
+        try:
+            for session in sessions:
+                session.keepalive()
+        finally:
+            # Most recently used back on top
+            for session in reversed(sessions):
+                self._idle.put(session)
+
+    def close(self):
+        for session in self._sessions:
+            session.close()
+
+
+# Limiter enforcing several (count, seconds) quotas at once, e.g.
+# [(60, 60), (2000, 86400)] for at most 60 sends in any minute and 2000 in
+# any 24 hours. A send only starts when every quota's window has room.
+# sent gives the times (time.time()) of earlier sends that still count,
+# e.g. those made before a restart.
+class RateLimiter:
+    def __init__(self, limits, sent=()):
+        self._lock = threading.Lock()
+        self._sent = deque(sorted(sent))
+        self.set_limits(limits)
+
+    # Change the quotas; sends made so far count against the new ones
+    def set_limits(self, limits):
+        with self._lock:
+            self.limits = [(count, seconds) for count, seconds in limits if count]
+
+    # Seconds until the next send may start
+    def delay(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._delay(now)
+
+    def _delay(self, now):
+        window = max((seconds for _, seconds in self.limits), default=0)
+        while self._sent and self._sent[0] <= now - window:
+            self._sent.popleft()
+        # Full when the count-th latest send is still inside the window
+        return max([self._sent[-count] + seconds - now for count, seconds in self.limits
+                    if len(self._sent) >= count and self._sent[-count] > now - seconds], default=0)
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.time()
+                wait = self._delay(now)
+                if not wait:
+                    self._sent.append(now)
+                    return
+            time.sleep(wait)
+
+
+# Send messages concurrently over a connection pool.
+# Yields (message, error) pairs as sends finish; error is None on success.
+# Messages are consumed lazily, with at most two per worker in flight.
+# deliver(pool, item) can be given to send items other than EmailMessages.
+def send_bulk(pool, messages, limiter=None, workers=None, deliver=None):
+    workers = workers or pool.size
+    deliver = deliver or (lambda pool, message: pool.send(message))
+
+    def send(message):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            deliver(pool, message)
+            return message, None
+        except Exception as e:
+            return message, e
+
+    messages = iter(messages)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        while True:
+            for message in messages:
+                pending.add(executor.submit(send, message))
+                if len(pending) >= workers * 2:
+                    break
+            if not pending:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
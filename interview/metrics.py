@@ -0,0 +1,123 @@
+import functools
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Durations kept per span for percentiles, and recent events kept for export
+SAMPLE_SIZE = 1000
+EVENT_LOG_SIZE = 10000
+
+
+def _percentile(values, share):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(share * len(values)))]
+
+
+# Process-wide timers and counters. Spans time a block of code, counters
+# add up events and amounts (messages sent, bytes). Everything is kept in
+# memory and is safe to update from any thread.
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.spans = {}
+            self.counters = {}
+            self.events = deque(maxlen=EVENT_LOG_SIZE)
+
+    # Add a duration in seconds to a span
+    def record(self, name, seconds):
+        with self._lock:
+            span = self.spans.get(name)
+            if span is None:
+                span = self.spans[name] = {"count": 0, "total": 0.0, "max": 0.0,
+                                           "samples": deque(maxlen=SAMPLE_SIZE)}
+            span["count"] += 1
+            span["total"] += seconds
+            span["max"] = max(span["max"], seconds)
+            span["samples"].append(seconds)
+            self.events.append({"time": time.time(), "span": name, "seconds": seconds})
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    # Decorator timing every call of a function as a span
+    def timed(self, name):
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    # Summary of every span and counter
+    def snapshot(self):
+        with self._lock:
+            spans = {name: {"count": span["count"], "total": span["total"], "max": span["max"],
+                            "p50": _percentile(span["samples"], 0.50), "p95": _percentile(span["samples"], 0.95),
+                            "p99": _percentile(span["samples"], 0.99)}
+                     for name, span in self.spans.items()}
+            return {"started_at": self.started_at, "spans": spans, "counters": dict(self.counters)}
+
+    # Recent span events followed by the current counters, one JSON object per line
+    def to_jsonl(self):
+        with self._lock:
+            lines = [json.dumps(event) for event in self.events]
+            now = time.time()
+            lines += [json.dumps({"time": now, "counter": name, "value": value})
+                      for name, value in self.counters.items()]
+        return "".join(f"{line}\n" for line in lines)
+
+    # Prometheus text exposition format: a summary per span and a counter
+    # per counter, all prefixed with interview_
+    def to_prometheus(self):
+        snapshot = self.snapshot()
+        lines = ["# HELP interview_span_seconds Time spent in instrumented code",
+                 "# TYPE interview_span_seconds summary"]
+        for name, span in sorted(snapshot["spans"].items()):
+            label = f'span="{name}"'
+            for quantile in ("p50", "p95", "p99"):
+                lines.append(f'interview_span_seconds{{{label},quantile="0.{quantile[1:]}"}} {span[quantile]:.6f}')
+            lines.append(f"interview_span_seconds_sum{{{label}}} {span['total']:.6f}")
+            lines.append(f"interview_span_seconds_count{{{label}}} {span['count']}")
+        for name, value in sorted(snapshot["counters"].items()):
+            metric = f"interview_{re.sub(r'[^a-zA-Z0-9_]', '_', name)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def write_jsonl(self, path):
+        with open(path, "a") as file:
+            file.write(self.to_jsonl())
+
+    # Written through a temporary file so a scraper never reads half a file
+    def write_prometheus(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as file:
+            file.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+
+# Shared by the app, the command line and the library modules
+metrics = Metrics()
+span = metrics.span
+timed = metrics.timed
+incr = metrics.incr
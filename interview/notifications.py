@@ -0,0 +1,117 @@
+import html
+import time
+from datetime import datetime, timezone
+
+from interview.mailer import build_message
+
+PANEL_EMAIL_HEAD = """
+<html>
+<body>
+<h2>Interview Schedule - {date}</h2>
+<p>Respecet Sir/Madam, <br> You have been assigned to conduct interviews for the following candidates:</p>
+<table border="1" style="border-collapse: collapse; width: 100%;">
+    <tr style="background-color: #f2f2f2;">
+        <th style="padding: 8px;">Time</th>
+        <th style="padding: 8px;">Candidate</th>
+        <th style="padding: 8px;">Details</th>
+    </tr>
+"""
+
+PANEL_EMAIL_ROW = """    <tr>
+        <td style="padding: 8px;">{}</td>
+        <td style="padding: 8px;">{}</td>
+        <td style="padding: 8px;">{}</td>
+    </tr>
+"""
+
+PANEL_EMAIL_TAIL = """</table>
+<p>Meeting Link: {meet_link}</p>
+<p>Please be prepared for the interviews.</p>
+</body>
+</html>
+"""
+
+
+# Render the panel's schedule table once; rows are (time, candidate, details)
+def render_panel_schedule(date_text, rows, meet_link):
+    parts = [PANEL_EMAIL_HEAD.format(date=html.escape(date_text))]
+    parts.extend(PANEL_EMAIL_ROW.format(*(html.escape(str(value)) for value in row)) for row in rows)
+    parts.append(PANEL_EMAIL_TAIL.format(meet_link=html.escape(meet_link or "")))
+    return "".join(parts)
+
+
+def _ics_escape(text):
+    return (str(text).replace("\\", "\\\\").replace(";", "\\;")
+            .replace(",", "\\,").replace("\n", "\\n"))
+
+
+def _ics_time(value):
+    return value.strftime("%Y%m%dT%H%M%S")
+
+
+# Content lines longer than 75 octets are folded onto continuation lines
+# starting with a space (RFC 5545, 3.1), never inside a UTF-8 character
+ICS_LINE_OCTETS = 75
+
+
+def _ics_fold(line):
+    data = line.encode("utf-8")
+    parts = []
+    start, limit = 0, ICS_LINE_OCTETS
+    while len(data) - start > limit:
+        end = start + limit
+        while data[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(data[start:end].decode("utf-8"))
+        # The space opening a continuation line counts towards its length
+        start, limit = end, ICS_LINE_OCTETS - 1
+    parts.append(data[start:].decode("utf-8"))
+    return "\r\n ".join(parts)
+
+
+# Domain part of event UIDs, so they stay unique among other calendars
+UID_DOMAIN = "interview-management-system.invalid"
+# SEQUENCE counts seconds from here, so an event sent again (e.g. a batch
+# scheduled anew) always carries a higher one than before
+SEQUENCE_EPOCH = 1577836800  # 2020-01-01 UTC
+
+
+# UID of a candidate's interview in a batch. Sending the batch's schedule
+# again reuses it, so calendars update the event rather than add one.
+def event_uid(batch_id, candidate):
+    return f"{batch_id}.{candidate.replace('@', '=')}@{UID_DOMAIN}"
+
+
+# iCalendar file holding one event per interview.
+# events are (uid, start, end, summary, description); times are local.
+def build_calendar(events, location=""):
+    now = datetime.now(timezone.utc)
+    stamp = _ics_time(now) + "Z"
+    sequence = int(time.time()) - SEQUENCE_EPOCH
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//Interview Management System//EN",
+             "METHOD:PUBLISH"]
+    for uid, start, end, summary, description in events:
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{uid}",
+            f"SEQUENCE:{sequence}",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART:{_ics_time(start)}",
+            f"DTEND:{_ics_time(end)}",
+            f"SUMMARY:{_ics_escape(summary)}",
+            f"DESCRIPTION:{_ics_escape(description)}",
+            f"LOCATION:{_ics_escape(location)}",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(_ics_fold(line) for line in lines) + "\r\n"
+
+
+# One message addressed to every panel member, so the whole panel is
+# notified with a single serialised body and one SMTP transaction
+def build_panel_message(sender, members, subject, body_html, calendar=None):
+    email = build_message(sender, ", ".join(members), subject, body_html, is_html=True)
+    if calendar:
+        email.add_attachment(calendar.encode("utf-8"), maintype="text", subtype="calendar",
+                             filename="interviews.ics", params={"method": "PUBLISH"})
+    return email
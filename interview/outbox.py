@@ -0,0 +1,375 @@
+import hashlib
+import logging
+import random
+import smtplib
+import threading
+import time
+from collections import namedtuple
+from email.utils import getaddresses
+
+from interview.db import Database
+from interview.mailer import classify_error, send_bulk
+from interview.metrics import incr
+
+# Message states
+QUEUED = "queued"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+# Outcome of an attempt that failed temporarily; the message is queued again
+DEFERRED = "deferred"
+
+# Seconds a claim on messages lasts without being renewed
+LEASE = 600
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    batch_id TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    recipients TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_status ON outbox (status, id);
+CREATE INDEX IF NOT EXISTS outbox_batch ON outbox (batch_id, status);
+"""
+
+# Added after the first release
+COLUMNS = (
+    ("outbox", "next_attempt_at", "REAL NOT NULL DEFAULT 0"),
+    ("outbox", "smtp_code", "INTEGER"),
+    ("outbox", "claimed_at", "REAL"),
+)
+
+OutboxItem = namedtuple("OutboxItem", "id sender recipients payload attempts batch_id created_at")
+
+# Outcome of one attempt to send an outbox message, as the worker logs it:
+# the message's status and that of each recipient, as (recipient, status,
+# SMTP code, error) tuples, which differ when the server refused only some
+# recipients. queued_at is when the message was queued, logged_at when the
+# attempt ended.
+Delivery = namedtuple("Delivery", "batch_id message_id status attempt queued_at logged_at recipients")
+
+
+# Key identifying a message within one submission (scope, e.g. its batch
+# id) by what the recipient would see, so queuing the same notification
+# twice in it is a no-op, while a later submission may send it again
+def message_key(message, scope=""):
+    body = message.get_body(preferencelist=("html", "plain"))
+    parts = [
+        scope,
+        ",".join(sorted(recipients_of(message))),
+        str(message["Subject"] or ""),
+        body.get_content() if body is not None else "",
+    ]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+# Envelope recipients of a message (To, Cc and Bcc)
+def recipients_of(message):
+    fields = message.get_all("To", []) + message.get_all("Cc", []) + message.get_all("Bcc", [])
+    return [address for _, address in getaddresses(fields) if address]
+
+
+# On-disk queue of rendered messages, shared by the app and its sender thread
+class Outbox(Database):
+    schema = SCHEMA
+    columns = COLUMNS
+
+    # Queue messages under a batch id. Returns how many were new;
+    # messages the batch already holds (queued, sent or failed) are skipped.
+    # Messages are consumed lazily and written in chunks.
+    def enqueue(self, batch_id, messages, chunk_size=500):
+        queued = 0
+        rows = []
+        for message in messages:
+            recipients = recipients_of(message)
+            key = message_key(message, batch_id)
+            # Bcc only belongs in the envelope, never in the stored headers
+            del message["Bcc"]
+            now = time.time()
+            rows.append((key, batch_id, str(message["From"]), ",".join(recipients),
+                         message.as_bytes(), now, now))
+            if len(rows) >= chunk_size:
+                queued += self._insert(rows)
+                rows = []
+        if rows:
+            queued += self._insert(rows)
+        return queued
+
+    def _insert(self, rows):
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO outbox (idempotency_key, batch_id, sender, recipients, "
+                "payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            return conn.total_changes - before
+
+    # Mark up to limit queued messages that are due as being sent and return
+    # them. The claim is a lease: it is taken to have been abandoned once it
+    # is older than the lease recover() is given, unless renewed.
+    def claim(self, limit):
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT id, sender, recipients, payload, attempts + 1, batch_id, created_at FROM outbox "
+                "WHERE status = ? AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (QUEUED, time.time(), limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE outbox SET status = ?, attempts = attempts + 1, claimed_at = ?, updated_at = ? WHERE id = ?",
+                [(SENDING, time.time(), time.time(), row[0]) for row in rows],
+            )
+        return [OutboxItem(id, sender, recipients.split(","), payload, attempts, batch_id, created_at)
+                for id, sender, recipients, payload, attempts, batch_id, created_at in rows]
+
+    def mark_sent(self, item_id):
+        self._execute("UPDATE outbox SET status = ?, error = NULL, smtp_code = NULL, updated_at = ? WHERE id = ?",
+                      (SENT, time.time(), item_id))
+
+    # recipients, when given, replaces the message's recipients, so that a
+    # retry only goes to those the server refused
+    def mark_failed(self, item_id, error, code=None, recipients=None):
+        self._execute(
+            "UPDATE outbox SET status = ?, error = ?, smtp_code = ?, recipients = COALESCE(?, recipients), "
+            "updated_at = ? WHERE id = ?",
+            (FAILED, error, code, ",".join(recipients) if recipients else None, time.time(), item_id))
+
+    # Put a message back in the queue, not to be sent before delay seconds.
+    # recipients is as for mark_failed.
+    def defer(self, item_id, delay, error, code=None, recipients=None):
+        now = time.time()
+        self._execute(
+            "UPDATE outbox SET status = ?, error = ?, smtp_code = ?, next_attempt_at = ?, "
+            "recipients = COALESCE(?, recipients), updated_at = ? WHERE id = ?",
+            (QUEUED, error, code, now + delay, ",".join(recipients) if recipients else None, now, item_id))
+
+    # Queue failed messages again, of one batch or of all, with a fresh
+    # retry budget. Returns how many were queued.
+    def retry_failed(self, batch_id=None):
+        sql = "UPDATE outbox SET status = ?, attempts = 0, next_attempt_at = 0, updated_at = ? WHERE status = ?"
+        params = (QUEUED, time.time(), FAILED)
+        if batch_id is not None:
+            sql += " AND batch_id = ?"
+            params += (batch_id,)
+        with self._transaction() as conn:
+            return conn.execute(sql, params).rowcount
+
+    # Time the earliest deferred message is due, or None if none is waiting
+    def next_due(self):
+        return self._execute("SELECT MIN(next_attempt_at) FROM outbox WHERE status = ?", (QUEUED,))[0][0]
+
+    # Extend the lease on claimed messages still being sent
+    def renew(self, item_ids):
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany("UPDATE outbox SET claimed_at = ? WHERE id = ? AND status = ?",
+                             [(now, item_id, SENDING) for item_id in item_ids])
+
+    # Requeue messages claimed more than lease seconds ago, left in flight
+    # by a crashed or killed sender. Claims of a sender that is still running
+    # (the app's worker or a drain from the command line) are left alone.
+    # Messages already marked sent are never sent again. Returns how many
+    # were requeued.
+    def recover(self, lease):
+        now = time.time()
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE outbox SET status = ?, updated_at = ? "
+                "WHERE status = ? AND (claimed_at IS NULL OR claimed_at < ?)",
+                (QUEUED, now, SENDING, now - lease)).rowcount
+
+    # Messages claimed by a sender and not finished yet
+    def claimed(self):
+        return self._execute("SELECT COUNT(*) FROM outbox WHERE status = ?", (SENDING,))[0][0]
+
+    def pending(self):
+        return self._execute("SELECT COUNT(*) FROM outbox WHERE status IN (?, ?)", (QUEUED, SENDING))[0][0]
+
+    # Queued messages of a batch waiting to be retried after a failure
+    def batch_retrying(self, batch_id):
+        return self._cached(("batch_retrying", batch_id), lambda: self._execute(
+            "SELECT COUNT(*) FROM outbox WHERE batch_id = ? AND status = ? AND attempts > 0",
+            (batch_id, QUEUED))[0][0])
+
+    # Number of messages in each state for a batch. Every session watching
+    # the batch shares one result until the outbox changes.
+    def batch_status(self, batch_id):
+        return self._cached(("batch_status", batch_id), lambda: self._batch_status(batch_id))
+
+    def _batch_status(self, batch_id):
+        counts = {QUEUED: 0, SENDING: 0, SENT: 0, FAILED: 0}
+        counts.update(self._execute(
+            "SELECT status, COUNT(*) FROM outbox WHERE batch_id = ? GROUP BY status", (batch_id,)))
+        return counts
+
+    def batch_failures(self, batch_id):
+        return self._cached(("batch_failures", batch_id), lambda: self._execute(
+            "SELECT recipients, error FROM outbox WHERE batch_id = ? AND status = ? ORDER BY id",
+            (batch_id, FAILED)))
+
+
+# Send a claimed message. A server accepting only some of the recipients
+# does not raise, so the refused ones are raised as SMTPRecipientsRefused
+# as if all had been refused.
+def _deliver(pool, item):
+    refused = pool.send_raw(item.sender, item.recipients, item.payload)
+    if refused:
+        raise smtplib.SMTPRecipientsRefused(refused)
+
+
+# (recipient, status, SMTP code, error) of each recipient of an attempt.
+# When the server refused some of them, the others were sent.
+def _recipient_outcomes(recipients, status, code, error, refused):
+    if not refused:
+        return [(recipient, status, code, error) for recipient in recipients]
+    outcomes = []
+    for recipient in recipients:
+        if recipient in refused:
+            refused_code, response = refused[recipient]
+            if isinstance(response, bytes):
+                response = response.decode("utf-8", "replace")
+            outcomes.append((recipient, status, refused_code, f"{refused_code} {response}"))
+        else:
+            outcomes.append((recipient, SENT, 250, None))
+    return outcomes
+
+
+# Background thread draining the outbox through an SMTP pool.
+# Temporary failures are retried up to max_attempts times, waiting
+# backoff * 2 ** (attempt - 1) seconds (with jitter, at most max_backoff)
+# before each retry; other messages keep flowing meanwhile.
+# Claims are renewed while they are being sent and taken over from other
+# senders once older than lease seconds.
+# The outcome of every attempt is written to log (a DeliveryLog) if given,
+# in chunks of log_size or every log_interval seconds, whichever is first.
+class OutboxWorker:
+    def __init__(self, outbox, batch_size=100, poll_interval=5, describe_error=str,
+                 max_attempts=5, backoff=30, max_backoff=3600, log=None, log_size=100, log_interval=1,
+                 lease=LEASE):
+        self.outbox = outbox
+        self.lease = lease
+        self.log = log
+        self.log_size = log_size
+        self.log_interval = log_interval
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.describe_error = describe_error
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.pool = None
+        self.limiter = None
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    # Start the thread if needed and wake it up; also used to swap credentials
+    def start(self, pool, limiter=None):
+        with self._lock:
+            self.pool = pool
+            self.limiter = limiter
+            if self._thread is None or not self._thread.is_alive():
+                self.outbox.recover(self.lease)
+                self._thread = threading.Thread(target=self._run, name="outbox-worker", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    # Send one claimed batch; returns False if nothing was queued
+    def process(self):
+        items = self.outbox.claim(self.batch_size)
+        if not items:
+            return False
+        outcomes = []
+        logged_at = renewed_at = time.time()
+        unfinished = {item.id for item in items}
+        for item, error in send_bulk(self.pool, items, self.limiter, deliver=_deliver):
+            unfinished.discard(item.id)
+            if unfinished and time.time() - renewed_at >= self.lease / 3:
+                self.outbox.renew(unfinished)
+                renewed_at = time.time()
+            result = classify_error(error)
+            description = None
+            # Only the refused recipients are tried again
+            refused = error.recipients if isinstance(error, smtplib.SMTPRecipientsRefused) else {}
+            if error is None:
+                self.outbox.mark_sent(item.id)
+                status = SENT
+                incr("outbox.sent")
+            elif result.retryable and item.attempts < self.max_attempts:
+                description = self.describe_error(error)
+                self.outbox.defer(item.id, self.retry_delay(item.attempts), description, result.code, list(refused))
+                status = DEFERRED
+                incr("outbox.deferred")
+            else:
+                description = self.describe_error(error)
+                self.outbox.mark_failed(item.id, description, result.code, list(refused))
+                status = FAILED
+                incr("outbox.failed")
+            if self.log is not None:
+                now = time.time()
+                outcomes.append(Delivery(item.batch_id, item.id, status, item.attempts, item.created_at, now,
+                                         _recipient_outcomes(item.recipients, status, result.code, description,
+                                                             refused)))
+                if len(outcomes) >= self.log_size or now - logged_at >= self.log_interval:
+                    self.log.append(outcomes)
+                    outcomes = []
+                    logged_at = now
+        if outcomes:
+            self.log.append(outcomes)
+        return True
+
+    def retry_delay(self, attempts):
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    # Seconds until a deferred message is due, at most the poll interval
+    def _idle_time(self):
+        due = self.outbox.next_due()
+        if due is None:
+            return self.poll_interval
+        return min(self.poll_interval, max(0.0, due - time.time()))
+
+    # Send everything queued in the calling thread, including retries, for
+    # scripts that must not exit before their mail is out
+    def drain(self, pool, limiter=None):
+        with self._lock:
+            self.pool = pool
+            self.limiter = limiter
+        self.outbox.recover(self.lease)
+        while True:
+            if self.process():
+                continue
+            due = self.outbox.next_due()
+            if due is None:
+                return
+            time.sleep(max(0.0, due - time.time()))
+
+    # An error (e.g. the database being locked by another process for too
+    # long) is logged and the loop tried again after the poll interval;
+    # messages it left claimed are picked up again once their lease ends.
+    def _run(self):
+        while True:
+            try:
+                if self.process():
+                    continue
+                # Pick up what a sender that died meanwhile left behind
+                self.outbox.recover(self.lease)
+                # Keep the pool's connections warm for the next batch
+                self.pool.keepalive()
+                idle_time = self._idle_time()
+            except Exception:
+                logger.exception("Outbox worker failed, trying again in %s seconds", self.poll_interval)
+                incr("outbox.worker_errors")
+                idle_time = self.poll_interval
+            self._wake.wait(idle_time)
+            self._wake.clear()
@@ -0,0 +1,258 @@
+import threading
+import weakref
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+from interview.data import build_email_index, file_signature, load_sheet
+from interview.grid import CandidateGrid, Selection
+from interview.metrics import incr, span
+from interview.skills import SkillIndex
+
+# Column rows are matched on between two versions of a sheet
+KEY = "Email"
+
+# Emails of the rows added, changed and removed between two versions of a
+# sheet. reused[i] is the position row i of the new version had in the old
+# one when the row is unchanged, otherwise -1.
+SheetDiff = namedtuple("SheetDiff", ["added", "changed", "removed", "reused"])
+
+
+# Hash of every row's values. Numbers are hashed as floats, as a column of
+# whole numbers turns into floats once a blank cell is added to it.
+def _row_hashes(df):
+    df = df.apply(lambda column: column.astype("float64")
+                  if is_numeric_dtype(column) and not is_bool_dtype(column) else column)
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+# Diff of two versions of a sheet given the key and row hash of each row.
+# Rows are compared through a hash of all their values, so a changed cell
+# in any column marks the row as changed.
+def diff_rows(old_keys, old_hashes, new_keys, new_hashes):
+    positions = old_keys.get_indexer(new_keys)
+    matched = positions >= 0
+    same = matched & (old_hashes[np.where(matched, positions, 0)] == new_hashes)
+    return SheetDiff(
+        added=new_keys[~matched].tolist(),
+        changed=new_keys[matched & ~same].tolist(),
+        removed=old_keys[~old_keys.isin(new_keys)].tolist(),
+        reused=np.where(same, positions, -1),
+    )
+
+
+# Keys of a sheet's rows, or None when rows can't be told apart by key
+def _row_keys(df, key=KEY):
+    if key not in df.columns:
+        return None
+    keys = pd.Index(df[key])
+    return keys if keys.is_unique else None
+
+
+# One immutable version of a sheet with everything derived from it,
+# numbered in the order versions were loaded. diff holds the changes from
+# version base_number, or is None when this version was built from scratch.
+class SheetVersion:
+    def __init__(self, number, signature, df, index, skill_index=None, grid=None, diff=None, base_number=None,
+                 keys=None, hashes=None):
+        self.number = number
+        self.signature = signature
+        self.df = df
+        self.index = index
+        self.skill_index = skill_index
+        self.grid = grid
+        self.diff = diff
+        self.base_number = base_number
+        self.keys = _row_keys(df) if keys is None else keys
+        self.hashes = _row_hashes(df) if hashes is None else hashes
+        self._positions = None
+        self._emails = None
+
+    # Emails in sheet order, listed once and shared by every reader
+    def emails(self):
+        if self._emails is None:
+            self._emails = self.df[KEY].tolist() if KEY in self.df.columns else []
+        return self._emails
+
+    # Row positions of the given emails, -1 for emails not in this version
+    def positions(self, emails):
+        if self._positions is None:
+            keys = pd.Index(self.df[KEY]) if KEY in self.df.columns else pd.Index([])
+            self._positions = pd.Series(np.arange(len(keys)), index=keys)
+            self._positions = self._positions[~self._positions.index.duplicated()]
+        return self._positions.reindex(list(emails)).fillna(-1).to_numpy(dtype=np.int64)
+
+
+# Keys and row hashes of a version, all that is kept of it while a session
+# still refers to it once a newer version was loaded
+Fingerprint = namedtuple("Fingerprint", ["keys", "hashes"])
+
+
+# A workbook that is re-read when it changes on disk. Each refresh swaps in
+# a new SheetVersion; when the rows can be matched up with the previous
+# version, only the added and changed rows are re-indexed. Versions are
+# never modified, so readers holding an older one are unaffected.
+#
+# Only the current version is held in full. Sessions follow the sheet
+# through cursors; for every version some cursor is still on, the sheet
+# keeps its fingerprint, counted by the cursors referring to it, and drops
+# it when the last of them moves on or goes away.
+class LiveSheet:
+    def __init__(self, path, skill_column=None):
+        self.path = path
+        self.skill_column = skill_column
+        self.current = None
+        self._lock = threading.Lock()
+        self._fingerprints = {}
+        self._references = {}
+        self.error = None
+        self._loader = None
+        self._loader_lock = threading.Lock()
+
+    # True when the file on disk differs from the current version
+    def changed(self):
+        try:
+            signature = file_signature(self.path)
+        except OSError:
+            return False
+        return self.current is None or self.current.signature != signature
+
+    # The version matching the file on disk, loading it if it changed
+    def refresh(self):
+        signature = file_signature(self.path)
+        current = self.current
+        if current is not None and current.signature == signature:
+            return current
+        with self._lock:
+            current = self.current
+            if current is None or current.signature != signature:
+                self.current = self._load(signature, current)
+            return self.current
+
+    # Load the file in a background thread, unless a load is already
+    # running. Readers keep the current version (None before the first
+    # load) meanwhile; error holds what went wrong if the load failed.
+    def refresh_in_background(self):
+        with self._loader_lock:
+            if self._loader is not None and self._loader.is_alive():
+                return
+            self._loader = threading.Thread(target=self._refresh_quietly, daemon=True)
+            self._loader.start()
+
+    def _refresh_quietly(self):
+        try:
+            self.refresh()
+            self.error = None
+        except Exception as error:
+            self.error = error
+
+    # A new session's cursor; it is on no version until moved
+    def cursor(self):
+        return SheetCursor(self)
+
+    # Number of cursors on each version still referred to
+    def references(self):
+        with self._lock:
+            return dict(self._references)
+
+    def _acquire(self, version):
+        with self._lock:
+            self._fingerprints.setdefault(version.number, Fingerprint(version.keys, version.hashes))
+            self._references[version.number] = self._references.get(version.number, 0) + 1
+
+    def _release(self, number):
+        with self._lock:
+            self._references[number] -= 1
+            if not self._references[number]:
+                del self._references[number]
+                del self._fingerprints[number]
+
+    def _fingerprint(self, number):
+        with self._lock:
+            return self._fingerprints[number]
+
+    def _skill_texts(self, df):
+        if self.skill_column in df.columns:
+            return df[self.skill_column]
+        return pd.Series([None] * len(df), dtype=object)
+
+    def _load(self, signature, previous):
+        df = load_sheet(self.path)
+        number = previous.number + 1 if previous is not None else 1
+        keys, hashes = _row_keys(df), _row_hashes(df)
+        diff = None
+        if (previous is not None and previous.keys is not None and keys is not None
+                and list(previous.df.columns) == list(df.columns)):
+            diff = diff_rows(previous.keys, previous.hashes, keys, hashes)
+        if diff is None:
+            with span("refresh.build"):
+                index = build_email_index(df)
+                skill_index = SkillIndex(self._skill_texts(df)) if self.skill_column else None
+                return SheetVersion(number, signature, df, index, skill_index,
+                                    CandidateGrid(df, skill_index) if skill_index is not None else None,
+                                    keys=keys, hashes=hashes)
+
+        incr("refresh.rows_added", len(diff.added))
+        incr("refresh.rows_changed", len(diff.changed))
+        incr("refresh.rows_removed", len(diff.removed))
+        if not (diff.added or diff.changed or diff.removed):
+            # Only touched: keep the previous frame and indexes
+            return SheetVersion(number, signature, previous.df, previous.index, previous.skill_index, previous.grid,
+                                diff, previous.number, previous.keys, previous.hashes)
+
+        with span("refresh.patch"):
+            index = dict(previous.index)
+            for email in diff.removed:
+                index.pop(email, None)
+            rows = df.iloc[np.flatnonzero(diff.reused < 0)]
+            rows = rows[rows[KEY].notna()]
+            index.update(zip(rows[KEY], rows.to_dict("records")))
+            skill_index = None
+            if previous.skill_index is not None:
+                skill_index = previous.skill_index.patched(self._skill_texts(df), diff.reused)
+            grid = CandidateGrid(df, skill_index) if skill_index is not None else None
+            return SheetVersion(number, signature, df, index, skill_index, grid, diff, previous.number, keys, hashes)
+
+
+# A session's place in a live sheet: the number of the version it last saw
+# and its selection over that version's rows, one bit per row. This is all
+# the per-session state; the frames and indexes are shared.
+class SheetCursor:
+    def __init__(self, sheet):
+        self.sheet = sheet
+        self.number = None
+        self.selection = None
+        # Held in a list so the finalizer releases whichever version the
+        # cursor is on when the session goes away
+        self._held = [None]
+        weakref.finalize(self, SheetCursor._release, sheet, self._held)
+
+    @staticmethod
+    def _release(sheet, held):
+        if held[0] is not None:
+            sheet._release(held[0])
+
+    # Move to a version, carrying the selection over by key. Returns the
+    # SheetDiff from the version the cursor was on, or None when it was on
+    # none or the two can't be matched up (the selection is then cleared).
+    def move(self, version):
+        if self.number == version.number:
+            return SheetDiff([], [], [], np.arange(len(version.df)))
+        previous = self.number
+        self.sheet._acquire(version)
+        old = self.sheet._fingerprint(previous) if previous is not None else None
+        self.number = self._held[0] = version.number
+        if previous is not None:
+            self.sheet._release(previous)
+
+        diff = None
+        if old is not None and old.keys is not None and version.keys is not None:
+            diff = version.diff if version.base_number == previous else diff_rows(
+                old.keys, old.hashes, version.keys, version.hashes)
+        selection = Selection(len(version.df))
+        if diff is not None and self.selection is not None:
+            selection.add(version.positions(old.keys[self.selection.rows()]))
+        self.selection = selection
+        return diff
@@ -0,0 +1,211 @@
+import heapq
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from interview.metrics import timed
+
+Slot = namedtuple("Slot", "candidate panel start end")
+
+# Day names in date.weekday() order
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+# Days interviews take place on unless told otherwise, Monday to Friday
+WORKDAYS = frozenset(range(5))
+
+
+# Daily working pattern shared by all panels: working hours, breaks, the
+# days of the week interviews take place on (date.weekday() numbers) and
+# the first day interviews may take place
+class WorkingHours:
+    def __init__(self, date, start, end, breaks=(), weekdays=WORKDAYS):
+        self.date = date
+        self.start = start
+        self.end = end
+        self.breaks = sorted(breaks)
+        self.weekdays = frozenset(weekdays)
+
+    def window(self, day):
+        return datetime.combine(day, self.start), datetime.combine(day, self.end)
+
+    def works_on(self, day):
+        return day.weekday() in self.weekdays
+
+
+# Blocked intervals of one panel, merged and sorted so the next free moment
+# can be found with a binary search
+class Calendar:
+    def __init__(self, intervals=()):
+        self.starts = []
+        self.ends = []
+        for start, end in sorted(intervals):
+            self.add(start, end)
+
+    # Block [start, end), merging it with any interval it overlaps or touches
+    def add(self, start, end):
+        i = bisect_left(self.ends, start)
+        j = i
+        while j < len(self.starts) and self.starts[j] <= end:
+            start = min(start, self.starts[j])
+            end = max(end, self.ends[j])
+            j += 1
+        self.starts[i:j] = [start]
+        self.ends[i:j] = [end]
+
+    # End of the blocked interval overlapping [start, end), or None if free
+    def conflict(self, start, end):
+        i = bisect_right(self.ends, start)
+        if i < len(self.starts) and self.starts[i] < end:
+            return self.ends[i]
+        return None
+
+
+# True when an interview of the given length fits into the working day
+# between the breaks
+def fits_between_breaks(hours, duration):
+    day_start, day_end = hours.window(hours.date)
+    t = day_start
+    for break_start, break_end in hours.breaks:
+        if min(datetime.combine(hours.date, break_start), day_end) - t >= duration:
+            return True
+        t = max(t, datetime.combine(hours.date, break_end))
+    return day_end - t >= duration
+
+
+# Earliest start >= t at which an interview of the given length fits inside
+# working hours, outside breaks and outside the panel's blocked intervals
+def next_start(t, duration, hours, calendar):
+    first_day = datetime.combine(hours.date, hours.start)
+    if t < first_day:
+        t = first_day
+    while True:
+        day_start, day_end = hours.window(t.date())
+        if t < day_start:
+            t = day_start
+        if t + duration > day_end or not hours.works_on(t.date()):
+            t = datetime.combine(t.date() + timedelta(days=1), hours.start)
+            continue
+        moved = False
+        for break_start, break_end in hours.breaks:
+            break_start = datetime.combine(t.date(), break_start)
+            break_end = datetime.combine(t.date(), break_end)
+            if t < break_end and t + duration > break_start:
+                t = break_end
+                moved = True
+        if moved:
+            continue
+        blocked_until = calendar.conflict(t, t + duration)
+        if blocked_until is None:
+            return t
+        t = blocked_until
+
+
+# Pack interviews across several panels running in parallel.
+#
+# Greedy list scheduling: every candidate goes to the panel that can see
+# them soonest. With equal interview lengths this gives the shortest
+# overall day for unconstrained candidates. Candidates with constraints
+# are placed first, earliest deadline first, and the remaining candidates
+# fill the gaps around them.
+#
+# busy maps a panel to intervals it is unavailable, constraints maps a
+# candidate to an (earliest, latest) datetime pair (either may be None) and
+# allowed_panels is a boolean (candidates x panels) matrix, in the order
+# both are given, marking the panels that may interview each candidate; a
+# candidate with no panel marked may go to any.
+# members maps a panel to its member emails; a member sitting on several
+# panels is never booked on two of them at once.
+# Returns (slots sorted by start time, candidates that could not be placed).
+@timed("schedule")
+def schedule(candidates, panels, hours, duration, busy=None, constraints=None, allowed_panels=None, members=None):
+    if not panels:
+        return [], list(candidates)
+    duration = timedelta(minutes=duration) if not isinstance(duration, timedelta) else duration
+    day_start, day_end = hours.window(hours.date)
+    if duration > day_end - day_start:
+        raise ValueError("Interview duration is longer than the working day")
+    # Otherwise no day would ever have room and next_start would not return
+    if not fits_between_breaks(hours, duration):
+        raise ValueError("The breaks leave no time long enough for an interview")
+    if not hours.weekdays:
+        raise ValueError("Choose at least one day of the week for interviews")
+
+    busy = busy or {}
+    constraints = constraints or {}
+    allowed_panels = (np.asarray(allowed_panels, dtype=bool) if allowed_panels is not None
+                      else np.zeros((len(candidates), len(panels)), dtype=bool))
+    restricted = allowed_panels.any(axis=1)
+    calendars = [Calendar(busy.get(panel, ())) for panel in panels]
+    free_at = [next_start(day_start, duration, hours, calendar) for calendar in calendars]
+    heap = [(t, i) for i, t in enumerate(free_at)]
+    heapq.heapify(heap)
+
+    # Panels sharing a member with each panel
+    shared = [[] for _ in panels]
+    if members:
+        panels_of = {}
+        for i, panel in enumerate(panels):
+            for member in members.get(panel, ()):
+                panels_of.setdefault(member, set()).add(i)
+        for sharing in panels_of.values():
+            for i in sharing:
+                shared[i].extend(j for j in sharing if j != i)
+        shared = [sorted(set(others)) for others in shared]
+
+    # Candidates are handled by position, which allowed_panels is indexed by
+    constrained = [k for k, c in enumerate(candidates) if c in constraints or restricted[k]]
+    constrained.sort(key=lambda k: constraints.get(candidates[k], (None, None))[1] or datetime.max)
+    unconstrained = [c for k, c in enumerate(candidates) if c not in constraints and not restricted[k]]
+
+    slots = []
+    unscheduled = []
+
+    # Block [start, end) on a panel, moving its next free start past it
+    # when the two overlap
+    def block(j, start, end):
+        calendars[j].add(start, end)
+        if free_at[j] < end and free_at[j] + duration > start:
+            free_at[j] = next_start(free_at[j], duration, hours, calendars[j])
+            heapq.heappush(heap, (free_at[j], j))
+
+    def book(candidate, i, start):
+        slots.append(Slot(candidate, panels[i], start, start + duration))
+        block(i, start, start + duration)
+        # A shared member is now busy on the other panels too
+        for j in shared[i]:
+            block(j, start, start + duration)
+
+    for k in constrained:
+        candidate = candidates[k]
+        earliest, latest = constraints.get(candidate, (None, None))
+        allowed = allowed_panels[k].tolist() if restricted[k] else None
+        best = None
+        for i in range(len(panels)):
+            if allowed is not None and not allowed[i]:
+                continue
+            start = free_at[i]
+            if earliest is not None and earliest > start:
+                start = next_start(earliest, duration, hours, calendars[i])
+            elif calendars[i].conflict(start, start + duration) is not None:
+                start = next_start(start, duration, hours, calendars[i])
+            if latest is not None and start + duration > latest:
+                continue
+            if best is None or start < best[1]:
+                best = (i, start)
+        if best is None:
+            unscheduled.append(candidate)
+        else:
+            book(candidate, *best)
+
+    for candidate in unconstrained:
+        # Drop heap entries made stale by later bookings of the same panel
+        while True:
+            t, i = heapq.heappop(heap)
+            if t == free_at[i]:
+                break
+        book(candidate, i, t)
+
+    order = {panel: i for i, panel in enumerate(panels)}
+    slots.sort(key=lambda slot: (slot.start, order[slot.panel]))
+    return slots, unscheduled
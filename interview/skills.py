@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+from interview.metrics import span
+
+# Words kept as skill terms; '+', '#' and inner dots keep c++, c# and node.js whole
+TERM_PATTERN = r"[a-z0-9+#]+(?:\.[a-z0-9+#]+)*"
+STOP_WORDS = {"and", "or", "with", "in", "of", "the", "a", "an", "to", "for", "on", "at"}
+
+
+# Split free text into (position, term) pairs without looping over rows
+def tokenise(texts):
+    texts = pd.Series(texts, dtype=object).reset_index(drop=True)
+    terms = texts.fillna("").astype(str).str.lower().str.findall(TERM_PATTERN).explode()
+    terms = terms[terms.notna() & ~terms.isin(STOP_WORDS)]
+    pairs = pd.DataFrame({"row": terms.index.to_numpy(), "term": terms.to_numpy(dtype=object)})
+    return pairs.drop_duplicates()
+
+
+# Inverted index from skill terms to row positions, with IDF weights so
+# rare skills count for more than common ones
+class SkillIndex:
+    def __init__(self, texts):
+        with span("skills.index"):
+            pairs = tokenise(texts)
+            self._index(len(texts), pairs["row"].to_numpy(dtype=np.int64), pairs["term"].to_numpy(dtype=object))
+
+    def _index(self, size, rows, terms):
+        self.size = size
+        codes, vocabulary = pd.factorize(terms)
+        self.vocabulary = {term: i for i, term in enumerate(vocabulary)}
+        self.terms = np.asarray(vocabulary, dtype=object)
+        self.pair_rows = rows
+        self.pair_terms = codes
+
+        # Postings list of each term: rows sorted by term, plus offsets
+        order = np.argsort(codes, kind="stable")
+        self.postings_rows = self.pair_rows[order]
+        self.offsets = np.searchsorted(codes[order], np.arange(len(vocabulary) + 1))
+        document_frequency = np.diff(self.offsets)
+        self.idf = np.log((1 + self.size) / (1 + document_frequency)) + 1
+
+    # Index of a new version of the texts that re-tokenises only the rows
+    # whose text changed. reused[i] is the position row i had in the indexed
+    # texts when its text is unchanged, otherwise -1. The index itself is
+    # left untouched, as other readers may still be using it.
+    def patched(self, texts, reused):
+        with span("skills.patch"):
+            reused = np.asarray(reused, dtype=np.int64)
+            keep = reused >= 0
+            new_rows = np.full(self.size, -1, dtype=np.int64)
+            new_rows[reused[keep]] = np.flatnonzero(keep)
+            old_rows = new_rows[self.pair_rows]
+            kept = old_rows >= 0
+            fresh = np.flatnonzero(~keep)
+            pairs = tokenise(pd.Series(texts, dtype=object).iloc[fresh])
+            rows = np.concatenate([old_rows[kept], fresh[pairs["row"].to_numpy(dtype=np.int64)]])
+            terms = np.concatenate([self.terms[self.pair_terms[kept]], pairs["term"].to_numpy(dtype=object)])
+            order = np.argsort(rows, kind="stable")
+            index = SkillIndex.__new__(SkillIndex)
+            index._index(len(texts), rows[order], terms[order])
+            return index
+
+    def term_ids(self, text):
+        terms = tokenise([text])["term"]
+        return np.array([self.vocabulary[term] for term in terms if term in self.vocabulary], dtype=np.int64)
+
+    def postings(self, term_id):
+        return self.postings_rows[self.offsets[term_id]:self.offsets[term_id + 1]]
+
+    # Rows matching a skills query, best match first.
+    # With match_all only rows having every query term are returned.
+    def search(self, query, match_all=False):
+        query_terms = tokenise([query])["term"]
+        term_ids = self.term_ids(query)
+        if not len(term_ids) or (match_all and len(term_ids) < len(query_terms)):
+            return np.array([], dtype=np.int64)
+        rows = np.concatenate([self.postings(t) for t in term_ids])
+        weights = np.concatenate([np.full(len(self.postings(t)), self.idf[t]) for t in term_ids])
+        scores = np.bincount(rows, weights=weights, minlength=self.size)
+        if match_all:
+            hits = np.bincount(rows, minlength=self.size)
+            matching = np.flatnonzero(hits == len(term_ids))
+        else:
+            matching = np.flatnonzero(scores)
+        return matching[np.argsort(-scores[matching], kind="stable")]
+
+    # Score of every row against each text, as a (rows x texts) matrix.
+    # Each shared term adds its squared IDF weight.
+    def score(self, texts):
+        scores = np.zeros((self.size, len(texts)))
+        for column, text in enumerate(texts):
+            weights = np.zeros(len(self.idf))
+            term_ids = self.term_ids(text)
+            weights[term_ids] = self.idf[term_ids] ** 2
+            scores[:, column] = np.bincount(self.pair_rows, weights=weights[self.pair_terms],
+                                            minlength=self.size)
+        return scores
+
+
+# Route every row of the index to its best-matching panels in one pass.
+# Returns a boolean (rows x panels) matrix marking each row's best panels,
+# keeping ties; rows without any matching skill have no panel marked so
+# they can go to any panel.
+def assign_panels(index, expertise):
+    scores = index.score(expertise)
+    if not scores.size:
+        return scores.astype(bool)
+    best = scores.max(axis=1, keepdims=True)
+    return (scores == best) & (best > 0)
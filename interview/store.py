@@ -0,0 +1,96 @@
+import time
+
+from interview.db import Database
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS groups (
+    name TEXT PRIMARY KEY,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS group_members (
+    group_name TEXT NOT NULL REFERENCES groups (name) ON DELETE CASCADE,
+    email TEXT NOT NULL,
+    PRIMARY KEY (group_name, email)
+);
+CREATE INDEX IF NOT EXISTS group_members_email ON group_members (email);
+CREATE TABLE IF NOT EXISTS panels (
+    name TEXT PRIMARY KEY,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS panel_members (
+    panel_name TEXT NOT NULL REFERENCES panels (name) ON DELETE CASCADE,
+    email TEXT NOT NULL,
+    PRIMARY KEY (panel_name, email)
+);
+CREATE INDEX IF NOT EXISTS panel_members_email ON panel_members (email);
+"""
+
+
+# Durable candidate groups and interview panels.
+# Membership is stored as one row per (name, email), so adding or removing
+# members only touches the rows that change. Members are returned in the
+# order they were added. Reads are shared between callers until the
+# database changes, so the lists returned must not be modified.
+class Store(Database):
+    schema = SCHEMA
+
+    # Returns True if the group was created, False if it already existed
+    def create_group(self, name):
+        with self._transaction() as conn:
+            cursor = conn.execute("INSERT OR IGNORE INTO groups (name, created_at) VALUES (?, ?)",
+                                  (name, time.time()))
+            return cursor.rowcount > 0
+
+    def group_names(self):
+        return self._cached("group_names", lambda: [
+            name for name, in self._execute("SELECT name FROM groups ORDER BY created_at, name")])
+
+    def group_members(self, name):
+        return self._cached(("group_members", name), lambda: [email for email, in self._execute(
+            "SELECT email FROM group_members WHERE group_name = ? ORDER BY rowid", (name,))])
+
+    def group_size(self, name):
+        return self._cached(("group_size", name), lambda: self._execute(
+            "SELECT COUNT(*) FROM group_members WHERE group_name = ?", (name,))[0][0])
+
+    # Returns the number of emails that were not already members
+    def add_group_members(self, name, emails):
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO group_members (group_name, email) VALUES (?, ?)",
+                             [(name, email) for email in emails])
+            return conn.total_changes - before
+
+    def remove_group_members(self, name, emails):
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany("DELETE FROM group_members WHERE group_name = ? AND email = ?",
+                             [(name, email) for email in emails])
+            return conn.total_changes - before
+
+    # Create a panel, replacing the members of an existing panel with the same name
+    def save_panel(self, name, emails):
+        with self._transaction() as conn:
+            conn.execute("INSERT OR IGNORE INTO panels (name, created_at) VALUES (?, ?)",
+                         (name, time.time()))
+            conn.execute("DELETE FROM panel_members WHERE panel_name = ?", (name,))
+            conn.executemany("INSERT OR IGNORE INTO panel_members (panel_name, email) VALUES (?, ?)",
+                             [(name, email) for email in emails])
+
+    def panel_names(self):
+        return self._cached("panel_names", lambda: [
+            name for name, in self._execute("SELECT name FROM panels ORDER BY created_at, name")])
+
+    def panel_members(self, name):
+        return self._cached(("panel_members", name), lambda: [email for email, in self._execute(
+            "SELECT email FROM panel_members WHERE panel_name = ? ORDER BY rowid", (name,))])
+
+    # All panels with their members, in creation order
+    def panels(self):
+        return self._cached("panels", self._read_panels)
+
+    def _read_panels(self):
+        panels = {name: [] for name in self.panel_names()}
+        for name, email in self._execute("SELECT panel_name, email FROM panel_members ORDER BY rowid"):
+            panels[name].append(email)
+        return panels
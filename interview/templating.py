@@ -0,0 +1,82 @@
+import re
+
+import pandas as pd
+
+from interview.mailer import build_message
+from interview.metrics import incr, span
+
+# [NAME], [MEET_LINK], [Available From], ...
+PLACEHOLDER = re.compile(r"\[([A-Za-z][A-Za-z0-9_ .]*)\]")
+
+# Placeholders the app documents; they render empty when the sheet has no
+# such column instead of being left in the text
+KNOWN_FIELDS = {"NAME", "EMAIL", "SKILLS", "EXPERIENCE", "EXPERTISE", "SLOT", "PANEL", "MEET_LINK"}
+
+# Rows rendered at a time by render_messages
+CHUNK_SIZE = 1000
+
+
+# Placeholder and column names compare as upper case with runs of
+# non-alphanumerics turned into underscores, so [MEET_LINK] matches a
+# "Meet Link" column
+def normalise(name):
+    return re.sub(r"[^A-Z0-9]+", "_", str(name).upper()).strip("_")
+
+
+# Message template parsed once into literal text and placeholder names.
+# Placeholders are filled from fixed values first and sheet columns second;
+# other bracketed text is left unchanged.
+class Template:
+    def __init__(self, text):
+        parts = PLACEHOLDER.split(text)
+        self.literals = parts[0::2]
+        self.fields = parts[1::2]
+
+    # Render every row of a frame in one vectorised pass.
+    # values maps placeholder names to fixed strings and defaults gives the
+    # text used where a row's column is empty. Returns a Series of strings.
+    def render(self, df, values=None, defaults=None):
+        values = {normalise(k): v for k, v in (values or {}).items()}
+        defaults = {normalise(k): v for k, v in (defaults or {}).items()}
+        columns = {normalise(column): column for column in df.columns}
+
+        result = pd.Series(self.literals[0], index=df.index, dtype=object)
+        for field, literal in zip(self.fields, self.literals[1:]):
+            key = normalise(field)
+            if key in values:
+                filled = "" if values[key] is None else str(values[key])
+            elif key in columns:
+                filled = df[columns[key]].astype(object).where(df[columns[key]].notna(), defaults.get(key, ""))
+                filled = filled.astype(str)
+            elif key in KNOWN_FIELDS:
+                filled = defaults.get(key, "")
+            else:
+                filled = f"[{field}]"
+            result = result + filled + literal
+        return result
+
+
+# Frame of the sheet rows for the given emails, in that order. Emails not
+# in the sheet get an empty row; the first row wins for duplicate emails.
+def rows_for_emails(df, emails):
+    rows = df[df["Email"].notna()].drop_duplicates("Email").set_index("Email", drop=False)
+    frame = rows.reindex(pd.Index(emails, name="Email"))
+    frame["Email"] = frame.index
+    return frame.reset_index(drop=True)
+
+
+# Lazily yield one ready-to-send message per row of df (addressed to its
+# Email column). Rows are rendered in chunks so memory use stays flat for
+# large mailings; both subject and body may contain placeholders.
+def render_messages(sender, subject, body, df, values=None, defaults=None, is_html=False,
+                    chunk_size=CHUNK_SIZE):
+    subject_template = Template(subject)
+    body_template = Template(body)
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size]
+        with span("templating.render"):
+            subjects = subject_template.render(chunk, values, defaults)
+            bodies = body_template.render(chunk, values, defaults)
+        incr("templating.messages_rendered", len(chunk))
+        for to, chunk_subject, chunk_body in zip(chunk["Email"], subjects, bodies):
+            yield build_message(sender, to, chunk_subject, chunk_body, is_html)
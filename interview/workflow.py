@@ -0,0 +1,116 @@
+# Steps of scheduling a drive, shared by the app and the command line
+import numpy as np
+import pandas as pd
+
+from interview.notifications import build_calendar, build_panel_message, event_uid, render_panel_schedule
+from interview.skills import assign_panels
+from interview.templating import render_messages, rows_for_emails
+
+# Optional per-candidate availability from the 'Available From' and
+# 'Available Until' columns of the candidate sheet
+def candidate_constraints(candidate_index, emails):
+    constraints = {}
+    for email in emails:
+        details = candidate_index.get(email, {})
+        earliest = details.get('Available From')
+        latest = details.get('Available Until')
+        if pd.notna(earliest) or pd.notna(latest):
+            constraints[email] = (
+                pd.Timestamp(earliest).to_pydatetime() if pd.notna(earliest) else None,
+                pd.Timestamp(latest).to_pydatetime() if pd.notna(latest) else None,
+            )
+    return constraints
+
+
+# Best-fit panels for each candidate, matching candidate Skills (through
+# skill_index, built over candidates_df) against the Expertise of each
+# panel's members. panels maps panel names to member emails.
+# Returns a boolean (candidates x panels) matrix, rows in the order of
+# candidates and columns in that of panels, as schedule() takes it.
+# Candidates without a matching skill, or not in the sheet, have no panel
+# marked.
+def skill_based_panels(candidates_df, skill_index, panel_index, panels, candidates):
+    expertise = []
+    for members in panels.values():
+        member_expertise = [panel_index.get(member, {}).get('Expertise') for member in members]
+        expertise.append(", ".join(str(e) for e in member_expertise if pd.notna(e)))
+    best = assign_panels(skill_index, expertise)
+
+    # Row position of each candidate email, first occurrence wins
+    emails = pd.Index(candidates_df['Email'])
+    first = ~emails.duplicated()
+    positions = emails[first].get_indexer(candidates)
+    found = positions >= 0
+    allowed = np.zeros((len(candidates), len(panels)), dtype=bool)
+    if best.size:
+        allowed[found] = best[np.flatnonzero(first)[positions[found]]]
+    return allowed
+
+
+# Slot times show the date only when the schedule spans several days
+def slot_time_format(slots, interview_date):
+    multi_day = any(slot.start.date() != interview_date for slot in slots)
+    return '%Y-%m-%d %H:%M' if multi_day else '%H:%M'
+
+
+# Template of the candidate notification; the custom message may use the
+# same placeholders as the rest of the body
+def schedule_body(duration, message=""):
+    body = f"""
+                Dear [NAME],
+                
+                Your interview has been scheduled for [SLOT].
+                Duration: {duration} minutes
+                Panel: [PANEL]
+                
+                Meeting Link: [MEET_LINK]
+                
+                """
+    if message:
+        body += f"{message}\n\n"
+    body += """Please be prepared and join on time.
+                
+                Best regards,
+                Interview Team
+                """
+    return body
+
+
+# Lazily rendered notification for every scheduled candidate
+def candidate_schedule_messages(sender, candidates_df, slots, body, meet_link):
+    slot_rows = rows_for_emails(candidates_df, [slot.candidate for slot in slots]).assign(
+        Slot=[slot.start.strftime('%Y-%m-%d %H:%M') for slot in slots],
+        Panel=[slot.panel for slot in slots],
+    )
+    return render_messages(sender, "Interview Schedule Notification", body, slot_rows,
+                           values={"MEET_LINK": meet_link}, defaults={"NAME": "Candidate"})
+
+
+# One schedule email per panel: the table and calendar are rendered once
+# and the message goes to all members in one send. panels maps panel
+# names to member emails. Calendar events are identified by batch_id and
+# candidate, so sending the batch again updates them.
+def panel_schedule_messages(sender, candidate_index, slots, panels, interview_date, meet_link, batch_id):
+    time_format = slot_time_format(slots, interview_date)
+    date_text = interview_date.strftime('%B %d, %Y')
+    subject = f"Interview Schedule - {date_text}"
+    panel_slots = {}
+    for slot in slots:
+        panel_slots.setdefault(slot.panel, []).append(slot)
+
+    emails = []
+    for panel, members in panels.items():
+        if not members or not panel_slots.get(panel):
+            continue
+        rows = []
+        events = []
+        for slot in panel_slots[panel]:
+            candidate_details = candidate_index.get(slot.candidate, {})
+            name = candidate_details.get('Name', slot.candidate)
+            details = f"{candidate_details.get('Experience', '')} - {candidate_details.get('Skills', '')}"
+            rows.append((slot.start.strftime(time_format), name, details))
+            events.append((event_uid(batch_id, slot.candidate), slot.start, slot.end, f"Interview: {name}", details))
+        panel_email_html = render_panel_schedule(date_text, rows, meet_link)
+        calendar = build_calendar(events, location=meet_link)
+        emails.append(build_panel_message(sender, members, subject, panel_email_html, calendar))
+    return emails
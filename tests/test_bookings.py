@@ -0,0 +1,69 @@
+from datetime import datetime
+
+from interview.bookings import Bookings
+from interview.scheduler import Slot
+
+
+def slot(candidate, panel, hour):
+    return Slot(candidate, panel, datetime(2025, 1, 10, hour), datetime(2025, 1, 10, hour, 30))
+
+
+def test_booked_candidates_are_those_with_interviews_still_to_come(tmp_path):
+    bookings = Bookings(str(tmp_path / "interview.db"))
+    panels = {"P1": ["p1@example.com"]}
+    assert bookings.book("b1", [slot("a@example.com", "P1", 9), slot("b@example.com", "P1", 11)], panels) == []
+    candidates = ["c@example.com", "b@example.com", "a@example.com"]
+    assert bookings.booked_candidates(candidates, datetime(2025, 1, 10, 8)) == ["b@example.com", "a@example.com"]
+    assert bookings.booked_candidates(candidates, datetime(2025, 1, 10, 10)) == ["b@example.com"]
+    bookings.cancel("b1")
+    assert bookings.booked_candidates(candidates, datetime(2025, 1, 10, 8)) == []
+
+
+def test_nothing_is_free_on_days_without_interviews(tmp_path):
+    from datetime import date, time
+
+    from interview.scheduler import WorkingHours
+
+    index = Bookings(str(tmp_path / "interview.db")).index()
+    hours = WorkingHours(date(2025, 1, 10), time(9), time(10))
+    assert index.free_slots(["p1@example.com"], hours, date(2025, 1, 10)) == [
+        (datetime(2025, 1, 10, 9), datetime(2025, 1, 10, 10))]
+    assert index.free_slots(["p1@example.com"], hours, date(2025, 1, 11)) == []
+
+
+def test_booking_refuses_slots_members_are_busy_in(tmp_path):
+    from datetime import timedelta
+
+    bookings = Bookings(str(tmp_path / "interview.db"))
+    panels = {"P1": ["p1@example.com", "shared@example.com"], "P2": ["p2@example.com", "shared@example.com"]}
+    day = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=7)
+
+    def future(candidate, panel, hour):
+        start = day + timedelta(hours=hour)
+        return Slot(candidate, panel, start, start + timedelta(minutes=30))
+
+    assert bookings.book("b1", [future("a@example.com", "P1", 9)], panels) == []
+    index = bookings.index()
+    assert index.conflict("shared@example.com", day + timedelta(hours=9, minutes=15), day + timedelta(hours=10))
+
+    # The shared member is busy at 9 and can't sit on two panels at 10
+    clash = future("b@example.com", "P2", 9)
+    twice = [future("c@example.com", "P1", 10), future("d@example.com", "P2", 10)]
+    assert bookings.book("b2", [clash, *twice], panels) == [("shared@example.com", clash),
+                                                            ("shared@example.com", twice[1])]
+    assert len(bookings.between(day, day + timedelta(days=1))) == 2
+
+    # Bookings before the index starts are checked in the table
+    assert bookings.book("past", [slot("a@example.com", "P1", 9)], panels) == []
+    assert bookings.book("past again", [slot("b@example.com", "P2", 9)], panels) == [
+        ("shared@example.com", slot("b@example.com", "P2", 9))]
+
+    # The index is patched on every change and matches one built afresh
+    assert bookings.book("b3", [future("e@example.com", "P2", 11)], panels) == []
+    bookings.cancel("b1")
+    patched = bookings.index()
+    assert patched is not index
+    assert not patched.conflict("p1@example.com", day, day + timedelta(days=1))
+    fresh = Bookings(bookings.path).index()
+    assert {member: (calendar.starts, calendar.ends) for member, calendar in patched.calendars.items()} == \
+        {member: (calendar.starts, calendar.ends) for member, calendar in fresh.calendars.items()}
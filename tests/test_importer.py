@@ -0,0 +1,15 @@
+from interview.importer import DUPLICATE_EMAIL, INVALID_EMAIL, MISSING_EMAIL, read_sheet
+
+
+def test_dropped_rows_are_reported_with_their_sheet_row(tmp_path):
+    path = tmp_path / "candidates.csv"
+    path.write_text("Name,Email\nAda,ada@example.com\nBob,not an email\nAda again,ADA@example.com\n"
+                    "Cy,\nDee,dee@example.com\n")
+    df = read_sheet(str(path), chunk_size=2)
+
+    assert df["Email"].tolist() == ["ada@example.com", "dee@example.com"]
+    report = df.attrs["import_report"]
+    assert (report["rows"], report["invalid_emails"], report["missing_emails"], report["duplicate_emails"]) == (
+        5, 2, 1, 1)
+    assert report["dropped"] == [(3, "not an email", INVALID_EMAIL), (4, "ADA@example.com", DUPLICATE_EMAIL),
+                                 (5, "", MISSING_EMAIL)]
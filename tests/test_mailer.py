@@ -0,0 +1,56 @@
+import smtplib
+import socket
+
+import pytest
+
+from interview.mailer import RateLimiter, SendStatus, classify_error
+
+
+def test_rate_limiter_counts_sends_made_before_it_started():
+    limiter = RateLimiter([(60, 60), (3, 86400)], sent=[1000.0, 2000.0, 3000.0])
+    assert limiter.delay(now=4000.0) == 1000.0 + 86400 - 4000.0
+    assert limiter.delay(now=1000.0 + 86400) == 0
+
+
+def test_rate_limiter_allows_at_most_the_quota_in_any_window():
+    limiter = RateLimiter([(2, 60)])
+    limiter.acquire()
+    limiter.acquire()
+    assert 59 < limiter.delay() <= 60
+    limiter.set_limits([(3, 60)])
+    assert limiter.delay() == 0
+    limiter.set_limits([(0, 60)])
+    assert limiter.delay() == 0
+
+
+@pytest.mark.parametrize("error, code", [
+    (smtplib.SMTPResponseException(421, b"Service not available"), 421),
+    (smtplib.SMTPDataError(451, b"Local error in processing"), 451),
+    (smtplib.SMTPSenderRefused(452, b"Out of storage", "hr@example.com"), 452),
+    (smtplib.SMTPRecipientsRefused({"a@example.com": (450, b"Busy"), "b@example.com": (451, b"Later")}), 451),
+    (smtplib.SMTPServerDisconnected("Connection unexpectedly closed"), None),
+    (socket.timeout("timed out"), None),
+    (ConnectionResetError("reset by peer"), None),
+])
+def test_transient_errors_are_retryable(error, code):
+    result = classify_error(error)
+    assert (result.status, result.code, result.retryable, result.error) == (
+        SendStatus.TEMPORARY_FAILURE, code, True, error)
+
+
+@pytest.mark.parametrize("error, code", [
+    (smtplib.SMTPAuthenticationError(535, b"Username and Password not accepted"), 535),
+    (smtplib.SMTPDataError(552, b"Message size exceeds fixed limit"), 552),
+    (smtplib.SMTPRecipientsRefused({"a@example.com": (450, b"Busy"), "b@example.com": (550, b"No such user")}), 550),
+    (smtplib.SMTPRecipientsRefused({}), None),
+    (smtplib.SMTPNotSupportedError("STARTTLS extension not supported"), None),
+    (ValueError("bad address"), None),
+])
+def test_permanent_errors_are_not_retried(error, code):
+    result = classify_error(error)
+    assert (result.status, result.code, result.retryable, result.error) == (
+        SendStatus.PERMANENT_FAILURE, code, False, error)
+
+
+def test_no_error_is_a_sent_result():
+    assert classify_error(None) == (SendStatus.SENT, 250, False, None)
@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from interview.notifications import ICS_LINE_OCTETS, build_calendar, event_uid
+
+
+def unfold(calendar):
+    return calendar.replace("\r\n ", "")
+
+
+def test_calendar_lines_are_folded_at_75_octets():
+    description = "Senior engineer – Python, Rust and distributed systems; ünïcödé " * 4
+    calendar = build_calendar([(event_uid("batch-1", "a@example.com"), datetime(2030, 1, 7, 9),
+                                datetime(2030, 1, 7, 9, 30), "Interview: Ada", description)])
+    lines = calendar.split("\r\n")
+    assert max(len(line.encode("utf-8")) for line in lines) <= ICS_LINE_OCTETS
+    assert any(line.startswith(" ") for line in lines)
+    assert "DESCRIPTION:" + description.replace(",", "\\,").replace(";", "\\;") in unfold(calendar).split("\r\n")
+
+
+def test_events_sent_again_keep_their_uid_with_a_higher_sequence(monkeypatch):
+    import interview.notifications as notifications
+
+    uid = event_uid("schedule:G1:20300107", "a@example.com")
+    assert uid == "schedule:G1:20300107.a=example.com@interview-management-system.invalid"
+    event = (uid, datetime(2030, 1, 7, 9), datetime(2030, 1, 7, 9, 30), "Interview", "")
+
+    def sequence(now):
+        monkeypatch.setattr(notifications.time, "time", lambda: now)
+        line = next(line for line in build_calendar([event]).split("\r\n") if line.startswith("SEQUENCE:"))
+        return int(line.split(":")[1])
+
+    assert 0 < sequence(1893456000) < sequence(1893456001) < 2 ** 31
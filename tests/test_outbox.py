@@ -0,0 +1,141 @@
+import sqlite3
+import time
+
+from interview.deliveries import DeliveryLog
+from interview.mailer import build_message
+from interview.outbox import DEFERRED, FAILED, QUEUED, SENT, Outbox, OutboxWorker
+
+
+# Pool whose server refuses the given recipients, as {recipient: (code, response)}
+class RefusingPool:
+    size = 1
+
+    def __init__(self, refused):
+        self.refused = refused
+        self.sent = []
+
+    def send_raw(self, sender, recipients, payload):
+        self.sent.append(list(recipients))
+        return {recipient: self.refused[recipient] for recipient in recipients if recipient in self.refused}
+
+    def keepalive(self):
+        pass
+
+
+def queue_panel_message(path):
+    outbox = Outbox(path)
+    outbox.enqueue("batch", [build_message("hr@example.com", "a@example.com, b@example.com, c@example.com",
+                                           "Schedule", "Your interviews")])
+    return outbox
+
+
+def log_rows(log):
+    return sorted(log._execute("SELECT recipient, status, smtp_code FROM deliveries ORDER BY id"))
+
+
+def test_partially_refused_message_is_retried_for_refused_recipients_only(tmp_path):
+    path = str(tmp_path / "interview.db")
+    outbox, log = queue_panel_message(path), DeliveryLog(path)
+    worker = OutboxWorker(outbox, log=log, backoff=0)
+    worker.pool = RefusingPool({"b@example.com": (450, b"Mailbox busy")})
+    worker.process()
+
+    assert outbox.batch_status("batch")[QUEUED] == 1
+    assert log_rows(log) == [("a@example.com", SENT, 250), ("b@example.com", DEFERRED, 450),
+                             ("c@example.com", SENT, 250)]
+
+    worker.pool = RefusingPool({})
+    worker.process()
+    assert worker.pool.sent == [["b@example.com"]]
+    assert outbox.batch_status("batch")[SENT] == 1
+    assert log.batch("batch").sent == 1
+
+
+def test_permanently_refused_recipient_is_failed(tmp_path):
+    path = str(tmp_path / "interview.db")
+    outbox, log = queue_panel_message(path), DeliveryLog(path)
+    worker = OutboxWorker(outbox, log=log)
+    worker.pool = RefusingPool({"c@example.com": (550, b"No such user")})
+    worker.process()
+
+    assert outbox.batch_status("batch")[FAILED] == 1
+    assert outbox.batch_failures("batch")[0][0] == "c@example.com"
+    assert ("c@example.com", FAILED, 550) in log_rows(log)
+    assert ("a@example.com", SENT, 250) in log_rows(log)
+
+
+def test_failed_message_sent_by_retry_is_no_longer_counted_failed(tmp_path):
+    path = str(tmp_path / "interview.db")
+    outbox, log = queue_panel_message(path), DeliveryLog(path)
+    log.start_batch("batch", "schedule", queued=1)
+    worker = OutboxWorker(outbox, log=log)
+    worker.pool = RefusingPool({"c@example.com": (550, b"No such user")})
+    worker.process()
+    assert (log.batch("batch").sent, log.batch("batch").failed) == (0, 1)
+
+    outbox.retry_failed("batch")
+    worker.process()
+    assert (log.batch("batch").sent, log.batch("batch").failed) == (0, 1)
+
+    outbox.retry_failed("batch")
+    worker.pool = RefusingPool({})
+    worker.process()
+    assert (log.batch("batch").sent, log.batch("batch").failed) == (1, 0)
+    assert log.totals()[2:4] == (1, 0)
+
+
+def test_same_message_is_queued_once_per_batch():
+    outbox = Outbox(":memory:")
+    reminder = lambda: build_message("hr@example.com", "a@example.com", "Reminder", "See you tomorrow")
+    assert outbox.enqueue("monday", [reminder(), reminder()]) == 1
+    assert outbox.enqueue("monday", [reminder()]) == 0
+    assert outbox.enqueue("next monday", [reminder()]) == 1
+
+
+def test_attempt_times_count_each_attempt_once(tmp_path):
+    path = str(tmp_path / "interview.db")
+    outbox, log = queue_panel_message(path), DeliveryLog(path)
+    worker = OutboxWorker(outbox, log=log, backoff=0)
+    worker.pool = RefusingPool({"b@example.com": (450, b"Mailbox busy")})
+    worker.process()
+    worker.pool = RefusingPool({})
+    worker.process()
+
+    times = log.attempt_times(0)
+    assert len(times) == 2 and times == sorted(times)
+    assert log.attempt_times(times[-1] + 1) == []
+
+
+# Outbox whose first claims fail as if another process held the database
+class LockedOutbox(Outbox):
+    def __init__(self, path, failures):
+        super().__init__(path)
+        self.failures = failures
+
+    def claim(self, limit):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        return super().claim(limit)
+
+
+def test_worker_keeps_running_after_an_error(tmp_path):
+    outbox = LockedOutbox(str(tmp_path / "interview.db"), failures=2)
+    outbox.enqueue("batch", [build_message("hr@example.com", "a@example.com", "Schedule", "Your interviews")])
+    worker = OutboxWorker(outbox, poll_interval=0.01)
+    worker.start(RefusingPool({}))
+
+    deadline = time.time() + 5
+    while outbox.batch_status("batch")[SENT] != 1 and time.time() < deadline:
+        time.sleep(0.01)
+    assert outbox.batch_status("batch")[SENT] == 1
+    assert worker._thread.is_alive()
+
+
+def test_retry_delay_doubles_with_jitter_up_to_the_maximum():
+    worker = OutboxWorker(Outbox(":memory:"), backoff=30, max_backoff=3600)
+    for attempts, full in [(1, 30), (2, 60), (3, 120), (7, 1920), (8, 3600), (20, 3600)]:
+        delays = [worker.retry_delay(attempts) for _ in range(200)]
+        # Jitter takes up to half off, so retries of one batch spread out
+        assert all(full / 2 <= delay <= full for delay in delays)
+        assert max(delays) - min(delays) > full / 10
@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from interview.refresh import LiveSheet, _row_hashes, diff_rows
+from interview.skills import SkillIndex
+
+OLD = pd.DataFrame({"Email": ["a@x.com", "b@x.com", "c@x.com", "d@x.com"],
+                    "Skills": ["python, sql", "java", "c++ and rust", "go"]})
+# d removed, b changed, a and c swapped, e added
+NEW = pd.DataFrame({"Email": ["c@x.com", "b@x.com", "e@x.com", "a@x.com"],
+                    "Skills": ["c++ and rust", "java, kotlin", "python", "python, sql"]})
+
+
+def diff(old, new):
+    return diff_rows(pd.Index(old["Email"]), _row_hashes(old), pd.Index(new["Email"]), _row_hashes(new))
+
+
+def postings(index):
+    return {term: sorted(index.postings(term_id).tolist()) for term, term_id in index.vocabulary.items()}
+
+
+def test_diff_rows_matches_rows_by_email():
+    changes = diff(OLD, NEW)
+    assert (changes.added, changes.changed, changes.removed) == (["e@x.com"], ["b@x.com"], ["d@x.com"])
+    assert changes.reused.tolist() == [2, -1, -1, 0]
+
+
+def test_patched_skill_index_matches_a_fresh_one():
+    patched = SkillIndex(OLD["Skills"]).patched(NEW["Skills"], diff(OLD, NEW).reused)
+    fresh = SkillIndex(NEW["Skills"])
+    assert patched.size == fresh.size
+    assert postings(patched) == postings(fresh)
+    assert {term: patched.idf[i] for term, i in patched.vocabulary.items()} == \
+        {term: fresh.idf[i] for term, i in fresh.vocabulary.items()}
+    assert patched.search("python kotlin").tolist() == fresh.search("python kotlin").tolist()
+
+
+# Write a version of the sheet; its number is used as the modification
+# time, so the signature changes however quickly versions are written
+def write(path, df, version):
+    df.to_csv(path, index=False)
+    os.utime(path, (version, version))
+
+
+def test_cursor_carries_the_selection_over_by_email(tmp_path):
+    path = str(tmp_path / "candidates.csv")
+    write(path, OLD, 1)
+    sheet = LiveSheet(path, "Skills")
+    first = sheet.refresh()
+    following, lagging = sheet.cursor(), sheet.cursor()
+    for cursor in (following, lagging):
+        assert cursor.move(first) is None
+        cursor.selection.add(first.positions(["a@x.com", "b@x.com", "d@x.com"]))
+
+    write(path, pd.concat([OLD, pd.DataFrame({"Email": ["z@x.com"], "Skills": ["sql"]})], ignore_index=True), 2)
+    second = sheet.refresh()
+    assert following.move(second).added == ["z@x.com"]
+    write(path, NEW, 3)
+    third = sheet.refresh()
+    assert third.diff.removed == ["d@x.com", "z@x.com"]
+
+    # One cursor follows every version, the other skips the second
+    for cursor in (following, lagging):
+        changes = cursor.move(third)
+        assert changes.changed == ["b@x.com"] and "d@x.com" in changes.removed
+        assert [third.emails()[row] for row in cursor.selection.rows()] == ["b@x.com", "a@x.com"]
+    assert sheet.references() == {3: 2}
+    assert postings(third.skill_index) == postings(SkillIndex(NEW["Skills"]))
+    assert np.array_equal(third.positions(["a@x.com", "d@x.com"]), [3, -1])
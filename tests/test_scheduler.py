@@ -0,0 +1,88 @@
+import random
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from interview.scheduler import WorkingHours, schedule
+
+DAY = date(2025, 1, 10)
+
+
+def at(hour, minute=0):
+    return datetime.combine(DAY, time(hour, minute))
+
+
+def overlapping(slots):
+    by_panel = {}
+    for slot in slots:
+        by_panel.setdefault(slot.panel, []).append(slot)
+    pairs = []
+    for panel_slots in by_panel.values():
+        panel_slots.sort(key=lambda slot: slot.start)
+        pairs += [(a, b) for a, b in zip(panel_slots, panel_slots[1:]) if b.start < a.end]
+    return pairs
+
+
+def test_constrained_booking_after_free_start_is_not_overlapped():
+    hours = WorkingHours(DAY, time(9), time(17))
+    slots, unscheduled = schedule(["c1", "c2"], ["P1"], hours, 30, constraints={"c1": (at(9, 15), None)})
+    assert not unscheduled
+    assert not overlapping(slots)
+    assert [(slot.candidate, slot.start) for slot in slots] == [("c1", at(9, 15)), ("c2", at(9, 45))]
+
+
+def test_many_candidates_with_available_from_are_not_overlapped():
+    rng = random.Random(0)
+    candidates = [f"c{i}" for i in range(3000)]
+    # Half of them are available from some time on the first day
+    constraints = {candidate: (at(9) + timedelta(minutes=rng.randrange(0, 480, 5)), None)
+                   for candidate in candidates[::2]}
+    hours = WorkingHours(DAY, time(9), time(17))
+    slots, unscheduled = schedule(candidates, ["P1", "P2", "P3"], hours, 30, constraints=constraints)
+    assert not unscheduled
+    assert not overlapping(slots)
+    for slot in slots:
+        earliest = constraints.get(slot.candidate, (None, None))[0]
+        assert earliest is None or slot.start >= earliest
+
+
+def test_breaks_leaving_no_room_raise():
+    hours = WorkingHours(DAY, time(9), time(17), [(time(9, 15), time(17))])
+    with pytest.raises(ValueError):
+        schedule(["c1"], ["P1"], hours, 30)
+
+
+def test_interview_fits_between_breaks():
+    hours = WorkingHours(DAY, time(9), time(17), [(time(9, 30), time(12)), (time(12, 30), time(17))])
+    slots, unscheduled = schedule(["c1", "c2", "c3"], ["P1"], hours, 30)
+    # DAY is a Friday, so the third interview moves to Monday
+    assert [slot.start for slot in slots] == [at(9), at(12), at(9) + timedelta(days=3)]
+
+
+def test_friday_overflow_continues_on_monday():
+    assert DAY.weekday() == 4
+    hours = WorkingHours(DAY, time(9), time(10))
+    slots, unscheduled = schedule(["c1", "c2", "c3", "c4"], ["P1"], hours, 30)
+    assert not unscheduled
+    assert [slot.start for slot in slots] == [at(9), at(9, 30), at(9) + timedelta(days=3),
+                                              at(9, 30) + timedelta(days=3)]
+    assert all(slot.start.weekday() < 5 for slot in slots)
+
+
+def test_interviews_only_on_chosen_weekdays():
+    # Saturdays only, starting from the Friday
+    hours = WorkingHours(DAY, time(9), time(10), weekdays={5})
+    slots, _ = schedule(["c1", "c2", "c3"], ["P1"], hours, 30)
+    assert [slot.start for slot in slots] == [at(9) + timedelta(days=1), at(9, 30) + timedelta(days=1),
+                                              at(9) + timedelta(days=8)]
+    with pytest.raises(ValueError):
+        schedule(["c1"], ["P1"], WorkingHours(DAY, time(9), time(10), weekdays=()), 30)
+
+
+def test_allowed_panels_are_looked_up_by_candidate_position():
+    hours = WorkingHours(DAY, time(9), time(17))
+    # c1 may only see P2, c2 any panel
+    allowed = [[False, True], [False, False]]
+    slots, unscheduled = schedule(["c1", "c2"], ["P1", "P2"], hours, 30, allowed_panels=allowed)
+    assert not unscheduled
+    assert sorted((slot.candidate, slot.panel) for slot in slots) == [("c1", "P2"), ("c2", "P1")]
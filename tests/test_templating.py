@@ -0,0 +1,31 @@
+import pandas as pd
+
+from interview.templating import Template, render_messages, rows_for_emails
+
+SHEET = pd.DataFrame({"Name": ["Ada", None], "Email": ["ada@example.com", "bob@example.com"],
+                      "Meet Link": ["https://meet/ada", None], "Available From": ["10:00", "11:30"]})
+
+
+def test_placeholders_are_filled_from_values_columns_and_defaults():
+    template = Template("Dear [NAME], join [meet link] from [Available From]. [SLOT][Unknown] [x")
+    rendered = template.render(SHEET, values={"SLOT": "9:00"}, defaults={"NAME": "Candidate"})
+    assert rendered.tolist() == [
+        "Dear Ada, join https://meet/ada from 10:00. 9:00[Unknown] [x",
+        "Dear Candidate, join  from 11:30. 9:00[Unknown] [x",
+    ]
+
+
+def test_fixed_values_win_over_columns_and_known_fields_render_empty():
+    rendered = Template("[MEET_LINK]|[PANEL]|[EMAIL]").render(SHEET, values={"Meet_Link": None})
+    assert rendered.tolist() == ["||ada@example.com", "||bob@example.com"]
+
+
+def test_messages_are_rendered_for_the_given_emails_in_order():
+    rows = rows_for_emails(SHEET, ["bob@example.com", "nobody@example.com", "ada@example.com"])
+    messages = list(render_messages("hr@example.com", "Hi [NAME]", "Your link: [MEET_LINK]", rows,
+                                    defaults={"NAME": "there"}, chunk_size=2))
+    assert [(m["To"], m["Subject"], m.get_content().strip()) for m in messages] == [
+        ("bob@example.com", "Hi there", "Your link:"),
+        ("nobody@example.com", "Hi there", "Your link:"),
+        ("ada@example.com", "Hi Ada", "Your link: https://meet/ada"),
+    ]
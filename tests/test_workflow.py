@@ -0,0 +1,15 @@
+import pandas as pd
+
+from interview.skills import SkillIndex
+from interview.workflow import skill_based_panels
+
+
+def test_skill_based_panels_is_a_candidates_by_panels_matrix():
+    candidates = pd.DataFrame({"Email": ["a@x.com", "b@x.com", "c@x.com", "a@x.com"],
+                               "Skills": ["python", "java, python", "cooking", "java"]})
+    panel_index = {"py@x.com": {"Expertise": "python"}, "jv@x.com": {"Expertise": "java"}}
+    panels = {"Python": ["py@x.com"], "Java": ["jv@x.com"]}
+    allowed = skill_based_panels(candidates, SkillIndex(candidates["Skills"]), panel_index, panels,
+                                 ["c@x.com", "a@x.com", "unknown@x.com", "b@x.com"])
+    # The first row of a repeated email counts; b fits both panels equally
+    assert allowed.tolist() == [[False, False], [True, False], [False, False], [True, True]]